@@ -0,0 +1,136 @@
+# analysis/entity_registry.py
+
+import re
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from storage import get_storage
+
+# --- Registry Configuration ---
+# Keys per `in` filter when looking aliases up; keeps request URLs short.
+LOOKUP_CHUNK_SIZE = 200
+# Trailing legal-form words that don't change which company a name refers to.
+LEGAL_SUFFIXES = {
+    'pjsc', 'psc', 'pjs', 'plc', 'llc', 'ltd', 'limited', 'inc', 'incorporated', 'corp', 'corporation',
+    'co', 'company', 'sa', 'ag', 'nv', 'bsc', 'qsc', 'qpsc', 'saog', 'saoc', 'ksc', 'kscp', 'jsc', 'pte',
+}
+
+_NON_WORD = re.compile(r'[^\w\s]')
+
+
+def normalize_entity_name(name: str) -> str:
+    """
+    Builds the alias key of an entity name: case, punctuation, a leading 'the' and
+    trailing legal forms are ignored, so 'Emaar Properties PJSC' and 'emaar properties'
+    share a key while 'Emirates' and 'Emirates NBD' do not.
+    """
+    text = unicodedata.normalize('NFKC', name or '').casefold().replace('&', ' and ')
+    words = _NON_WORD.sub(' ', text).split()
+    if len(words) > 1 and words[0] == 'the':
+        words = words[1:]
+    while len(words) > 1 and words[-1] in LEGAL_SUFFIXES:
+        words.pop()
+    return ' '.join(words)
+
+
+class EntityRegistry:
+    """
+    Maps the entity names produced by the analyzer to canonical entity ids.
+
+    `entities` holds one row per canonical entity; `entity_aliases` holds every surface
+    name seen for it together with its normalized key. New names are resolved through
+    the key, so spelling variants of a known entity join it instead of creating a new
+    one. Resolved keys are cached in memory, so steady-state writes cost no queries.
+    """
+    def __init__(self):
+        self._ids: Dict[Tuple[str, str], int] = {}  # (alias_key, entity_type) -> entity id
+        self._known_aliases: set = set()  # (alias, entity_type) already stored
+        self._lock = threading.Lock()
+
+    def _load_aliases(self, keys: List[str]):
+        for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+            rows = get_storage().select('entity_aliases', 'alias, entity_type, alias_key, entity_id',
+                                        [('alias_key', 'in', keys[start:start + LOOKUP_CHUNK_SIZE])])
+            for row in rows:
+                self._ids.setdefault((row['alias_key'], row['entity_type']), row['entity_id'])
+                self._known_aliases.add((row['alias'], row['entity_type']))
+
+    def resolve(self, names: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], int]:
+        """
+        Returns the entity id of each (entity_name, entity_type) pair, registering
+        unknown entities and new surface names on the way. Safe to call from several
+        processes at once: creation goes through unique keys and is re-read afterwards.
+        """
+        names = {(name, entity_type) for name, entity_type in names if name and entity_type}
+        keyed = {pair: normalize_entity_name(pair[0]) for pair in names}
+        with self._lock:
+            missing_keys = list({key for (_, entity_type), key in keyed.items() if (key, entity_type) not in self._ids})
+            if missing_keys:
+                self._load_aliases(missing_keys)
+
+            new_entities = {}
+            for (name, entity_type), key in keyed.items():
+                if (key, entity_type) not in self._ids:
+                    new_entities.setdefault((key, entity_type), {'name': name, 'entity_type': entity_type, 'name_key': key})
+            if new_entities:
+                get_storage().upsert('entities', list(new_entities.values()), on_conflict='name_key,entity_type',
+                                     ignore_duplicates=True, returning=False)
+                keys = list({key for key, _ in new_entities})
+                for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+                    for row in get_storage().select('entities', 'id, entity_type, name_key',
+                                                    [('name_key', 'in', keys[start:start + LOOKUP_CHUNK_SIZE])]):
+                        self._ids.setdefault((row['name_key'], row['entity_type']), row['id'])
+
+            new_aliases = [
+                {'alias': name, 'entity_type': entity_type, 'alias_key': key, 'entity_id': self._ids[(key, entity_type)]}
+                for (name, entity_type), key in keyed.items() if (name, entity_type) not in self._known_aliases
+            ]
+            if new_aliases:
+                get_storage().upsert('entity_aliases', new_aliases, on_conflict='alias,entity_type',
+                                     ignore_duplicates=True, returning=False)
+                self._known_aliases.update((row['alias'], row['entity_type']) for row in new_aliases)
+
+            return {pair: self._ids[(key, pair[1])] for pair, key in keyed.items()}
+
+    def lookup(self, name: str, entity_type: Optional[str] = None) -> List[int]:
+        """Returns the ids of registered entities the name refers to (one per type), without registering anything."""
+        return self.lookup_many([name], entity_type)[name]
+
+    def lookup_many(self, names: List[str], entity_type: Optional[str] = None) -> Dict[str, List[int]]:
+        """Like lookup for several names at once, reading the alias index once per LOOKUP_CHUNK_SIZE keys."""
+        keyed = {name: normalize_entity_name(name) for name in names}
+        keys = sorted(set(keyed.values()))
+        ids_by_key: Dict[str, set] = {}
+        for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+            filters = [('alias_key', 'in', keys[start:start + LOOKUP_CHUNK_SIZE])]
+            if entity_type:
+                filters.append(('entity_type', 'eq', entity_type))
+            for row in get_storage().select('entity_aliases', 'alias_key, entity_id', filters):
+                ids_by_key.setdefault(row['alias_key'], set()).add(row['entity_id'])
+        return {name: sorted(ids_by_key.get(key, ())) for name, key in keyed.items()}
+
+    def aliases(self, entity_ids: List[int]) -> List[Tuple[str, str]]:
+        """Returns every (surface name, entity_type) stored for the given entities."""
+        return sorted({pair for pairs in self.aliases_by_entity(entity_ids).values() for pair in pairs})
+
+    def aliases_by_entity(self, entity_ids: List[int]) -> Dict[int, List[Tuple[str, str]]]:
+        """Returns the (surface name, entity_type) pairs stored for each of the given entities."""
+        pairs: Dict[int, set] = {}
+        for start in range(0, len(entity_ids), LOOKUP_CHUNK_SIZE):
+            for row in get_storage().select('entity_aliases', 'alias, entity_type, entity_id',
+                                            [('entity_id', 'in', entity_ids[start:start + LOOKUP_CHUNK_SIZE])]):
+                pairs.setdefault(row['entity_id'], set()).add((row['alias'], row['entity_type']))
+        return {entity_id: sorted(entity_pairs) for entity_id, entity_pairs in pairs.items()}
+
+_registry: Optional[EntityRegistry] = None
+_registry_lock = threading.Lock()
+
+def get_entity_registry() -> EntityRegistry:
+    """Returns the process-wide entity registry."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = EntityRegistry()
+    return _registry
@@ -0,0 +1,278 @@
+# analysis/entity_search.py
+
+import os
+import time
+import threading
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+
+from storage import get_storage
+from analysis.entity_registry import normalize_entity_name
+
+# --- Search Configuration ---
+# A process that didn't run the pipeline itself picks up new entities after this many seconds.
+ENTITY_SEARCH_REFRESH_SECONDS = float(os.getenv("ENTITY_SEARCH_REFRESH_SECONDS", 300))
+# Matches scoring below this trigram similarity are dropped, unless the name starts with the query.
+MIN_SIMILARITY = 0.2
+# Bonus that ranks names starting with the query (type-ahead) above merely similar ones.
+PREFIX_BONUS = 1.0
+# Names per `in` filter when reading mention counts from the rollups.
+COUNT_CHUNK_SIZE = 200
+# Times the rollups are reread when a commit lands while the index reads them; see _read_mentions.
+MENTION_READ_ATTEMPTS = 3
+
+
+def _trigrams(key: str, partial_last_word: bool = False) -> Set[str]:
+    """
+    Trigrams of each word padded like pg_trgm ('  w', ' wo', ..., 'rd '). With
+    partial_last_word, the last word gets no trailing pad, so a half-typed word
+    matches every word it is a prefix of.
+    """
+    words = key.split()
+    grams = set()
+    for i, word in enumerate(words):
+        padded = f"  {word}" if partial_last_word and i == len(words) - 1 else f"  {word} "
+        grams.update(padded[j:j + 3] for j in range(len(padded) - 2))
+    return grams
+
+
+class EntitySearchIndex:
+    """
+    In-memory trigram index over the registered entity names, for type-ahead search.
+
+    Every alias key of an entity is indexed, so a search finds it under any spelling
+    the analyzer produced. The index is built on first use and then refreshed
+    incrementally: only entities, aliases and sentiments with ids above the last
+    seen ones are read, so a refresh after a pipeline run costs a few small queries.
+    Scoring runs on numpy arrays, so a search touches each candidate name once in C.
+
+    Rows are read from storage without holding the index lock, which only covers
+    adding them to the index; searches keep running while a build or refresh waits
+    on the database.
+    """
+    def __init__(self):
+        # Guards the in-memory index; held by searches and while fetched rows are added.
+        self._lock = threading.Lock()
+        # Serializes builds and refreshes, so the same rows are never read and counted twice.
+        self._refresh_lock = threading.Lock()
+        self._built = False
+        self._refreshed_at = 0.0
+        self._last_ids = {'entities': 0, 'entity_aliases': 0, 'sentiments': 0}
+        # Entities by dense position; _positions maps entity ids to it.
+        self._positions: Dict[int, int] = {}
+        self._entity_ids: List[int] = []
+        self._names: List[str] = []
+        self._types = np.empty(0, dtype=object)
+        self._mentions = np.zeros(0, dtype=np.int64)
+        # One doc per distinct (entity, alias key).
+        self._indexed: Set[tuple] = set()
+        self._doc_keys: List[str] = []
+        self._doc_positions = np.zeros(0, dtype=np.int64)
+        self._doc_sizes = np.zeros(0, dtype=np.int64)
+        self._postings: Dict[str, List[int]] = {}
+        self._posting_arrays: Dict[str, np.ndarray] = {}
+
+    # --- Building ---
+    def _fetch_new_rows(self) -> tuple:
+        """Reads the entities and aliases stored since the last build or refresh, with each alias's trigrams."""
+        storage = get_storage()
+        entities = list(storage.iter_rows('entities', 'id, name, entity_type', [('id', 'gt', self._last_ids['entities'])]))
+        aliases = [
+            (row, _trigrams(row['alias_key'] or ''))
+            for row in storage.iter_rows('entity_aliases', 'id, alias, entity_type, alias_key, entity_id',
+                                         [('id', 'gt', self._last_ids['entity_aliases'])])
+        ]
+        return entities, aliases
+
+    def _apply(self, entities: List[Dict[str, Any]], aliases: List[tuple], mentions: Dict[int, int]):
+        """
+        Adds fetched entities, aliases and mention counts to the index. New entities are
+        collected in lists and the arrays grow once per call, not once per entity.
+        """
+        with self._lock:
+            known = len(self._entity_ids)
+            new_types: List[Optional[str]] = []
+
+            def position_of(entity_id: int, name: str, entity_type: str) -> int:
+                position = self._positions.get(entity_id)
+                if position is None:
+                    position = self._positions[entity_id] = len(self._entity_ids)
+                    self._entity_ids.append(entity_id)
+                    self._names.append(name)
+                    new_types.append(entity_type)
+                return position
+
+            for row in entities:
+                position = position_of(row['id'], row['name'], row['entity_type'])
+                self._names[position] = row['name']
+                if position < known:
+                    self._types[position] = row['entity_type']
+                else:
+                    new_types[position - known] = row['entity_type']
+
+            positions, sizes = [], []
+            for row, grams in aliases:
+                if (row['entity_id'], row['alias_key']) in self._indexed or not row['alias_key']:
+                    continue
+                self._indexed.add((row['entity_id'], row['alias_key']))
+                doc = len(self._doc_keys)
+                self._doc_keys.append(row['alias_key'])
+                positions.append(position_of(row['entity_id'], row['alias'], row['entity_type']))
+                sizes.append(len(grams))
+                for gram in grams:
+                    self._postings.setdefault(gram, []).append(doc)
+                    self._posting_arrays.pop(gram, None)
+
+            if new_types:
+                self._types = np.concatenate((self._types, np.array(new_types, dtype=object)))
+                self._mentions = np.concatenate((self._mentions, np.zeros(len(new_types), dtype=np.int64)))
+            if positions:
+                self._doc_positions = np.concatenate((self._doc_positions, np.array(positions, dtype=np.int64)))
+                self._doc_sizes = np.concatenate((self._doc_sizes, np.array(sizes, dtype=np.int64)))
+            for entity_id, count in mentions.items():
+                position = self._positions.get(entity_id)
+                if position is not None:
+                    self._mentions[position] += count
+
+        if entities:
+            self._last_ids['entities'] = entities[-1]['id']
+        if aliases:
+            self._last_ids['entity_aliases'] = aliases[-1][0]['id']
+
+    def _posting_array(self, gram: str) -> np.ndarray:
+        array = self._posting_arrays.get(gram)
+        if array is None:
+            array = self._posting_arrays[gram] = np.array(self._postings[gram], dtype=np.int64)
+        return array
+
+    @staticmethod
+    def _sentiment_watermark() -> int:
+        rows = get_storage().select('sentiments', 'id', order_by='id', desc=True, limit=1)
+        return rows[0]['id'] if rows else 0
+
+    def _read_mentions(self, alias_entities: Dict[tuple, int]) -> tuple:
+        """
+        Sums the rollup totals of each entity's aliases. Returns the totals and the id of
+        the newest sentiment they include, which the next refresh counts from.
+
+        The rollups are read in several requests, so the newest sentiment id is read before
+        and after them; if a commit landed in between, the rollups are read again, so its
+        sentiments are neither missed by the next refresh nor counted twice. After
+        MENTION_READ_ATTEMPTS, the later id is kept: counts may then miss a commit, never
+        double it, and they only rank search results.
+        """
+        names = sorted({alias for alias, _ in alias_entities})
+        for _ in range(MENTION_READ_ATTEMPTS):
+            watermark = self._sentiment_watermark()
+            mentions: Dict[int, int] = {}
+            for start in range(0, len(names), COUNT_CHUNK_SIZE):
+                for row in get_storage().select('entity_sentiment_counts', 'entity_name, entity_type, total',
+                                                [('entity_name', 'in', names[start:start + COUNT_CHUNK_SIZE])]):
+                    entity_id = alias_entities.get((row['entity_name'], row['entity_type']))
+                    if entity_id is not None:
+                        mentions[entity_id] = mentions.get(entity_id, 0) + row['total']
+            latest = self._sentiment_watermark()
+            if latest == watermark:
+                break
+        return mentions, latest
+
+    def build(self):
+        """Indexes every registered entity, with mention counts taken from the entity rollups."""
+        with self._refresh_lock:
+            if self._built:
+                return
+            started = time.perf_counter()
+            entities, aliases = self._fetch_new_rows()
+            mentions, watermark = self._read_mentions(
+                {(row['alias'], row['entity_type']): row['entity_id'] for row, _ in aliases}
+            )
+            self._apply(entities, aliases, mentions)
+            self._last_ids['sentiments'] = watermark
+            self._built = True
+            self._refreshed_at = time.monotonic()
+            print(f"Entity search index built: {len(self._entity_ids)} entities, {len(self._doc_keys)} names "
+                  f"in {(time.perf_counter() - started) * 1000:.0f} ms.")
+
+    def refresh(self, max_age: Optional[float] = None):
+        """
+        Adds entities, aliases and mentions stored since the last build or refresh.
+        With `max_age`, does nothing if the index was refreshed less than that many seconds ago.
+        """
+        with self._refresh_lock:
+            if not self._built or (max_age is not None and time.monotonic() - self._refreshed_at <= max_age):
+                return
+            entities, aliases = self._fetch_new_rows()
+            mentions: Dict[int, int] = {}
+            watermark = self._last_ids['sentiments']
+            for row in get_storage().iter_rows('sentiments', 'id, entity_id', [('id', 'gt', watermark)]):
+                if row['entity_id'] is not None:
+                    mentions[row['entity_id']] = mentions.get(row['entity_id'], 0) + 1
+                watermark = row['id']
+            self._apply(entities, aliases, mentions)
+            self._last_ids['sentiments'] = watermark
+            self._refreshed_at = time.monotonic()
+
+    # --- Searching ---
+    def search(self, query: str, limit: int = 10, entity_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Returns up to `limit` entities matching the query, best first.
+
+        Names are scored by trigram similarity to the query, plus PREFIX_BONUS if
+        they start with it; ties go to the entity with more mentions. Each entity is
+        returned once, with the score of its best-matching name.
+        """
+        if not self._built:
+            self.build()
+        else:
+            self.refresh(max_age=ENTITY_SEARCH_REFRESH_SECONDS)
+
+        with self._lock:
+            key = normalize_entity_name(query)
+            grams = _trigrams(key, partial_last_word=True)
+            postings = [self._posting_array(gram) for gram in grams if gram in self._postings]
+            if not postings:
+                return []
+            hits = np.bincount(np.concatenate(postings), minlength=len(self._doc_keys))
+            docs = np.flatnonzero(hits)
+            shared = hits[docs]
+            scores = shared / (len(grams) + self._doc_sizes[docs] - shared)
+            # A name can only start with the query if it contains every query trigram.
+            for i in np.flatnonzero(shared == len(grams)):
+                if self._doc_keys[docs[i]].startswith(key):
+                    scores[i] += PREFIX_BONUS
+
+            positions = self._doc_positions[docs]
+            keep = scores >= MIN_SIMILARITY
+            if entity_type:
+                keep &= self._types[positions] == entity_type
+            positions, scores = positions[keep], np.round(scores[keep], 4)
+            order = np.lexsort((-self._mentions[positions], -scores))
+
+            results, seen = [], set()
+            for i in order:
+                position = int(positions[i])
+                if position in seen:
+                    continue
+                seen.add(position)
+                results.append({
+                    'entity_id': self._entity_ids[position], 'entity_name': self._names[position],
+                    'entity_type': self._types[position], 'mentions': int(self._mentions[position]),
+                    'score': float(scores[i])
+                })
+                if len(results) == limit:
+                    break
+            return results
+
+
+_index: Optional[EntitySearchIndex] = None
+_index_lock = threading.Lock()
+
+def get_entity_search_index() -> EntitySearchIndex:
+    """Returns the process-wide entity search index."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = EntitySearchIndex()
+    return _index
@@ -0,0 +1,133 @@
+# analysis/near_duplicates.py
+
+import os
+import struct
+import hashlib
+import threading
+from typing import List, Optional, Tuple
+
+from analysis.result_cache import normalize_text
+from storage import get_storage
+
+# --- Index Configuration ---
+# Articles whose estimated Jaccard similarity reaches this value are treated as the same story.
+SIMILARITY_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", 0.8))
+SHINGLE_SIZE = 5      # words per shingle
+NUM_PERMUTATIONS = 128
+NUM_BANDS = 16        # 16 bands of 8 rows: ~95% recall at 0.8 similarity, ~6% candidates at 0.5
+ROWS_PER_BAND = NUM_PERMUTATIONS // NUM_BANDS
+# Texts shorter than this many words carry too little signal to fingerprint reliably.
+MIN_WORDS = 50
+
+_MERSENNE_PRIME = (1 << 61) - 1
+
+def _permutation_params() -> List[Tuple[int, int]]:
+    """Deterministic (a, b) pairs for the universal hash family, stable across processes."""
+    params = []
+    for i in range(NUM_PERMUTATIONS):
+        seed = hashlib.sha256(f"minhash-{i}".encode('utf-8')).digest()
+        a = int.from_bytes(seed[:8], 'big') % (_MERSENNE_PRIME - 1) + 1
+        b = int.from_bytes(seed[8:16], 'big') % _MERSENNE_PRIME
+        params.append((a, b))
+    return params
+
+_PERMUTATIONS = _permutation_params()
+
+
+def compute_signature(text: str) -> Optional[Tuple[int, ...]]:
+    """
+    Computes the MinHash signature of a text over its word shingles.
+
+    Returns:
+        A tuple of NUM_PERMUTATIONS hash values, or None if the text is too short.
+    """
+    words = normalize_text(text).split()
+    if len(words) < MIN_WORDS:
+        return None
+    shingles = {
+        int.from_bytes(hashlib.blake2b(' '.join(words[i:i + SHINGLE_SIZE]).encode('utf-8'), digest_size=8).digest(), 'big')
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+    return tuple(
+        min((a * shingle + b) % _MERSENNE_PRIME for shingle in shingles)
+        for a, b in _PERMUTATIONS
+    )
+
+def estimate_similarity(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+    """Estimates the Jaccard similarity of two texts from their signatures."""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+def encode_signature(signature: Tuple[int, ...]) -> str:
+    """Packs a signature into the hex string stored in near_duplicate_signatures."""
+    return struct.pack(f'>{NUM_PERMUTATIONS}Q', *signature).hex()
+
+def decode_signature(value: str) -> Tuple[int, ...]:
+    """Inverse of encode_signature."""
+    return struct.unpack(f'>{NUM_PERMUTATIONS}Q', bytes.fromhex(value))
+
+def _band_keys(signature: Tuple[int, ...]) -> List[str]:
+    """Hashes each band of the signature into an LSH bucket key."""
+    keys = []
+    for band in range(NUM_BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(struct.pack(f'>{ROWS_PER_BAND}Q', *rows), digest_size=8).hexdigest()
+        keys.append(f"{band}:{digest}")
+    return keys
+
+
+class NearDuplicateIndex:
+    """
+    A MinHash LSH index over canonical articles, stored in the near_duplicate_signatures
+    and near_duplicate_buckets tables next to the articles themselves, so every process
+    and every redeploy sees the same history. A lookup is one indexed query over the
+    text's NUM_BANDS bucket keys and one read of the few candidate signatures, so its
+    cost does not grow with the size of the corpus.
+    """
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        # Serializes a final lookup with the add that follows it; see database._index_canonical_article.
+        self.lock = threading.Lock()
+
+    def find_canonical(self, signature: Tuple[int, ...]) -> Optional[int]:
+        """Returns the id of the most similar indexed article above the threshold, if any."""
+        storage = get_storage()
+        buckets = storage.select('near_duplicate_buckets', 'article_id', [('bucket_key', 'in', _band_keys(signature))])
+        candidate_ids = sorted({row['article_id'] for row in buckets})
+        if not candidate_ids:
+            return None
+
+        best_id, best_similarity = None, self.threshold
+        for row in storage.select('near_duplicate_signatures', 'article_id, signature', [('article_id', 'in', candidate_ids)]):
+            similarity = estimate_similarity(signature, decode_signature(row['signature']))
+            if similarity >= best_similarity:
+                best_id, best_similarity = row['article_id'], similarity
+        return best_id
+
+    def add(self, article_id: int, signature: Tuple[int, ...]):
+        """Indexes a canonical article so that later near-duplicates resolve to it. Re-adding is harmless."""
+        self.add_many([(article_id, signature)])
+
+    def add_many(self, entries: List[Tuple[int, Tuple[int, ...]]]):
+        """Indexes several canonical articles with one upsert per table."""
+        if not entries:
+            return
+        storage = get_storage()
+        storage.upsert('near_duplicate_signatures',
+                       [{'article_id': article_id, 'signature': encode_signature(signature)} for article_id, signature in entries],
+                       on_conflict='article_id', returning=False)
+        storage.upsert('near_duplicate_buckets',
+                       [{'bucket_key': key, 'article_id': article_id} for article_id, signature in entries for key in _band_keys(signature)],
+                       on_conflict='bucket_key,article_id', ignore_duplicates=True, returning=False)
+
+
+_index: Optional[NearDuplicateIndex] = None
+_index_lock = threading.Lock()
+
+def get_near_duplicate_index() -> NearDuplicateIndex:
+    """Returns the process-wide near-duplicate index."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = NearDuplicateIndex()
+    return _index
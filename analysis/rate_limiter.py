@@ -0,0 +1,194 @@
+# analysis/rate_limiter.py
+
+import os
+import re
+import time
+import random
+import asyncio
+import threading
+from typing import Dict, Optional, Tuple, Any
+
+# --- Default Limits ---
+# Conservative starting points (requests per minute, tokens per minute). They are
+# replaced by the real limits as soon as a provider reports them in its headers.
+DEFAULT_LIMITS = {
+    'openai': (500, 200000),
+    'groq': (30, 6000),
+}
+FALLBACK_LIMITS = (60, 60000)
+
+# --- Backoff Configuration ---
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# Connection-level errors raised by the OpenAI/Groq SDKs carry no status code.
+RETRYABLE_ERROR_NAMES = {'APIConnectionError', 'APITimeoutError', 'RateLimitError', 'InternalServerError'}
+
+
+class TokenBucket:
+    """A thread-safe token bucket that refills continuously up to a per-minute capacity."""
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.capacity / 60.0)
+        self.updated_at = now
+
+    def reserve(self, amount: float) -> float:
+        """
+        Takes `amount` from the bucket, letting the balance go negative, and returns
+        how many seconds the caller has to wait until that debt is repaid.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            # A single request larger than the whole bucket still goes through, it just waits for a full refill.
+            self.tokens -= min(amount, self.capacity)
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens * 60.0 / self.capacity
+
+    def adjust(self, amount: float):
+        """Returns (positive) or takes (negative) tokens, e.g. to correct an estimate."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+    def sync(self, limit: Optional[float] = None, remaining: Optional[float] = None):
+        """Aligns the bucket with limits reported by the provider."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if limit:
+                self.capacity = float(limit)
+            if remaining is not None:
+                self.tokens = min(self.tokens, float(remaining))
+
+
+class ProviderRateLimiter:
+    """
+    Tracks requests-per-minute and tokens-per-minute for one provider/model pair.
+    Callers reserve capacity before each request and report actual usage afterwards.
+    """
+    def __init__(self, provider: str, model_name: str, requests_per_minute: Optional[int] = None,
+                 tokens_per_minute: Optional[int] = None):
+        default_rpm, default_tpm = DEFAULT_LIMITS.get(provider, FALLBACK_LIMITS)
+        self.provider = provider
+        self.model_name = model_name
+        self.requests = TokenBucket(requests_per_minute or default_rpm)
+        self.tokens = TokenBucket(tokens_per_minute or default_tpm)
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self, estimated_tokens: int) -> float:
+        wait = max(self.requests.reserve(1), self.tokens.reserve(estimated_tokens))
+        with self._lock:
+            pause = self._paused_until - time.monotonic()
+        return max(wait, pause, 0.0)
+
+    def acquire(self, estimated_tokens: int):
+        """Blocks until a request of roughly `estimated_tokens` tokens may be sent."""
+        wait = self._reserve(estimated_tokens)
+        if wait > 0:
+            print(f"Rate limiter ({self.provider}/{self.model_name}): waiting {wait:.2f}s")
+            time.sleep(wait)
+
+    async def aacquire(self, estimated_tokens: int):
+        """Async counterpart of acquire that yields to the event loop while waiting."""
+        wait = self._reserve(estimated_tokens)
+        if wait > 0:
+            print(f"Rate limiter ({self.provider}/{self.model_name}): waiting {wait:.2f}s")
+            await asyncio.sleep(wait)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """Corrects the token bucket once the real usage of a request is known."""
+        if actual_tokens:
+            self.tokens.adjust(estimated_tokens - actual_tokens)
+
+    def pause(self, seconds: float):
+        """Holds back every caller of this limiter, e.g. after a 429 response."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def update_from_headers(self, headers: Optional[Dict[str, Any]]):
+        """
+        Reads the x-ratelimit-* headers returned by OpenAI and Groq and aligns both
+        buckets with the limits and remaining budget the provider reports.
+        """
+        if not headers:
+            return
+        headers = {str(k).lower(): v for k, v in dict(headers).items()}
+        for kind, bucket in (('requests', self.requests), ('tokens', self.tokens)):
+            limit = _to_float(headers.get(f'x-ratelimit-limit-{kind}'))
+            remaining = _to_float(headers.get(f'x-ratelimit-remaining-{kind}'))
+            if limit or remaining is not None:
+                bucket.sync(limit, remaining)
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def parse_duration(value: Any) -> Optional[float]:
+    """Parses durations like '20ms', '1.5s' or '6m0s' (and plain seconds) into seconds."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    seconds = _to_float(value)
+    if seconds is not None:
+        return seconds
+    parts = re.findall(r'(\d+(?:\.\d+)?)(ms|h|m|s)', value)
+    if not parts:
+        return None
+    scale = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+def retry_delay_for(error: Exception, attempt: int) -> Optional[float]:
+    """
+    Decides whether a failed LLM call should be retried.
+
+    Returns:
+        The jittered backoff delay in seconds for rate-limit (429), server (5xx) and
+        connection errors, or None when the error is not worth retrying.
+    """
+    status_code = getattr(error, 'status_code', None)
+    if status_code not in RETRYABLE_STATUS_CODES and type(error).__name__ not in RETRYABLE_ERROR_NAMES:
+        return None
+
+    # Full jitter keeps concurrent workers from retrying in lockstep.
+    delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    retry_after = parse_duration(headers.get('retry-after')) or parse_duration(headers.get('x-ratelimit-reset-requests'))
+    if status_code == 429 and retry_after:
+        delay = max(delay, retry_after)
+    return delay
+
+def get_error_headers(error: Exception) -> Optional[Dict[str, Any]]:
+    """Returns the HTTP response headers attached to an SDK error, if any."""
+    return getattr(getattr(error, 'response', None), 'headers', None)
+
+
+# --- Shared Limiters ---
+# One limiter per (provider, model) is shared by every analyzer in the process,
+# so concurrent pipelines and workers draw from the same budget.
+_limiters: Dict[Tuple[str, str], ProviderRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(provider: str, model_name: str) -> ProviderRateLimiter:
+    """Returns the process-wide rate limiter for a provider and model."""
+    key = (provider, model_name)
+    with _limiters_lock:
+        if key not in _limiters:
+            rpm = os.getenv("LLM_REQUESTS_PER_MINUTE")
+            tpm = os.getenv("LLM_TOKENS_PER_MINUTE")
+            _limiters[key] = ProviderRateLimiter(
+                provider, model_name,
+                requests_per_minute=int(rpm) if rpm else None,
+                tokens_per_minute=int(tpm) if tpm else None
+            )
+        return _limiters[key]
@@ -0,0 +1,107 @@
+# analysis/result_cache.py
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+# --- Cache Configuration ---
+CACHE_DB_PATH = os.getenv("ANALYSIS_CACHE_PATH", "analysis_cache.db")
+CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", 50000))
+
+
+def normalize_text(text: str) -> str:
+    """Normalizes article text so that trivially different copies of a story hash the same."""
+    text = unicodedata.normalize('NFKC', text or '')
+    return ' '.join(text.split()).casefold()
+
+def make_cache_key(text: str, provider: str, model_name: str, prompt_version: str) -> str:
+    """Builds the cache key from the normalized text and everything that shapes the LLM output."""
+    digest = hashlib.sha256()
+    for part in (provider, model_name, prompt_version, normalize_text(text)):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """
+    A persistent, size-bounded cache of validated analysis results, stored in a
+    local SQLite file. Entries are evicted least-recently-used first once the
+    cache grows beyond `max_entries`.
+    """
+    def __init__(self, path: str = CACHE_DB_PATH, max_entries: int = CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute('''
+        CREATE TABLE IF NOT EXISTS analysis_cache (
+            cache_key TEXT PRIMARY KEY, entities TEXT NOT NULL, usage TEXT NOT NULL,
+            created_at REAL NOT NULL, last_accessed REAL NOT NULL
+        )''')
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_cache_last_accessed ON analysis_cache (last_accessed)")
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+
+    def get(self, key: str) -> Optional[Tuple[List[Dict[str, Any]], Dict[str, Any]]]:
+        """Returns the cached (entities, usage) for a key, or None on a miss."""
+        with self._lock:
+            row = self._conn.execute("SELECT entities, usage FROM analysis_cache WHERE cache_key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE analysis_cache SET last_accessed = ? WHERE cache_key = ?", (time.time(), key))
+            self._conn.commit()
+        return json.loads(row[0]), json.loads(row[1])
+
+    def put(self, key: str, entities: List[Dict[str, Any]], usage: Dict[str, Any]):
+        """Stores a validated result, evicting the least recently used entries if needed."""
+        now = time.time()
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM analysis_cache WHERE cache_key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analysis_cache (cache_key, entities, usage, created_at, last_accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(entities), json.dumps(usage), now, now)
+            )
+            if not exists:
+                self._size += 1
+            if self._size > self.max_entries:
+                excess = self._size - self.max_entries
+                self._conn.execute(
+                    "DELETE FROM analysis_cache WHERE cache_key IN (SELECT cache_key FROM analysis_cache ORDER BY last_accessed LIMIT ?)",
+                    (excess,)
+                )
+                self._size -= excess
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters and the current number of entries."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits, 'misses': self.misses,
+                'hit_rate': (self.hits / total) if total else 0.0,
+                'entries': self._size, 'max_entries': self.max_entries
+            }
+
+
+_cache: Optional[AnalysisCache] = None
+_cache_lock = threading.Lock()
+
+def get_analysis_cache() -> AnalysisCache:
+    """Returns the process-wide analysis cache."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AnalysisCache()
+    return _cache
@@ -1,8 +1,9 @@
 # analysis/sentiment_analyzer.py
 
 import os
+import hashlib
 from dotenv import load_dotenv
-from typing import List, Literal, Any
+from typing import Dict, List, Literal, Any, Optional
 
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic.v1 import BaseModel, Field, ValidationError
@@ -12,12 +13,25 @@ from langchain_groq import ChatGroq
 from langchain_community.callbacks import get_openai_callback
 from langchain_core.callbacks import BaseCallbackHandler
 
+from analysis.rate_limiter import get_rate_limiter, get_error_headers, retry_delay_for
+from analysis.result_cache import AnalysisCache, get_analysis_cache, make_cache_key
+
 # --- Default Configuration ---
 # These values are used if no specific configuration is passed during initialization.
 load_dotenv()
 DEFAULT_LLM_PROVIDER = 'openai'
 DEFAULT_OPENAI_MODEL_NAME = 'gpt-4o-mini'
 DEFAULT_GROQ_MODEL_NAME = 'llama3-8b-8192'
+MAX_RETRIES = 3
+# Rate-limit (429), server (5xx) and connection errors get their own, larger retry budget.
+MAX_TRANSIENT_RETRIES = 6
+# Added to the article's own token estimate when reserving tokens-per-minute capacity.
+PROMPT_TOKEN_OVERHEAD = 400
+COMPLETION_TOKEN_ESTIMATE = 500
+
+# --- Errors ---
+class AnalysisError(Exception):
+    """Raised when an article could not be analyzed. Nothing is stored for it, so the next run retries it."""
 
 # --- Pydantic Data Structures ---
 # Defines the expected JSON output structure for the AI model.
@@ -45,6 +59,27 @@ class TextAnalysis(BaseModel):
         description="A list of valid entities. This list MUST be empty if no valid entities are found."
     )
 
+# --- Prompt ---
+SYSTEM_PROMPT = """
+You are a highly precise financial analyst. Your task is to extract **only legitimate companies and cryptocurrencies** from the provided text and analyze them from two different perspectives: **financial sentiment** and **overall sentiment**.
+
+**CRITICAL RULES:**
+1.  **RESOLVE FULL ENTITY NAME:** You MUST return the full, official name of the entity (e.g., "IBM" becomes "International Business Machines").
+2.  **DO NOT EXTRACT LOCATIONS:** Ignore countries, cities, etc.
+3.  **EMPTY LIST IS VALID:** If you find no valid entities, return an empty list.
+
+**RULES FOR DUAL SENTIMENT ANALYSIS:**
+1.  **Financial Sentiment:** Strictly about quantitative performance (stocks, earnings).
+2.  **Overall Sentiment:** About qualitative, operational news (products, partnerships).
+
+**OUTPUT FORMAT:**
+For each valid entity, provide its resolved official name, type, financial sentiment, overall sentiment, and a brief reasoning. **It is critical that every entity object in your JSON output contains all required fields.**
+"""
+
+# Identifies the prompt and output schema. Cached results are only reused for the same version,
+# so any edit to the prompt or to the Pydantic models invalidates them automatically.
+PROMPT_VERSION = hashlib.sha256((SYSTEM_PROMPT + TextAnalysis.schema_json()).encode('utf-8')).hexdigest()[:12]
+
 # --- Groq Callback for Token Tracking ---
 class GroqTokenUsageCallback(BaseCallbackHandler):
     """Callback handler to capture token usage from Groq, as it's not natively supported like OpenAI's."""
@@ -61,10 +96,11 @@ class SentimentAnalyzer:
     """
     A configurable class to perform sentiment analysis using different LLM providers.
     """
-    def __init__(self, provider=None, model_name=None, openai_api_key=None, groq_api_key=None):
+    def __init__(self, provider=None, model_name=None, openai_api_key=None, groq_api_key=None, cache: Optional[AnalysisCache] = None, use_cache=True):
         """
         Initializes the analyzer with specific or default configurations.
         Allows for API keys and model details to be passed directly, bypassing .env files if needed.
+        Results are cached by content hash unless `use_cache` is False.
         """
         self.provider = provider or DEFAULT_LLM_PROVIDER
         
@@ -76,8 +112,20 @@ class SentimentAnalyzer:
         self.openai_api_key = openai_api_key or os.getenv("OPENAI_API_KEY")
         self.groq_api_key = groq_api_key or os.getenv("GROQ_API_KEY")
 
+        # Shared by every analyzer using the same provider and model.
+        self.rate_limiter = get_rate_limiter(self.provider, self.model_name)
+        self.cache = self._open_cache(cache) if use_cache else None
         self.chain = self._initialize_chain()
 
+    @staticmethod
+    def _open_cache(cache: Optional[AnalysisCache]) -> Optional[AnalysisCache]:
+        """Returns the analysis cache, or None (caching disabled) if it can't be opened."""
+        try:
+            return cache or get_analysis_cache()
+        except Exception as e:
+            print(f"Could not open analysis cache, continuing without it: {e}")
+            return None
+
     def _initialize_chain(self):
         """Initializes and returns the appropriate language model and LangChain chain."""
         llm = None
@@ -85,73 +133,189 @@ class SentimentAnalyzer:
             print(f"Initializing OpenAI model: {self.model_name}")
             if not self.openai_api_key:
                 raise ValueError("OpenAI API key not found. Please provide it in the API call or set it in the .env file.")
-            llm = ChatOpenAI(model_name=self.model_name, temperature=0, api_key=self.openai_api_key)
+            # Response headers carry the x-ratelimit-* values used by the rate limiter. Retries are left
+            # to _check_retry: the SDK's own would bypass the limiter and multiply its retry budget.
+            llm = ChatOpenAI(model_name=self.model_name, temperature=0, api_key=self.openai_api_key,
+                             include_response_headers=True, max_retries=0)
         
         elif self.provider == 'groq':
             print(f"Initializing Groq model: {self.model_name}")
             if not self.groq_api_key:
                 raise ValueError("Groq API key not found. Please provide it in the API call or set it in the .env file.")
-            llm = ChatGroq(model_name=self.model_name, temperature=0, api_key=self.groq_api_key)
+            llm = ChatGroq(model_name=self.model_name, temperature=0, api_key=self.groq_api_key, max_retries=0)
         
         else:
             raise ValueError(f"Unsupported LLM provider: {self.provider}. Please choose 'openai' or 'groq'.")
 
-        structured_llm = llm.with_structured_output(TextAnalysis)
-        
-        system_prompt = """
-        You are a highly precise financial analyst. Your task is to extract **only legitimate companies and cryptocurrencies** from the provided text and analyze them from two different perspectives: **financial sentiment** and **overall sentiment**.
+        # include_raw keeps the AIMessage (and its response metadata) next to the parsed result.
+        structured_llm = llm.with_structured_output(TextAnalysis, include_raw=True)
         
-        **CRITICAL RULES:**
-        1.  **RESOLVE FULL ENTITY NAME:** You MUST return the full, official name of the entity (e.g., "IBM" becomes "International Business Machines").
-        2.  **DO NOT EXTRACT LOCATIONS:** Ignore countries, cities, etc.
-        3.  **EMPTY LIST IS VALID:** If you find no valid entities, return an empty list.
-        
-        **RULES FOR DUAL SENTIMENT ANALYSIS:**
-        1.  **Financial Sentiment:** Strictly about quantitative performance (stocks, earnings).
-        2.  **Overall Sentiment:** About qualitative, operational news (products, partnerships).
-        
-        **OUTPUT FORMAT:**
-        For each valid entity, provide its resolved official name, type, financial sentiment, overall sentiment, and a brief reasoning. **It is critical that every entity object in your JSON output contains all required fields.**
-        """
         prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
+            ("system", SYSTEM_PROMPT),
             ("human", "{text}")
         ])
         return prompt | structured_llm
 
     def analyze_text_for_sentiment(self, text: str):
-        """Analyzes text using the configured chain, with retry logic for robustness."""
-        if not self.chain:
-            print("Chain not initialized.")
-            return [], {}
-            
-        print(f"\nAnalyzing article for sentiment with dual analysis using {self.provider} ({self.model_name})...")
-        
-        MAX_RETRIES = 3
-        for attempt in range(MAX_RETRIES):
+        """
+        Analyzes text using the configured chain, with retry logic for robustness.
+        Every attempt first takes capacity from the shared rate limiter; rate-limit,
+        server and connection errors are retried with jittered exponential backoff.
+
+        Raises:
+            AnalysisError: If no valid result was obtained; the article is then left unanalyzed.
+        """
+        cached = self._start_analysis(text)
+        if cached is not None:
+            return cached
+
+        estimated_tokens = self._estimate_tokens(text)
+        failures = {'validation': 0, 'transient': 0}
+        while True:
+            self.rate_limiter.acquire(estimated_tokens)
+            try:
+                entities, usage_stats = self._invoke(text)
+            except Exception as e:
+                self._check_retry(e, failures)
+                continue
+            return self._finish_analysis(text, estimated_tokens, entities, usage_stats)
+
+    async def aanalyze_text_for_sentiment(self, text: str):
+        """Async counterpart of analyze_text_for_sentiment, built on the chain's ainvoke."""
+        cached = self._start_analysis(text)
+        if cached is not None:
+            return cached
+
+        estimated_tokens = self._estimate_tokens(text)
+        failures = {'validation': 0, 'transient': 0}
+        while True:
+            await self.rate_limiter.aacquire(estimated_tokens)
             try:
-                if self.provider == 'openai':
-                    with get_openai_callback() as cb:
-                        response = self.chain.invoke({"text": text})
-                        usage_stats = {"total_tokens": cb.total_tokens, "prompt_tokens": cb.prompt_tokens, "completion_tokens": cb.completion_tokens, "total_cost_usd": cb.total_cost}
-                        print(f"OpenAI Usage: {usage_stats['total_tokens']} tokens. Cost: ${usage_stats['total_cost_usd']:.6f} USD")
-                        return response.entities, usage_stats
-
-                elif self.provider == 'groq':
-                    token_callback = GroqTokenUsageCallback()
-                    response = self.chain.invoke({"text": text}, config={"callbacks": [token_callback]})
-                    token_usage = token_callback.usage
-                    # Cost calculation for Groq models can be added here based on their pricing page.
-                    usage_stats = {"total_tokens": token_usage.get('total_tokens', 0), "prompt_tokens": token_usage.get('prompt_tokens', 0), "completion_tokens": token_usage.get('completion_tokens', 0), "total_cost_usd": 0.0}
-                    print(f"Groq Usage: {usage_stats['total_tokens']} tokens.")
-                    return response.entities, usage_stats
-            
-            except ValidationError as e:
-                print(f"Validation error (Attempt {attempt + 1}/{MAX_RETRIES}): {e}")
-                if attempt >= MAX_RETRIES - 1:
-                    return [], {}
-                print("Retrying...")
+                entities, usage_stats = await self._ainvoke(text)
             except Exception as e:
-                print(f"An unexpected error occurred: {e}")
-                return [], {}
-        return [], {}
+                self._check_retry(e, failures)
+                continue
+            return self._finish_analysis(text, estimated_tokens, entities, usage_stats)
+
+    def _start_analysis(self, text: str):
+        """Shared start of both analysis loops: returns the cached result, or None if the LLM must be called."""
+        if not self.chain:
+            raise AnalysisError("Chain not initialized.")
+        print(f"\nAnalyzing article for sentiment with dual analysis using {self.provider} ({self.model_name})...")
+        return self._cached_result(text)
+
+    def _finish_analysis(self, text: str, estimated_tokens: int, entities: List[EntitySentiment], usage_stats: dict):
+        """Shared end of both analysis loops: settles the token reservation and caches the result."""
+        self.rate_limiter.record_usage(estimated_tokens, usage_stats.get('total_tokens'))
+        self._store_result(text, entities, usage_stats)
+        return entities, usage_stats
+
+    def _cached_result(self, text: str):
+        """
+        Returns (entities, usage) from the cache, or None on a miss. A hit costs no
+        tokens, so its usage stats are empty and no usage log is written for it.
+        A cache that can't be read is treated as a miss.
+        """
+        if not self.cache:
+            return None
+        try:
+            cached = self.cache.get(make_cache_key(text, self.provider, self.model_name, PROMPT_VERSION))
+        except Exception as e:
+            print(f"Could not read analysis cache: {e}")
+            return None
+        if cached is None:
+            return None
+        entities, _ = cached
+        print(f"Cache hit: reusing {len(entities)} cached entities.")
+        return [EntitySentiment(**entity) for entity in entities], {}
+
+    def _store_result(self, text: str, entities: List[EntitySentiment], usage_stats: dict):
+        """Caches a validated result together with the usage it originally cost."""
+        if not self.cache:
+            return
+        try:
+            key = make_cache_key(text, self.provider, self.model_name, PROMPT_VERSION)
+            self.cache.put(key, [entity.dict() for entity in entities], usage_stats)
+        except Exception as e:
+            print(f"Could not write analysis cache: {e}")
+
+    def _invoke(self, text: str):
+        """Runs the chain once and returns the entities and usage stats."""
+        if self.provider == 'openai':
+            with get_openai_callback() as cb:
+                result = self.chain.invoke({"text": text})
+                return self._parse_result(result).entities, self._openai_usage(cb)
+
+        token_callback = GroqTokenUsageCallback()
+        result = self.chain.invoke({"text": text}, config={"callbacks": [token_callback]})
+        return self._parse_result(result).entities, self._groq_usage(token_callback)
+
+    async def _ainvoke(self, text: str):
+        """Async counterpart of _invoke."""
+        if self.provider == 'openai':
+            # The callback is bound to the current context, so concurrent tasks each see their own usage.
+            with get_openai_callback() as cb:
+                result = await self.chain.ainvoke({"text": text})
+                return self._parse_result(result).entities, self._openai_usage(cb)
+
+        token_callback = GroqTokenUsageCallback()
+        result = await self.chain.ainvoke({"text": text}, config={"callbacks": [token_callback]})
+        return self._parse_result(result).entities, self._groq_usage(token_callback)
+
+    def _parse_result(self, result: dict) -> TextAnalysis:
+        """
+        Unpacks the raw + parsed output of the structured chain. Rate-limit headers
+        from the raw response are fed to the limiter; parsing errors are re-raised.
+        """
+        raw = result.get('raw')
+        metadata = getattr(raw, 'response_metadata', None) or {}
+        self.rate_limiter.update_from_headers(metadata.get('headers'))
+        if result.get('parsing_error'):
+            raise result['parsing_error']
+        return result['parsed']
+
+    def _check_retry(self, error: Exception, failures: Dict[str, int]):
+        """
+        Decides whether a failed call is retried; shared by the sync and async loops.
+        Invalid output is retried up to MAX_RETRIES times. Rate-limit, server and
+        connection errors get MAX_TRANSIENT_RETRIES, and the shared limiter is paused
+        for a backoff delay, so every worker slows down together. `failures` counts
+        the attempts of one article and is updated in place.
+
+        Raises:
+            AnalysisError: If the call is not retried.
+        """
+        if isinstance(error, ValidationError):
+            failures['validation'] += 1
+            print(f"Validation error (Attempt {failures['validation']}/{MAX_RETRIES}): {error}")
+            if failures['validation'] >= MAX_RETRIES:
+                raise AnalysisError(f"No valid output after {MAX_RETRIES} attempts: {error}") from error
+            print("Retrying...")
+            return
+
+        self.rate_limiter.update_from_headers(get_error_headers(error))
+        delay = retry_delay_for(error, failures['transient']) if failures['transient'] < MAX_TRANSIENT_RETRIES else None
+        if delay is None:
+            raise AnalysisError(f"Analysis with {self.provider} failed: {error}") from error
+        failures['transient'] += 1
+        print(f"Transient error from {self.provider} (Attempt {failures['transient']}/{MAX_TRANSIENT_RETRIES}): {error}. Backing off {delay:.2f}s")
+        self.rate_limiter.pause(delay)
+
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        """Rough token estimate (about 4 characters per token) used to reserve TPM capacity."""
+        return len(text or '') // 4 + PROMPT_TOKEN_OVERHEAD + COMPLETION_TOKEN_ESTIMATE
+
+    def _openai_usage(self, cb) -> dict:
+        """Builds usage stats from an OpenAI callback handler."""
+        usage_stats = {"total_tokens": cb.total_tokens, "prompt_tokens": cb.prompt_tokens, "completion_tokens": cb.completion_tokens, "total_cost_usd": cb.total_cost}
+        print(f"OpenAI Usage: {usage_stats['total_tokens']} tokens. Cost: ${usage_stats['total_cost_usd']:.6f} USD")
+        return usage_stats
+
+    def _groq_usage(self, token_callback: GroqTokenUsageCallback) -> dict:
+        """Builds usage stats from the Groq token callback."""
+        token_usage = token_callback.usage
+        # Cost calculation for Groq models can be added here based on their pricing page.
+        usage_stats = {"total_tokens": token_usage.get('total_tokens', 0), "prompt_tokens": token_usage.get('prompt_tokens', 0), "completion_tokens": token_usage.get('completion_tokens', 0), "total_cost_usd": 0.0}
+        print(f"Groq Usage: {usage_stats['total_tokens']} tokens.")
+        return usage_stats
@@ -0,0 +1,80 @@
+# analysis/timeseries.py
+
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+BUCKETS = ('day', 'week', 'month')
+MAX_WINDOW = 365
+
+
+def _bucket_keys(days: np.ndarray, bucket: str) -> np.ndarray:
+    """Maps datetime64[D] days to the first day of their day, week (Monday) or month bucket."""
+    if bucket == 'week':
+        # Day 0 of the epoch (1970-01-01) was a Thursday, so (n + 3) % 7 is the weekday with Monday = 0.
+        offsets = (days.astype('int64') + 3) % 7
+        return days - offsets.astype('timedelta64[D]')
+    if bucket == 'month':
+        return days.astype('datetime64[M]').astype('datetime64[D]')
+    return days
+
+def _bucket_positions(keys: np.ndarray, bucket: str) -> np.ndarray:
+    """Calendar position of each (sorted, unique) bucket relative to the first one."""
+    if bucket == 'month':
+        months = keys.astype('datetime64[M]').astype('int64')
+        return months - months[0]
+    step = 7 if bucket == 'week' else 1
+    return (keys - keys[0]).astype('int64') // step
+
+def _window_sums(values: np.ndarray, positions: np.ndarray, window: int) -> np.ndarray:
+    """Sums each bucket's value with those of the previous window - 1 calendar buckets, gaps included."""
+    dense = np.zeros(positions[-1] + 1)
+    dense[positions] = values
+    cumulative = np.concatenate(([0.0], np.cumsum(dense)))
+    return cumulative[positions + 1] - cumulative[np.maximum(positions + 1 - window, 0)]
+
+def bucket_sentiment_series(rows: Sequence[Dict[str, Any]], bucket: str = 'day', window: int = 1) -> Dict[str, List[List[Any]]]:
+    """
+    Turns daily rollup rows into bucketed sentiment trends.
+
+    Args:
+        rows: Rows of entity_daily_sentiment with 'day', 'mentions',
+            'financial_score_sum' and 'overall_score_sum'. Several entities may be mixed.
+        bucket: 'day', 'week' (starting Monday) or 'month'.
+        window: Rolling window in buckets. Each point is then the mention-weighted mean
+            over itself and the previous window - 1 calendar buckets.
+
+    Returns:
+        {'financial': [[date, score], ...], 'overall': [[date, score], ...]} in date order,
+        with one point per bucket that has mentions. Scores are mean sentiment in [-1, 1]
+        (positive = 1, neutral = 0, negative = -1); dates are the first day of each bucket.
+    """
+    if not rows:
+        return {'financial': [], 'overall': []}
+
+    days = np.array([str(row['day'])[:10] for row in rows], dtype='datetime64[D]')
+    mentions = np.array([row['mentions'] for row in rows], dtype=float)
+    financial = np.array([row['financial_score_sum'] for row in rows], dtype=float)
+    overall = np.array([row['overall_score_sum'] for row in rows], dtype=float)
+
+    keys, inverse = np.unique(_bucket_keys(days, bucket), return_inverse=True)
+    counts = np.bincount(inverse, weights=mentions)
+    financial_sums = np.bincount(inverse, weights=financial)
+    overall_sums = np.bincount(inverse, weights=overall)
+
+    if window > 1:
+        positions = _bucket_positions(keys, bucket)
+        counts_in_window = _window_sums(counts, positions, window)
+        financial_sums = _window_sums(financial_sums, positions, window)
+        overall_sums = _window_sums(overall_sums, positions, window)
+    else:
+        counts_in_window = counts
+
+    has_data = counts > 0
+    labels = np.datetime_as_string(keys[has_data], unit='D')
+    financial_scores = np.round(financial_sums[has_data] / counts_in_window[has_data], 4)
+    overall_scores = np.round(overall_sums[has_data] / counts_in_window[has_data], 4)
+    return {
+        'financial': [[label, float(score)] for label, score in zip(labels, financial_scores)],
+        'overall': [[label, float(score)] for label, score in zip(labels, overall_scores)],
+    }
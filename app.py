@@ -1,21 +1,26 @@
 # api.py
 
+import time
+_import_started = time.perf_counter()
+
 import sqlite3
 import os
+import sys
 import threading
 import re
-from datetime import datetime
+import json
+import base64
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
 # --- Flask & Web Server Imports ---
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, g, Response, stream_with_context
 from flask_cors import CORS
 from apscheduler.schedulers.background import BackgroundScheduler
 import pytz
 
 # --- AI & Pipeline Imports ---
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
+# LangChain is imported on first use (see get_summary_chain), so read-only API workers never load it.
 from pydantic.v1 import BaseModel, Field, ValidationError
 from typing import List
 
@@ -23,11 +28,23 @@ from typing import List
 import pipeline
 import database
 from scrapers import scraper_manager
-from supabase import create_client, Client
+from storage import get_storage
+from storage.base import ROLLUP_COLUMNS
+from response_cache import cached_response, response_cache
+from response_encoding import init_response_encoding, etag_from_data_version
+from exports import EXPORT_FORMATS, stream_rows
+import snapshots
+from analysis import timeseries
+from analysis.entity_registry import get_entity_registry
+from analysis.entity_search import get_entity_search_index
+from scrapers.date_normalizer import UTC_FORMAT
 
 # --- Configuration ---
 load_dotenv()
 PIPELINE_PASSWORD = os.getenv("PIPELINE_PASSWORD")
+# Set PROFILE_STARTUP=1 (or pass --profile-startup) to report import time and first-request latency.
+PROFILE_STARTUP = os.getenv("PROFILE_STARTUP", "").lower() in ("1", "true", "yes") or "--profile-startup" in sys.argv
+IMPORT_SECONDS = time.perf_counter() - _import_started
 
 # --- Global State for Pipeline Tracking ---
 pipeline_status_tracker = {
@@ -42,18 +59,50 @@ pipeline_status_tracker = {
 
 # --- Flask App Initialization ---
 app = Flask(__name__)
-CORS(app)
+# Browsers only let scripts read non-standard headers that are explicitly exposed.
+CORS(app, expose_headers=['X-Next-Cursor'])
+# orjson serialization (when installed), strong ETags with 304s, and gzip/brotli for large bodies.
+# Read endpoints get ETags from the data version, so unchanged data is answered with a 304
+# before their queries run; cached responses are dropped when another process changed the data.
+data_version = init_response_encoding(app, data_version=database.get_data_version, on_data_change=response_cache.clear)
 
 # --- Database Helper ---
-def get_db_connection():
-    url: str = os.environ.get("SUPABASE_URL", "YOUR_SUPABASE_URL")
-    key: str = os.environ.get("SUPABASE_KEY", "YOUR_SUPABASE_ANON_KEY")
+# Endpoints call get_storage(), which creates the backend (Supabase or local SQLite,
+# chosen by the STORAGE_BACKEND env var) on first use and shares it afterwards.
+
+
+# --- Response Cache ---
+# Aggregate endpoints are served from memory until the next pipeline run finishes.
+database.on_pipeline_run(lambda run: response_cache.clear())
+database.on_pipeline_run(lambda run: data_version.invalidate())
+
+# --- Entity Search ---
+# New entities become searchable as soon as a run finishes; only rows added since the last refresh are read.
+database.on_pipeline_run(lambda run: get_entity_search_index().refresh())
+
+# --- Columnar Snapshot ---
+# Sentiments committed by a run are appended to the Parquet snapshot (only when pyarrow is installed).
+if snapshots.SNAPSHOT_AFTER_RUN and snapshots.available():
+    database.on_pipeline_run(lambda run: snapshots.append_snapshot())
 
-    # Create the Supabase client
-    supabase: Client = create_client(url, key)
-    return supabase
 
-supabase = get_db_connection()
+# --- Startup Profiling ---
+_first_request_profiled = False
+
+@app.before_request
+def _start_request_timer():
+    if PROFILE_STARTUP and not _first_request_profiled:
+        g.request_started = time.perf_counter()
+
+@app.after_request
+def _report_first_request(response):
+    global _first_request_profiled
+    if PROFILE_STARTUP and not _first_request_profiled and 'request_started' in g:
+        _first_request_profiled = True
+        now = time.perf_counter()
+        print(f"[startup] First request ({request.path}) served in {(now - g.request_started) * 1000:.1f} ms, "
+              f"{now - _import_started:.2f}s after startup began.")
+    return response
 
 
 # --- Summarization Agent Setup ---
@@ -67,11 +116,9 @@ class Summary(BaseModel):
     neutral_overall: List[str] = Field(description="A list of key neutral points or factual statements related to general operations.")
     final_summary: str = Field(description="A brief, conclusive summary of the entity's overall position based on the provided reasons.")
 
-try:
-    summary_llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
-    structured_summary_llm = summary_llm.with_structured_output(Summary)
-    summary_prompt_template = ChatPromptTemplate.from_messages([
-        ("system", """
+# The chat messages of the summarization prompt.
+SUMMARY_PROMPT_MESSAGES = [
+    ("system", """
 You are an expert financial analyst. You will be given a list of reasoning snippets from multiple news articles about a specific company or cryptocurrency. Your task is to synthesize these snippets into a clear, structured summary.
 
 Analyze all the provided reasons and categorize the key points into six lists:
@@ -86,12 +133,33 @@ Finally, provide a brief, one or two-sentence `final_summary` of the entity's ov
 
 Do not invent new information. Base your summary *only* on the provided reasoning snippets. It is critical that your final JSON object includes all fields, especially `final_summary`.
 """),
-        ("human", "Please summarize the following reasoning points for {entity_name}:\n\n{reasoning_list}")
-    ])
-    summary_chain = summary_prompt_template | structured_summary_llm
-except Exception as e:
-    print(f"Warning: Could not initialize summarization LLM. The /summarize_entity endpoint will not work. Error: {e}")
-    summary_chain = None
+    ("human", "Please summarize the following reasoning points for {entity_name}:\n\n{reasoning_list}")
+]
+
+_summary_chain = None
+_summary_chain_lock = threading.Lock()
+
+def get_summary_chain():
+    """
+    Returns the process-wide summarization chain, building it on first use.
+    Returns None if the LLM can't be initialized (e.g. no API key), so callers can answer 503.
+    """
+    global _summary_chain
+    if _summary_chain is None:
+        with _summary_chain_lock:
+            if _summary_chain is None:
+                try:
+                    from langchain_openai import ChatOpenAI
+                    from langchain_core.prompts import ChatPromptTemplate
+
+                    summary_llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+                    structured_summary_llm = summary_llm.with_structured_output(Summary)
+                    summary_prompt_template = ChatPromptTemplate.from_messages(SUMMARY_PROMPT_MESSAGES)
+                    _summary_chain = summary_prompt_template | structured_summary_llm
+                except Exception as e:
+                    print(f"Warning: Could not initialize summarization LLM. The /summarize_entity endpoint will not work. Error: {e}")
+                    return None
+    return _summary_chain
 
 
 # --- API Endpoints ---
@@ -108,8 +176,8 @@ def home():
             },
             "/api/trigger_pipeline": {
                 "method": "POST",
-                "description": "MODIFIED: Starts scraping and analysis. Can specify which scrapers to run.",
-                "body_example": {"password": "your_password", "provider": "openai", "model_name": "gpt-4-turbo", "scrapers": ["zawya.com", "menabytes.com"]}
+                "description": "MODIFIED: Starts scraping and analysis. Can specify which scrapers to run. Set 'stream' to analyze articles while scraping.",
+                "body_example": {"password": "your_password", "provider": "openai", "model_name": "gpt-4-turbo", "scrapers": ["zawya.com", "menabytes.com"], "stream": True, "max_in_flight": 8}
             },
             "/api/stop_pipeline": {
                 "method": "POST",
@@ -129,14 +197,31 @@ def home():
                 "method": "GET",
                 "description": "Returns the statistics from the most recently completed pipeline run."
             },
+            "/api/cache_stats": {
+                "method": "GET",
+                "description": "Returns hit/miss statistics of the read endpoint response cache."
+            },
             "/api/articles": {
                 "method": "GET",
                 "description": "Get and filter articles with sentiment data.",
-                "params": ["limit", "entity_name", "entity_type", "financial_sentiment", "overall_sentiment"]
+                "params": ["limit", "entity_id", "entity_name", "entity_type", "financial_sentiment", "overall_sentiment",
+                           "from (YYYY-MM-DD or ISO 8601 timestamp, UTC)", "to (YYYY-MM-DD or ISO 8601 timestamp, UTC)",
+                           "cursor (from the X-Next-Cursor header)", "fields (comma-separated)"]
             },
             "/api/entities": {
                 "method": "GET",
-                "description": "Get a list of all unique entities."
+                "description": "Get a list of all entities with their ids (null for names not yet linked by --backfill-entities)."
+            },
+            "/api/entities/search": {
+                "method": "GET",
+                "description": "Type-ahead search over entity names, ranked by similarity and mentions.",
+                "params": ["q", "limit (max 50)", "entity_type"]
+            },
+            "/api/entities/batch": {
+                "method": "GET",
+                "description": "Trend, sentiment counts and articles by sentiment for several entities in one payload.",
+                "params": ["entity_id (repeated or comma-separated)", "entity_name (repeated)", "entity_type",
+                           "views (comma-separated: trend, counts, articles_by_sentiment)", "bucket", "window", "from", "to"]
             },
             "/api/top_entities": {
                 "method": "GET",
@@ -146,22 +231,37 @@ def home():
             "/api/sentiment_over_time": {
                 "method": "GET",
                 "description": "Get an entity's sentiment trend over time, formatted for graphing.",
-                "params": ["entity_name"]
+                "params": ["entity_id or entity_name", "bucket (day, week or month)", "from (YYYY-MM-DD)", "to (YYYY-MM-DD)", "window (rolling buckets)"]
             },
             "/api/summarize_entity": {
                 "method": "GET",
                 "description": "Get an AI-generated summary for a specific company or crypto.",
-                "params": ["entity_name"]
+                "params": ["entity_id or entity_name"]
             },
             "/api/entity_articles_by_sentiment": {
                 "method": "GET",
                 "description": "Get articles for an entity, grouped by sentiment categories.",
-                "params": ["entity_name", "entity_type"]
+                "params": ["entity_id, or entity_name and entity_type"]
+            },
+            "/api/export/sentiments": {
+                "method": "GET",
+                "description": "Stream every sentiment as NDJSON or CSV, oldest id first.",
+                "params": ["format (ndjson or csv)", "since", "until", "after_id", "entity_id", "entity_type", "fields"]
+            },
+            "/api/export/articles": {
+                "method": "GET",
+                "description": "Stream every article as NDJSON or CSV, oldest id first.",
+                "params": ["format (ndjson or csv)", "since", "until", "after_id", "fields"]
+            },
+            "/api/snapshot": {
+                "method": "GET, POST",
+                "description": "GET describes the Parquet snapshot of sentiments joined with articles; POST appends new sentiments to it (needs pyarrow).",
+                "params": ["rebuild=true (POST: rewrite the snapshot from scratch)"]
             },
              "/api/usage_stats": {
                 "method": "GET",
                 "description": "Get API usage and cost statistics.",
-                "params": ["summarize=true"]
+                "params": ["summarize=true", "limit (pages the logs; all are returned without it)", "cursor (from the X-Next-Cursor header)", "fields (comma-separated)"]
             }
         }
     })
@@ -224,6 +324,13 @@ def trigger_pipeline():
         "provider": data.get("provider"), "model_name": data.get("model_name"),
         "openai_api_key": data.get("openai_api_key"), "groq_api_key": data.get("groq_api_key")
     }
+    # Streaming mode overlaps scraping and analysis instead of running them back to back.
+    stream = bool(data.get("stream", False))
+    # Concurrent LLM requests for the analysis stage; None falls back to pipeline.ANALYSIS_MAX_IN_FLIGHT,
+    # or to pipeline.STREAM_ANALYSIS_WORKERS when streaming, where each worker has one request open.
+    max_in_flight = data.get("max_in_flight")
+    if max_in_flight is not None and (not isinstance(max_in_flight, int) or max_in_flight < 1):
+        return jsonify({"error": "'max_in_flight' must be a positive integer."}), 400
 
     def pipeline_task(app_context, scraper_mods, stop_event, llm_config):
         with app_context:
@@ -232,11 +339,17 @@ def trigger_pipeline():
             run_status = "Completed"
             # try:
             print("==========pipeline runniniggg========================")
-            scraping_stats = pipeline.run_scraping_pipeline(pipeline_status_tracker, scraper_mods, stop_event)
-            
-            analysis_stats = {}
-            if not stop_event.is_set():
-                analysis_stats = pipeline.run_analysis_pipeline(pipeline_status_tracker, stop_event, **llm_config)
+            if stream:
+                scraping_stats = pipeline.run_streaming_pipeline(pipeline_status_tracker, scraper_mods, stop_event,
+                                                                 analysis_workers=max_in_flight, **llm_config)
+                analysis_stats = {}
+            else:
+                pipeline_status_tracker.pop("analysis", None) # Only reported by streaming runs
+                scraping_stats = pipeline.run_scraping_pipeline(pipeline_status_tracker, scraper_mods, stop_event)
+
+                analysis_stats = {}
+                if not stop_event.is_set():
+                    analysis_stats = pipeline.run_analysis_pipeline(pipeline_status_tracker, stop_event, max_in_flight=max_in_flight, **llm_config)
             
             if stop_event.is_set():
                 run_status = "Stopped by user"
@@ -292,21 +405,26 @@ def get_pipeline_status():
 
 @app.route('/api/pipeline_last_run', methods=['GET'])
 def get_last_run_stats():
-    """Returns the statistics from the most recently completed pipeline run using Supabase."""
+    """Returns the statistics from the most recently completed pipeline run."""
     try:
-        data, count = supabase.table('pipeline_runs').select('*').order('run_timestamp', desc=True).limit(1).single().execute()
-        if data[1]:
-            return jsonify(data[1])
+        rows = get_storage().select('pipeline_runs', '*', order_by='run_timestamp', desc=True, limit=1)
+        if rows:
+            return jsonify(rows[0])
         else:
             return jsonify({"message": "No previous pipeline run found."}), 404
 
     except Exception as e:
         print(f"An error occurred: {e}")
-        if "JSON object requested, but row count was 0" in str(e):
-             return jsonify({"message": "No previous pipeline run found."}), 404
         return jsonify({"message": "An internal error occurred."}), 500
     
+@app.route('/api/cache_stats', methods=['GET'])
+def get_cache_stats():
+    """Returns hit/miss statistics of the in-process response cache."""
+    return jsonify(response_cache.stats())
+
 @app.route('/api/top_entities', methods=['GET'])
+@etag_from_data_version
+@cached_response
 def get_top_entities():
     """
     Returns a ranked list of entities based on sentiment count,
@@ -325,149 +443,195 @@ def get_top_entities():
     if order not in ['ASC', 'DESC']:
         return jsonify({"error": "Invalid order parameter."}), 400
 
-    sentiment_column = f"{sentiment_type}_sentiment"
-
-    # Supabase doesn't support dynamic column filters directly, so:
-    # We'll fetch all relevant rows with the sentiment filter and aggregate in Python.
-
-    # Query all rows matching sentiment
-    response = supabase.table('sentiments') \
-        .select('entity_name, entity_type') \
-        .eq(sentiment_column, sentiment) \
-        .execute()
-    rows = response.data or []
-
-    # Count occurrences grouped by (entity_name, entity_type)
-    counts = {}
-    for row in rows:
-        key = (row['entity_name'], row['entity_type'])
-        counts[key] = counts.get(key, 0) + 1
-
-    # Convert to list with sentiment_count
+    # entity_sentiment_counts keeps one counter per (entity, sentiment_type, sentiment),
+    # so ranking is an indexed ORDER BY ... LIMIT over the rollup table.
+    count_column = f"{sentiment_type}_{sentiment}"
+    rows = get_storage().select(
+        'entity_sentiment_counts', f'entity_name, entity_type, {count_column}', [(count_column, 'gt', 0)],
+        order_by=count_column, desc=(order == 'DESC'), limit=limit
+    )
     results = [
         {
-            'entity_name': k[0],
-            'entity_type': k[1],
-            'sentiment_count': v
+            'entity_name': row['entity_name'],
+            'entity_type': row['entity_type'],
+            'sentiment_count': row[count_column]
         }
-        for k, v in counts.items()
+        for row in rows
     ]
 
-    # Sort by sentiment_count with requested order
-    reverse_order = (order == 'DESC')
-    results.sort(key=lambda x: x['sentiment_count'], reverse=reverse_order)
-
-    # Apply limit
-    results = results[:limit]
-
     return jsonify(results)
     
 
-@app.route('/api/sentiment_over_time', methods=['GET'])
-def get_sentiment_over_time():
-    """For a given entity, returns its sentiment scores over time, formatted for graphing."""
-
+def _requested_entity_ids(entity_type: str = None):
+    """
+    Resolves the entity a request asks about to registry ids: 'entity_id' is taken as
+    given, 'entity_name' is matched exactly through the normalized alias index. Returns
+    None if neither parameter was passed, and an empty list if the name is unknown.
+    """
+    if 'entity_id' in request.args:
+        entity_id = request.args.get('entity_id', type=int)
+        return [entity_id] if entity_id is not None else []
     entity_name = request.args.get('entity_name')
     if not entity_name:
-        return jsonify({"error": "An 'entity_name' query parameter is required."}), 400
-
-    response = (
-        supabase
-        .from_("sentiments")
-        .select("*, articles(publication_date)")
-        .ilike("entity_name", f"%{entity_name}%")
-        .execute()
-    )
-
-    def get_score(sentiment):
-        return 1 if sentiment == 'positive' else -1 if sentiment == 'negative' else 0
-
+        return None
+    return get_entity_registry().lookup(entity_name, entity_type)
 
-    # if response.error:
-    #     return jsonify({"error": response.error.message}), 500
+def _entity_name_fallback(entity_ids, entity_name: str, entity_type: str = None):
+    """
+    Returns the sentiments filters that match an entity name the registry doesn't know,
+    or None if the request resolved to registered entities (or asked for an entity_id).
+    Names stored before `python main.py --backfill-entities` ran have no registry entry
+    yet; they are matched by substring, the way entity endpoints worked before the registry.
+    """
+    if entity_ids or not entity_name or 'entity_id' in request.args:
+        return None
+    return _name_match_filters(entity_name, entity_type)
 
-    rows = response.data
+def _name_match_filters(entity_name: str, entity_type: str = None) -> list:
+    """Builds the substring filters that match an unregistered entity name in any table with entity_name."""
+    filters = [('entity_name', 'ilike', f'%{entity_name}%')]
+    if entity_type:
+        filters.append(('entity_type', 'eq', entity_type))
+    return filters
 
-    # ✅ Sort in Python:
-    rows_sorted = sorted(
-        rows, 
-        key=lambda r: r["articles"]["publication_date"] if r["articles"] else ""
-    )
+def _entity_sentiment_filters(entity_ids, entity_name: str, entity_type: str = None):
+    """Returns the sentiments filters for a requested entity, or None if it matches nothing."""
+    if entity_ids:
+        return [('entity_id', 'in', entity_ids)]
+    return _entity_name_fallback(entity_ids, entity_name, entity_type)
 
-    # Same as before:
-    financial_trend = []
-    overall_trend = []
-    for row in rows_sorted:
-        pub_date = row["articles"]["publication_date"] if row["articles"] else None
-        if pub_date:
-            financial_trend.append([pub_date, get_score(row["financial_sentiment"])])
-            overall_trend.append([pub_date, get_score(row["overall_sentiment"])])
+def _series_args():
+    """
+    Reads the bucket, window and from/to day range shared by the sentiment trend endpoints.
+    Returns (bucket, window, date_from, date_to); raises ValueError with a message for the client.
+    """
+    bucket = request.args.get('bucket', 'day')
+    window = request.args.get('window', 1, type=int)
+    date_from = request.args.get('from')
+    date_to = request.args.get('to')
+    if bucket not in timeseries.BUCKETS:
+        raise ValueError(f"Invalid bucket parameter. Use one of: {', '.join(timeseries.BUCKETS)}.")
+    if not 1 <= window <= timeseries.MAX_WINDOW:
+        raise ValueError(f"'window' must be between 1 and {timeseries.MAX_WINDOW}.")
+    try:
+        for value in (date_from, date_to):
+            if value:
+                datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise ValueError("'from' and 'to' must be dates in YYYY-MM-DD format.")
+    return bucket, window, date_from, date_to
+
+def _alias_owners(entity_ids: list) -> dict:
+    """Maps every (surface name, entity_type) registered for the given entities to its entity id."""
+    aliases = get_entity_registry().aliases_by_entity(entity_ids) if entity_ids else {}
+    return {pair: entity_id for entity_id, pairs in aliases.items() for pair in pairs}
+
+DAILY_SERIES_COLUMNS = 'id, entity_name, entity_type, day, mentions, financial_score_sum, overall_score_sum'
+
+def _day_filters(date_from: str = None, date_to: str = None) -> list:
+    """Builds the inclusive day range filters of the daily series."""
+    filters = []
+    if date_from:
+        filters.append(('day', 'gte', date_from))
+    if date_to:
+        filters.append(('day', 'lte', date_to))
+    return filters
+
+def _daily_series_by_entity(owners: dict, date_from: str = None, date_to: str = None) -> dict:
+    """Reads the daily series of every name in `owners` with one query and groups the rows by entity id."""
+    rows_by_entity = {}
+    if not owners:
+        return rows_by_entity
+    filters = [('entity_name', 'in', sorted({name for name, _ in owners}))] + _day_filters(date_from, date_to)
+    for row in get_storage().iter_rows('entity_daily_sentiment', DAILY_SERIES_COLUMNS, filters):
+        entity_id = owners.get((row['entity_name'], row['entity_type']))
+        if entity_id is not None:
+            rows_by_entity.setdefault(entity_id, []).append(row)
+    return rows_by_entity
+
+def _group_articles_by_sentiment(rows: list) -> dict:
+    """Groups sentiment rows with their attached article into the six sentiment lists, one entry per article URL."""
+    response_data = {
+        "positive_financial": [], "negative_financial": [], "neutral_financial": [],
+        "positive_overall": [], "negative_overall": [], "neutral_overall": []
+    }
+    processed_urls = set()
 
-    return jsonify({
-        "entity_name": entity_name,
-        "financial_sentiment_trend": financial_trend,
-        "overall_sentiment_trend": overall_trend
-    })
+    for row in rows:
+        if not row.get('articles'): continue
 
+        article_info = {"title": row['articles']['title'], "url": row['articles']['url'], "reasoning": row['reasoning']}
 
-@app.route('/api/dashboard_stats', methods=['GET'])
-def get_dashboard_stats():
-    """Provides a set of key statistics for a dashboard view using Supabase."""
-
-    # 1️⃣ Count distinct entity_name
-    total_entities_resp = (
-        supabase
-        .from_("sentiments")
-        .select("entity_name", count="exact")
-        .execute()
-    )
+        # Avoid duplicate articles in the same list
+        if row['articles']['url'] not in processed_urls:
+            if row['financial_sentiment'] == 'positive': response_data["positive_financial"].append(article_info)
+            elif row['financial_sentiment'] == 'negative': response_data["negative_financial"].append(article_info)
+            else: response_data["neutral_financial"].append(article_info)
 
-    # if total_entities_resp.error:
-    #     return jsonify({"error": total_entities_resp.error.message}), 500
+            if row['overall_sentiment'] == 'positive': response_data["positive_overall"].append(article_info)
+            elif row['overall_sentiment'] == 'negative': response_data["negative_overall"].append(article_info)
+            else: response_data["neutral_overall"].append(article_info)
 
-    total_entities = len({row['entity_name'] for row in total_entities_resp.data})
+            processed_urls.add(row['articles']['url'])
+    return response_data
 
-    # 2️⃣ Count distinct article_id
-    articles_analyzed_resp = (
-        supabase
-        .from_("sentiments")
-        .select("article_id", count="exact")
-        .execute()
-    )
+@app.route('/api/sentiment_over_time', methods=['GET'])
+@etag_from_data_version
+@cached_response
+def get_sentiment_over_time():
+    """
+    For a given entity, returns its sentiment scores over time, formatted for graphing.
 
+    Scores come from the precomputed daily series: each point is the mean sentiment
+    (positive = 1, neutral = 0, negative = -1) of one day, week or month bucket, so the
+    payload size depends on the date range rather than on how often the entity is covered.
+    The series of every surface name registered for the entity are combined; a name
+    the registry doesn't know yet combines the series of every name containing it.
+    """
 
-    articles_analyzed = len({row['article_id'] for row in articles_analyzed_resp.data})
+    entity_name = request.args.get('entity_name')
+    entity_ids = _requested_entity_ids()
+    if entity_ids is None:
+        return jsonify({"error": "An 'entity_id' or 'entity_name' query parameter is required."}), 400
 
-    # 3️⃣ Count total rows
-    total_sentiments_resp = (
-        supabase
-        .from_("sentiments")
-        .select("*", count="exact")
-        .limit(1)  # Required when using count="exact"
-        .execute()
-    )
+    try:
+        bucket, window, date_from, date_to = _series_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    total_sentiments = total_sentiments_resp.count or 0
+    fallback = _entity_name_fallback(entity_ids, entity_name)
+    if fallback:
+        rows = list(get_storage().iter_rows('entity_daily_sentiment', DAILY_SERIES_COLUMNS, fallback + _day_filters(date_from, date_to)))
+    else:
+        series = _daily_series_by_entity(_alias_owners(entity_ids), date_from, date_to)
+        rows = [row for entity_rows in series.values() for row in entity_rows]
+    trends = timeseries.bucket_sentiment_series(rows, bucket=bucket, window=window)
 
-    # 4️⃣ Get all financial_sentiment & overall_sentiment
-    sentiments_resp = (
-        supabase
-        .from_("sentiments")
-        .select("financial_sentiment, overall_sentiment")
-        .execute()
-    )
+    return jsonify({
+        "entity_name": entity_name,
+        "entity_ids": entity_ids,
+        "bucket": bucket,
+        "window": window,
+        "financial_sentiment_trend": trends['financial'],
+        "overall_sentiment_trend": trends['overall']
+    })
 
-    sentiments = sentiments_resp.data
 
-    distribution = {'positive': 0, 'negative': 0, 'neutral': 0}
+@app.route('/api/dashboard_stats', methods=['GET'])
+@etag_from_data_version
+@cached_response
+def get_dashboard_stats():
+    """Provides a set of key statistics for a dashboard view."""
 
-    for row in sentiments:
-        fs = row['financial_sentiment']
-        os = row['overall_sentiment']
-        if fs in distribution:
-            distribution[fs] += 1
-        if os in distribution:
-            distribution[os] += 1
+    # Every statistic is a global counter maintained alongside the sentiments.
+    stats = {row['key']: row['value'] for row in get_storage().select('sentiment_stats', 'key, value')}
+    distribution = {
+        label: stats.get(f'financial_{label}', 0) + stats.get(f'overall_{label}', 0)
+        for label in ('positive', 'negative', 'neutral')
+    }
+    total_sentiments = stats.get('total_sentiments', 0)
+    total_entities = stats.get('total_entities', 0)
+    articles_analyzed = stats.get('articles_analyzed', 0)
 
     return jsonify({
         "total_entities": total_entities,
@@ -477,69 +641,207 @@ def get_dashboard_stats():
     })
 
 @app.route('/api/entity_articles_by_sentiment', methods=['GET'])
+@etag_from_data_version
 def get_entity_articles_by_sentiment():
     """For a given entity, returns a structured list of its associated articles, grouped by sentiment."""
     entity_name = request.args.get('entity_name')
     entity_type = request.args.get('entity_type')
-    if not entity_name or not entity_type:
-        return jsonify({"error": "Both 'entity_name' and 'entity_type' query parameters are required."}), 400
+    if 'entity_id' not in request.args and (not entity_name or not entity_type):
+        return jsonify({"error": "Either 'entity_id', or both 'entity_name' and 'entity_type' query parameters are required."}), 400
 
     try:
-        data, count = supabase.table('sentiments').select(
-            'reasoning, financial_sentiment, overall_sentiment, articles(title, url)'
-        ).ilike('entity_name', f'%{entity_name}%').eq('entity_type', entity_type).execute()
-        
-        rows = data[1]
+        filters = _entity_sentiment_filters(_requested_entity_ids(entity_type), entity_name, entity_type)
+        rows = database.attach_articles(
+            list(get_storage().iter_rows(
+                'sentiments', 'id, article_id, reasoning, financial_sentiment, overall_sentiment', filters
+            )),
+            columns='id, title, url'
+        ) if filters else []
+
         if not rows:
-            return jsonify({"error": f"No articles found for entity '{entity_name}' of type '{entity_type}'"}), 404
+            return jsonify({"error": f"No articles found for entity '{entity_name or request.args.get('entity_id')}'"}), 404
+
+        response_data = _group_articles_by_sentiment(rows)
+        return jsonify(response_data)
+    except Exception as e:
+        return jsonify({"error": "An internal server error occurred.", "details": str(e)}), 500
+
 
-        response_data = {
-            "positive_financial": [], "negative_financial": [], "neutral_financial": [],
-            "positive_overall": [], "negative_overall": [], "neutral_overall": []
+# --- Entity Batch ---
+# Views the batch endpoint can compute; each is one grouped storage query for all requested entities.
+BATCH_VIEWS = ('trend', 'counts', 'articles_by_sentiment')
+MAX_BATCH_ENTITIES = 50
+
+def _batch_entity_ids():
+    """
+    Reads the entities of a batch request: ids from 'entity_id' (repeated or comma-separated)
+    and names from repeated 'entity_name', resolved in one alias lookup ('entity_type'
+    narrows the names). Returns (entity_ids, names the registry doesn't know); raises
+    ValueError for the client.
+    """
+    try:
+        entity_ids = [int(value) for values in request.args.getlist('entity_id') for value in values.split(',') if value.strip()]
+    except ValueError:
+        raise ValueError("'entity_id' values must be integers.")
+    names = list(dict.fromkeys(name for name in request.args.getlist('entity_name') if name.strip()))
+    resolved = get_entity_registry().lookup_many(names, request.args.get('entity_type')) if names else {}
+    for name in names:
+        entity_ids.extend(resolved[name])
+    entity_ids = list(dict.fromkeys(entity_ids))
+    unregistered = [name for name in names if not resolved[name]]
+    if not entity_ids and not names:
+        raise ValueError("At least one 'entity_id' or 'entity_name' query parameter is required.")
+    if len(entity_ids) + len(unregistered) > MAX_BATCH_ENTITIES:
+        raise ValueError(f"At most {MAX_BATCH_ENTITIES} entities can be requested at once.")
+    return entity_ids, unregistered
+
+def _batch_name_match(entity_name: str, entity_type: str, views: list, bucket: str, window: int,
+                      date_from: str = None, date_to: str = None):
+    """
+    Computes the batch views of a name the registry doesn't know, matched by substring
+    like the single-entity endpoints do (see _entity_name_fallback). Returns None if
+    no sentiment matches the name. These names cost one query per view each, unlike
+    registered entities; they only exist until `python main.py --backfill-entities` runs.
+    """
+    filters = _name_match_filters(entity_name, entity_type)
+    if not get_storage().select('sentiments', 'id', filters, limit=1):
+        return None
+    entity = {'entity_id': None, 'entity_name': entity_name, 'entity_type': entity_type}
+
+    if 'trend' in views:
+        rows = list(get_storage().iter_rows('entity_daily_sentiment', DAILY_SERIES_COLUMNS, filters + _day_filters(date_from, date_to)))
+        trends = timeseries.bucket_sentiment_series(rows, bucket=bucket, window=window)
+        entity['trend'] = {
+            "financial_sentiment_trend": trends['financial'],
+            "overall_sentiment_trend": trends['overall']
         }
-        processed_urls = set()
 
-        for row in rows:
-            if not row.get('articles'): continue
-            
-            article_info = {"title": row['articles']['title'], "url": row['articles']['url'], "reasoning": row['reasoning']}
-            
-            # Avoid duplicate articles in the same list
-            if row['articles']['url'] not in processed_urls:
-                if row['financial_sentiment'] == 'positive': response_data["positive_financial"].append(article_info)
-                elif row['financial_sentiment'] == 'negative': response_data["negative_financial"].append(article_info)
-                else: response_data["neutral_financial"].append(article_info)
-                
-                if row['overall_sentiment'] == 'positive': response_data["positive_overall"].append(article_info)
-                elif row['overall_sentiment'] == 'negative': response_data["negative_overall"].append(article_info)
-                else: response_data["neutral_overall"].append(article_info)
-                
-                processed_urls.add(row['articles']['url'])
+    if 'counts' in views:
+        counts = dict.fromkeys(ROLLUP_COLUMNS + ['total'], 0)
+        for row in get_storage().select('entity_sentiment_counts', f"{', '.join(ROLLUP_COLUMNS)}, total", filters):
+            for column in counts:
+                counts[column] += row[column]
+        entity['counts'] = counts
+
+    if 'articles_by_sentiment' in views:
+        rows = database.attach_articles(
+            list(get_storage().iter_rows(
+                'sentiments', 'id, article_id, reasoning, financial_sentiment, overall_sentiment', filters
+            )),
+            columns='id, title, url'
+        )
+        entity['articles_by_sentiment'] = _group_articles_by_sentiment(rows)
+    return entity
+
+@app.route('/api/entities/batch', methods=['GET'])
+@etag_from_data_version
+@cached_response
+def get_entities_batch():
+    """
+    Returns several views of several entities in one payload, for dashboards showing a watchlist.
+
+    Instead of one /api/sentiment_over_time and one /api/entity_articles_by_sentiment call
+    per entity, each requested view is computed with one query covering every entity:
+    'trend' reads the daily series of all their names, 'counts' their sentiment rollups
+    and 'articles_by_sentiment' their sentiments (with one article lookup). Names the
+    registry doesn't know are matched by substring, as in the single-entity endpoints,
+    and returned with a null entity_id; names matching nothing are listed as unresolved.
+    """
+    try:
+        entity_ids, unregistered = _batch_entity_ids()
+        views = [view.strip() for view in request.args.get('views', ','.join(BATCH_VIEWS)).split(',') if view.strip()]
+        unknown = [view for view in views if view not in BATCH_VIEWS]
+        if unknown or not views:
+            raise ValueError(f"Unknown views: {', '.join(unknown)}. Choose from: {', '.join(BATCH_VIEWS)}.")
+        bucket, window, date_from, date_to = _series_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        return jsonify(response_data)
+    try:
+        entities = {
+            row['id']: {'entity_id': row['id'], 'entity_name': row['name'], 'entity_type': row['entity_type']}
+            for row in get_storage().select('entities', 'id, name, entity_type', [('id', 'in', entity_ids)])
+        } if entity_ids else {}
+        owners = _alias_owners(list(entities)) if {'trend', 'counts'} & set(views) else {}
+
+        if 'trend' in views:
+            series = _daily_series_by_entity(owners, date_from, date_to)
+            for entity_id, entity in entities.items():
+                trends = timeseries.bucket_sentiment_series(series.get(entity_id, []), bucket=bucket, window=window)
+                entity['trend'] = {
+                    "financial_sentiment_trend": trends['financial'],
+                    "overall_sentiment_trend": trends['overall']
+                }
+
+        if 'counts' in views:
+            totals = {entity_id: dict.fromkeys(ROLLUP_COLUMNS + ['total'], 0) for entity_id in entities}
+            if owners:
+                for row in get_storage().select('entity_sentiment_counts', f"entity_name, entity_type, {', '.join(ROLLUP_COLUMNS)}, total",
+                                                [('entity_name', 'in', sorted({name for name, _ in owners}))]):
+                    entity_id = owners.get((row['entity_name'], row['entity_type']))
+                    if entity_id is not None:
+                        for column in totals[entity_id]:
+                            totals[entity_id][column] += row[column]
+            for entity_id, entity in entities.items():
+                entity['counts'] = totals[entity_id]
+
+        if 'articles_by_sentiment' in views:
+            rows_by_entity = {}
+            if entities:
+                rows = database.attach_articles(
+                    list(get_storage().iter_rows(
+                        'sentiments', 'id, article_id, entity_id, reasoning, financial_sentiment, overall_sentiment',
+                        [('entity_id', 'in', list(entities))]
+                    )),
+                    columns='id, title, url'
+                )
+                for row in rows:
+                    rows_by_entity.setdefault(row['entity_id'], []).append(row)
+            for entity_id, entity in entities.items():
+                entity['articles_by_sentiment'] = _group_articles_by_sentiment(rows_by_entity.get(entity_id, []))
+
+        results = [entities[entity_id] for entity_id in entity_ids if entity_id in entities]
+        unresolved = []
+        for name in unregistered:
+            entity = _batch_name_match(name, request.args.get('entity_type'), views, bucket, window, date_from, date_to)
+            if entity:
+                results.append(entity)
+            else:
+                unresolved.append(name)
+
+        return jsonify({
+            "views": views,
+            "bucket": bucket,
+            "window": window,
+            "entities": results,
+            "unresolved": unresolved
+        })
     except Exception as e:
         return jsonify({"error": "An internal server error occurred.", "details": str(e)}), 500
 
 
 @app.route('/api/summarize_entity', methods=['GET'])
 def summarize_entity():
-    """Takes an entity name and uses an AI agent to generate a structured summary."""
+    """Takes an entity id or name and uses an AI agent to generate a structured summary."""
     entity_name = request.args.get('entity_name')
-    if not entity_name:
-        return jsonify({"error": "An 'entity_name' query parameter is required."}), 400
+    entity_ids = _requested_entity_ids()
+    if entity_ids is None:
+        return jsonify({"error": "An 'entity_id' or 'entity_name' query parameter is required."}), 400
 
     try:
-        data, count = supabase.table('sentiments').select(
-            'reasoning, financial_sentiment, overall_sentiment'
-        ).ilike('entity_name', f'%{entity_name}%').execute()
-
-        reasonings = data[1]
+        filters = _entity_sentiment_filters(entity_ids, entity_name)
+        reasonings = list(get_storage().iter_rows(
+            'sentiments', 'id, reasoning, financial_sentiment, overall_sentiment', filters
+        )) if filters else []
         if not reasonings:
-            return jsonify({"error": f"No sentiment data found for entity: {entity_name}"}), 404
+            return jsonify({"error": f"No sentiment data found for entity: {entity_name or request.args.get('entity_id')}"}), 404
+        if not entity_name:
+            entity_name = get_storage().select('entities', 'name', [('id', 'eq', entity_ids[0])])[0]['name']
         
         # The AI agent logic remains the same
         reasoning_list_str = "\n".join([f"- (Financial: {r['financial_sentiment']}, Overall: {r['overall_sentiment']}) {r['reasoning']}" for r in reasonings])
-        # if not summary_chain: return jsonify({"error": "Summarization agent is not available."}), 503
+        summary_chain = get_summary_chain()
+        if not summary_chain: return jsonify({"error": "Summarization agent is not available."}), 503
         summary_response = summary_chain.invoke({"entity_name": entity_name, "reasoning_list": reasoning_list_str})
         return jsonify(summary_response.dict())
         # return jsonify({"message": "AI summarization logic would run here.", "reasoning_data_collected": len(reasonings)})
@@ -548,106 +850,206 @@ def summarize_entity():
         return jsonify({"error": "An internal server error occurred.", "details": str(e)}), 500
 
 
+def _published_at_filters(date_from: str, date_to: str) -> list:
+    """
+    Builds published_at range filters from 'from'/'to' query values. A bare date covers
+    its whole UTC day, so 'to=2025-07-02' includes everything published that day;
+    timestamps without an offset are read as UTC. Raises ValueError on bad input.
+    """
+    filters = []
+    for value, operator in ((date_from, 'gte'), (date_to, 'lte')):
+        if not value:
+            continue
+        bound = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        bound = bound.astimezone(pytz.utc) if bound.tzinfo else pytz.utc.localize(bound)
+        if operator == 'lte' and ':' not in value:
+            bound, operator = bound + timedelta(days=1), 'lt'
+        filters.append(('published_at', operator, bound.strftime(UTC_FORMAT)))
+    return filters
+
+# --- Pagination ---
+# Listings return one page and, if there may be more, its cursor in this header; the body stays a plain list.
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+MAX_PAGE_LIMIT = 500
+ARTICLE_FIELDS = ('id', 'title', 'url', 'author', 'publication_date', 'published_at', 'canonical_article_id', 'sentiments')
+USAGE_LOG_FIELDS = ('id', 'article_id', 'provider', 'total_tokens', 'prompt_tokens', 'completion_tokens',
+                    'total_cost_usd', 'timestamp')
+
+def _encode_cursor(sort_value, key_value) -> str:
+    """Packs the (sort value, id) of the last row of a page into an opaque URL-safe token."""
+    return base64.urlsafe_b64encode(json.dumps([sort_value, key_value]).encode('utf-8')).decode('ascii').rstrip('=')
+
+def _decode_cursor(cursor: str):
+    """Unpacks a token from _encode_cursor. Raises ValueError if it was tampered with."""
+    try:
+        sort_value, key_value = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except Exception as e:
+        raise ValueError("Invalid cursor.") from e
+    if not isinstance(key_value, int) or not (sort_value is None or isinstance(sort_value, str)):
+        raise ValueError("Invalid cursor.")
+    return sort_value, key_value
+
+def _page_args(allowed_fields: tuple, default_limit: int):
+    """
+    Reads the limit, cursor and fields= projection shared by the paginated listings.
+    Returns (limit, after, fields); raises ValueError with a message for the client.
+    """
+    limit = request.args.get('limit', default_limit, type=int)
+    if not 1 <= limit <= MAX_PAGE_LIMIT:
+        raise ValueError(f"'limit' must be between 1 and {MAX_PAGE_LIMIT}.")
+    cursor = request.args.get('cursor')
+    after = _decode_cursor(cursor) if cursor else None
+    fields = allowed_fields
+    if request.args.get('fields'):
+        fields = tuple(field.strip() for field in request.args['fields'].split(',') if field.strip())
+        unknown = [field for field in fields if field not in allowed_fields]
+        if unknown or not fields:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}. Choose from: {', '.join(allowed_fields)}.")
+    return limit, after, fields
+
+def _paged_response(items: list, limit: int, last_row: dict, sort: str, key: str = 'id'):
+    """Returns the page as JSON, with the next-page cursor header if the page is full."""
+    response = jsonify(items)
+    if len(items) == limit and last_row:
+        response.headers[NEXT_CURSOR_HEADER] = _encode_cursor(last_row.get(sort), last_row[key])
+    return response
+
 @app.route('/api/articles', methods=['GET'])
+@etag_from_data_version
 def get_articles():
     """
     Fetch articles with optional filtering on sentiments fields,
     return articles along with their sentiments nested.
+    The from/to range is applied to the indexed published_at column by the database,
+    and articles are returned newest first by that normalized timestamp.
+
+    Results are paginated with an opaque (published_at, id) keyset cursor: pass the
+    X-Next-Cursor response header back as `cursor` to get the next page. `fields`
+    selects a comma-separated subset of the article fields; leaving out 'sentiments'
+    skips the sentiment lookup entirely.
     """
     # Extract filters from query parameters
+    entity_id = request.args.get('entity_id', type=int)
     entity_name = request.args.get('entity_name')
     entity_type = request.args.get('entity_type')
     financial_sentiment = request.args.get('financial_sentiment')
     overall_sentiment = request.args.get('overall_sentiment')
-    limit = request.args.get('limit', 20, type=int)
-
-    # Supabase doesn't support complex SQL JOINs with filtering in one call,
-    # so we do two queries:
-    # 1) Filter sentiments by conditions, get matching article_ids
-    # 2) Fetch articles by these article_ids, then fetch sentiments for those articles
-    # Finally, merge results.
-
-    # Build filter conditions for sentiments
-    sentiment_filter = supabase.table('sentiments').select('article_id, id, entity_name, entity_type, financial_sentiment, overall_sentiment, reasoning')
-
+    try:
+        limit, after, fields = _page_args(ARTICLE_FIELDS, default_limit=20)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        date_filters = _published_at_filters(request.args.get('from'), request.args.get('to'))
+    except ValueError:
+        return jsonify({"error": "'from' and 'to' must be dates (YYYY-MM-DD) or ISO 8601 timestamps."}), 400
+
+    # Joins with filtering aren't portable across storage backends, so we do it in steps,
+    # each bounded by the page size:
+    # 1) Page through matching sentiments (or articles, without filters) to get one page of article ids
+    # 2) Fetch those articles, then the sentiments to nest under them
+    sentiment_filters = []
+    if entity_id is not None:
+        sentiment_filters.append(('entity_id', 'eq', entity_id))
     if entity_name:
-        sentiment_filter = sentiment_filter.like('entity_name', f'%{entity_name}%')
+        sentiment_filters.append(('entity_name', 'like', f'%{entity_name}%'))
     if entity_type:
-        sentiment_filter = sentiment_filter.eq('entity_type', entity_type)
+        sentiment_filters.append(('entity_type', 'eq', entity_type))
     if financial_sentiment:
-        sentiment_filter = sentiment_filter.eq('financial_sentiment', financial_sentiment)
+        sentiment_filters.append(('financial_sentiment', 'eq', financial_sentiment))
     if overall_sentiment:
-        sentiment_filter = sentiment_filter.eq('overall_sentiment', overall_sentiment)
-
-    sentiment_response = sentiment_filter.execute()
-    sentiments = sentiment_response.data or []
-
-    # Collect unique article IDs from filtered sentiments
-    article_ids = list({s['article_id'] for s in sentiments})
-
-    # If filtering on sentiments but no matches found, return empty list early
-    if (entity_name or entity_type or financial_sentiment or overall_sentiment) and not article_ids:
-        return jsonify([])
-
-    # Fetch articles, either all (if no filter) or filtered by article_ids
-    articles_query = supabase.table('articles').select('id, title, url, author, publication_date').order('publication_date', desc=True).limit(limit)
-    if article_ids:
-        articles_query = articles_query.in_('id', article_ids)
-    articles_response = articles_query.execute()
-    articles = articles_response.data or []
+        sentiment_filters.append(('overall_sentiment', 'eq', overall_sentiment))
+
+    columns = ', '.join(dict.fromkeys(['id', 'published_at', 'canonical_article_id'] + [f for f in fields if f != 'sentiments']))
+    if sentiment_filters:
+        # Sentiments carry a copy of published_at, so the date range is applied to them directly.
+        article_ids = database.page_article_ids(sentiment_filters + date_filters, limit, after)
+        if not article_ids:
+            return jsonify([])
+        by_id = {row['id']: row for row in get_storage().select('articles', columns, [('id', 'in', article_ids)])}
+        articles = [by_id[article_id] for article_id in article_ids if article_id in by_id]
+    else:
+        articles = get_storage().select_page('articles', columns, date_filters, sort='published_at', after=after, limit=limit)
 
-    # Index sentiments by article_id
+    # Nest the page's (matching) sentiments; near-duplicates carry none of their own, so show the canonical article's.
     sentiments_by_article = {}
-    for s in sentiments:
-        sentiments_by_article.setdefault(s['article_id'], []).append({
-            "entity_name": s['entity_name'],
-            "entity_type": s['entity_type'],
-            "financial_sentiment": s['financial_sentiment'],
-            "overall_sentiment": s['overall_sentiment'],
-            "reasoning": s['reasoning']
-        })
+    if 'sentiments' in fields and articles:
+        lookup_ids = list({a['id'] for a in articles} | {a['canonical_article_id'] for a in articles if a.get('canonical_article_id')})
+        for s in get_storage().iter_rows(
+            'sentiments', 'id, article_id, entity_name, entity_type, financial_sentiment, overall_sentiment, reasoning',
+            sentiment_filters + [('article_id', 'in', lookup_ids)]
+        ):
+            sentiments_by_article.setdefault(s['article_id'], []).append({
+                "entity_name": s['entity_name'],
+                "entity_type": s['entity_type'],
+                "financial_sentiment": s['financial_sentiment'],
+                "overall_sentiment": s['overall_sentiment'],
+                "reasoning": s['reasoning']
+            })
 
-    # Compose result: articles with nested sentiments
     result = []
     for article in articles:
-        result.append({
-            "id": article['id'],
-            "title": article.get('title'),
-            "url": article.get('url'),
-            "author": article.get('author'),
-            "publication_date": article.get('publication_date'),
-            "sentiments": sentiments_by_article.get(article['id'], [])
-        })
+        item = {field: article.get(field) for field in fields if field != 'sentiments'}
+        if 'sentiments' in fields:
+            item['sentiments'] = sentiments_by_article.get(article['id']) or sentiments_by_article.get(article.get('canonical_article_id'), [])
+        result.append(item)
 
-    return jsonify(result)
+    return _paged_response(result, limit, articles[-1] if articles else None, sort='published_at')
 
 
 @app.route('/api/entities', methods=['GET'])
+@etag_from_data_version
+@cached_response
 def get_entities():
     """
-    Returns a list of all unique entities (entity_name, entity_type) ordered by entity_name.
+    Returns all entities (entity_id, entity_name, entity_type) ordered by entity_name.
+    Spelling variants of one registered entity are listed once, under its canonical name.
+    Names whose sentiments haven't been linked to the registry yet (see
+    `python main.py --backfill-entities`) are listed as they were stored, with a null entity_id.
     """
-    # Supabase does not support DISTINCT in its REST API, so we fetch all and deduplicate in Python.
-    response = supabase.table('sentiments').select('entity_name, entity_type').order('entity_name').execute()
-    rows = response.data or []
+    storage = get_storage()
+    entities = [
+        {'entity_id': row['id'], 'entity_name': row['name'], 'entity_type': row['entity_type']}
+        for row in storage.iter_rows('entities', 'id, name, entity_type', prefetch=True)
+    ]
+    if storage.count('sentiments', [('entity_id', 'is', None)]):
+        registered = {(row['alias'], row['entity_type']) for row in storage.iter_rows('entity_aliases', 'id, alias, entity_type')}
+        unlinked = {
+            (row['entity_name'], row['entity_type'])
+            for row in storage.iter_rows('sentiments', 'id, entity_name, entity_type', [('entity_id', 'is', None)], prefetch=True)
+        }
+        entities.extend(
+            {'entity_id': None, 'entity_name': name, 'entity_type': entity_type}
+            for name, entity_type in unlinked - registered
+        )
+    return jsonify(sorted(entities, key=lambda entity: (entity['entity_name'], entity['entity_type'])))
 
-    seen = set()
-    unique_entities = []
-    for row in rows:
-        key = (row['entity_name'], row['entity_type'])
-        if key not in seen:
-            seen.add(key)
-            unique_entities.append(row)
 
-    return jsonify(unique_entities)
+@app.route('/api/entities/search', methods=['GET'])
+def search_entities():
+    """
+    Returns the entities whose names best match `q`, for type-ahead. Names starting
+    with the query rank first; the rest are ranked by trigram similarity, so
+    misspellings still match. Served from the in-memory entity search index.
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "A 'q' query parameter is required."}), 400
+    limit = request.args.get('limit', 10, type=int)
+    if not 1 <= limit <= 50:
+        return jsonify({"error": "'limit' must be between 1 and 50."}), 400
+
+    results = get_entity_search_index().search(query, limit=limit, entity_type=request.args.get('entity_type'))
+    return jsonify({"query": query, "results": results})
 
 
 @app.route('/api/usage_stats', methods=['GET'])
 def get_usage_stats():
     """
-    Returns API usage and cost statistics from Supabase.
+    Returns API usage and cost statistics.
     If summarize=true, groups by provider and aggregates.
-    Else, returns full logs ordered by timestamp DESC.
+    Else, returns the logs ordered by timestamp DESC: all of them by default, or
+    one page when `limit` or `cursor` is given (the same cursor, limit and fields
+    parameters as /api/articles).
     """
     summarize = request.args.get('summarize', 'false').lower() == 'true'
 
@@ -655,12 +1057,9 @@ def get_usage_stats():
         # Supabase does not support complex aggregation in a single REST query,
         # so we use RPC or do it client-side.
         # Here’s a simple approach assuming no RPC:
-        # 1. Fetch all, 2. Aggregate in Python.
-        response = supabase.table('usage_logs').select('provider, total_tokens, total_cost_usd').execute()
-        rows = response.data
-
+        # 1. Stream all rows page by page, 2. Aggregate in Python.
         summary = {}
-        for row in rows:
+        for row in get_storage().iter_rows('usage_logs', 'id, provider, total_tokens, total_cost_usd', prefetch=True):
             provider = row['provider']
             if provider not in summary:
                 summary[provider] = {
@@ -676,12 +1075,100 @@ def get_usage_stats():
         stats = list(summary.values())
 
     else:
-        response = supabase.table('usage_logs').select('*').order('timestamp', desc=True).execute()
-        stats = response.data
+        try:
+            limit, after, fields = _page_args(USAGE_LOG_FIELDS, default_limit=MAX_PAGE_LIMIT)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        columns = ', '.join(dict.fromkeys(['id', 'timestamp'] + list(fields)))
+        paginated = 'limit' in request.args or 'cursor' in request.args
+        rows = get_storage().select_page('usage_logs', columns, [], sort='timestamp', after=after, limit=limit)
+        if not paginated:
+            # Without limit or cursor every log is returned, as before pagination existed.
+            page = rows
+            while len(page) == limit:
+                page = get_storage().select_page('usage_logs', columns, [], sort='timestamp',
+                                                 after=(page[-1]['timestamp'], page[-1]['id']), limit=limit)
+                rows.extend(page)
+        stats = [{field: row.get(field) for field in fields} for row in rows]
+        if not paginated:
+            return jsonify(stats)
+        return _paged_response(stats, limit, rows[-1] if rows else None, sort='timestamp')
 
     return jsonify(stats)
 
 
+# --- Bulk Export ---
+SENTIMENT_EXPORT_FIELDS = ('id', 'article_id', 'entity_id', 'entity_name', 'entity_type', 'financial_sentiment',
+                           'overall_sentiment', 'reasoning', 'published_at')
+ARTICLE_EXPORT_FIELDS = ('id', 'url', 'title', 'author', 'publication_date', 'published_at', 'canonical_article_id',
+                         'is_analyzed', 'cleaned_text')
+# Article text is large; it is only exported when asked for through `fields`.
+ARTICLE_EXPORT_DEFAULT_FIELDS = ARTICLE_EXPORT_FIELDS[:-1]
+
+def _export(table: str, allowed_fields: tuple, default_fields: tuple, filters: list):
+    """
+    Streams the rows of `table` matching the filters plus the shared export parameters:
+    format, since/until (on published_at, same rules as from/to on /api/articles),
+    after_id (for incremental pulls: pass the last id received) and fields.
+    Rows are read in id-ordered keyset pages while the client downloads, so server
+    memory stays constant however large the export is.
+    """
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"Invalid format. Use one of: {', '.join(EXPORT_FORMATS)}."}), 400
+    fields = default_fields
+    if request.args.get('fields'):
+        fields = tuple(field.strip() for field in request.args['fields'].split(',') if field.strip())
+        unknown = [field for field in fields if field not in allowed_fields]
+        if unknown or not fields:
+            return jsonify({"error": f"Unknown fields: {', '.join(unknown)}. Choose from: {', '.join(allowed_fields)}."}), 400
+    try:
+        filters = filters + _published_at_filters(request.args.get('since'), request.args.get('until'))
+    except ValueError:
+        return jsonify({"error": "'since' and 'until' must be dates (YYYY-MM-DD) or ISO 8601 timestamps."}), 400
+    after_id = request.args.get('after_id', type=int)
+    if after_id is not None:
+        filters.append(('id', 'gt', after_id))
+
+    columns = ', '.join(dict.fromkeys(('id',) + fields))
+    rows = get_storage().iter_rows(table, columns, filters, prefetch=True)
+    return Response(
+        stream_with_context(stream_rows(rows, fields, export_format)),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={'Content-Disposition': f'attachment; filename={table}.{export_format}'}
+    )
+
+@app.route('/api/export/sentiments', methods=['GET'])
+def export_sentiments():
+    """Streams sentiments, optionally for one entity_id or entity_type, as NDJSON or CSV."""
+    filters = []
+    entity_id = request.args.get('entity_id', type=int)
+    if entity_id is not None:
+        filters.append(('entity_id', 'eq', entity_id))
+    if request.args.get('entity_type'):
+        filters.append(('entity_type', 'eq', request.args['entity_type']))
+    return _export('sentiments', SENTIMENT_EXPORT_FIELDS, SENTIMENT_EXPORT_FIELDS, filters)
+
+@app.route('/api/export/articles', methods=['GET'])
+def export_articles():
+    """Streams articles as NDJSON or CSV; add cleaned_text to `fields` to include the text."""
+    return _export('articles', ARTICLE_EXPORT_FIELDS, ARTICLE_EXPORT_DEFAULT_FIELDS, [])
+
+@app.route('/api/snapshot', methods=['GET', 'POST'])
+def snapshot():
+    """Describes the columnar snapshot, or appends to (or rebuilds) it on POST."""
+    if request.method == 'GET':
+        return jsonify(snapshots.snapshot_status())
+    if not snapshots.available():
+        return jsonify({"error": "Snapshots are unavailable: pyarrow is not installed."}), 503
+    try:
+        if request.args.get('rebuild', 'false').lower() == 'true':
+            return jsonify(snapshots.rebuild_snapshot())
+        return jsonify(snapshots.append_snapshot())
+    except Exception as e:
+        return jsonify({"error": "Could not write the snapshot.", "details": str(e)}), 500
+
+
 # --- Scheduler Setup ---
 def scheduled_pipeline_run():
     """A wrapper for the scheduler to run the pipeline with all available scrapers."""
@@ -721,6 +1208,8 @@ def scheduled_pipeline_run():
 
 # --- Main Execution ---
 if __name__ == '__main__':
+    if PROFILE_STARTUP:
+        print(f"[startup] Modules imported in {IMPORT_SECONDS * 1000:.1f} ms.")
     database.create_database()
     scraper_manager.discover_scrapers() # Pre-discover on startup
     
@@ -732,6 +1221,8 @@ if __name__ == '__main__':
     
     print(f"Pipeline scheduler started. Next run scheduled for {schedule_time_str} UTC daily.")
     print(f"Available scrapers found: {scraper_manager.get_all_scraper_names()}")
+    if PROFILE_STARTUP:
+        print(f"[startup] Ready to serve {time.perf_counter() - _import_started:.2f}s after startup began.")
     
     # --- MODIFICATION FOR NETWORK ACCESS ---
     # The host='0.0.0.0' argument tells Flask to listen on all public IPs,
@@ -2,70 +2,40 @@
 
 import sqlite3
 from datetime import datetime
-import pytz
 import os
-from supabase import create_client, Client
-from typing import List, Dict, Any
+import itertools
+import threading
+from typing import List, Dict, Any, Callable, Optional, Tuple
+from analysis.near_duplicates import compute_signature, get_near_duplicate_index
+from analysis.entity_registry import get_entity_registry
+from storage import get_storage, DuplicateKeyError
+from storage.sqlite_backend import create_schema
+from scrapers.date_normalizer import normalize_publication_date
 
 
 DB_NAME = 'news_data.db'
-url: str = os.environ.get("SUPABASE_URL", "YOUR_SUPABASE_URL")
-key: str = os.environ.get("SUPABASE_KEY", "YOUR_SUPABASE_ANON_KEY")
 
-
-# Create the Supabase client
-supabase: Client = create_client(url, key)
+# Links per upsert request in add_links.
+LINK_UPSERT_CHUNK_SIZE = 500
+# Ids per `in` filter when joining rows to their articles; keeps request URLs short.
+JOIN_CHUNK_SIZE = 200
+# Called with each recorded pipeline run; see on_pipeline_run.
+_pipeline_run_listeners: List[Callable[[Dict[str, Any]], None]] = []
+# Articles per upsert when backfilling published_at.
+PUBLISHED_AT_BACKFILL_CHUNK_SIZE = 500
+# Articles per upsert when indexing existing articles for near-duplicate detection.
+NEAR_DUPLICATE_BACKFILL_CHUNK_SIZE = 200
+# Sentiments per upsert when backfilling entity_id.
+ENTITY_ID_BACKFILL_CHUNK_SIZE = 500
+# Analysis results are committed in batches of this many articles, or after this many seconds.
+ANALYSIS_COMMIT_BATCH_SIZE = int(os.getenv("ANALYSIS_COMMIT_BATCH_SIZE", 10))
+ANALYSIS_COMMIT_INTERVAL = float(os.getenv("ANALYSIS_COMMIT_INTERVAL", 5.0))
 
 # --- Table Creation ---
 def create_database():
     """Initializes the database and creates all tables if they don't exist."""
     with sqlite3.connect(DB_NAME) as conn:
-        cursor = conn.cursor()
-        # Links to be scraped
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS links (
-            id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL UNIQUE,
-            source_website TEXT NOT NULL, scraped_date TEXT NOT NULL
-        )''')
-        # Scraped article content
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS articles (
-            id INTEGER PRIMARY KEY AUTOINCREMENT, link_id INTEGER NOT NULL,
-            url TEXT NOT NULL UNIQUE, title TEXT, author TEXT, publication_date TEXT,
-            raw_text TEXT, cleaned_text TEXT, is_analyzed INTEGER DEFAULT 0,
-            FOREIGN KEY (link_id) REFERENCES links (id)
-        );''')
-        # Sentiment analysis results
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS sentiments (
-            id INTEGER PRIMARY KEY AUTOINCREMENT, article_id INTEGER NOT NULL,
-            entity_name TEXT NOT NULL, entity_type TEXT NOT NULL,
-            financial_sentiment TEXT NOT NULL, overall_sentiment TEXT NOT NULL,
-            reasoning TEXT, FOREIGN KEY (article_id) REFERENCES articles (id)
-        )''')
-        # API usage and cost tracking logs
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS usage_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT, article_id INTEGER NOT NULL,
-            provider TEXT NOT NULL, total_tokens INTEGER, prompt_tokens INTEGER,
-            completion_tokens INTEGER, total_cost_usd REAL, timestamp TEXT NOT NULL,
-            FOREIGN KEY (article_id) REFERENCES articles (id)
-        )''')
-        # Application settings
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS app_config (
-            key TEXT PRIMARY KEY, value TEXT NOT NULL
-        )''')
-        # Pipeline execution statistics
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS pipeline_runs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT, run_timestamp TEXT NOT NULL,
-            new_links_found INTEGER, articles_scraped INTEGER,
-            entities_analyzed INTEGER, status TEXT
-        )''')
-        # Set default schedule time if not present
-        cursor.execute("INSERT OR IGNORE INTO app_config (key, value) VALUES (?, ?)", ('schedule_time', '01:00'))
-        conn.commit()
+        create_schema(conn)
     print("Database initialized successfully.")
 
 # --- Config Management ---
@@ -73,10 +43,9 @@ def get_config_value(key: str, default=None):
     """Retrieves a configuration value from the app_config table."""
     print(f"Getting config for key='{key}'...")
     try:
-        data, count = supabase.table('app_config').select('value').eq('key', key).execute()
-        # The result is in data[1], which is a list of dictionaries.
-        if data[1]:
-            value = data[1][0]['value']
+        rows = get_storage().select('app_config', 'value', [('key', 'eq', key)])
+        if rows:
+            value = rows[0]['value']
             print(f"Found value: {value}")
             return value
         else:
@@ -95,12 +64,12 @@ def set_config_value(key: str, value: str):
     try:
         # The upsert method will insert a new row or update an existing one
         # if a row with the same primary key ('key') already exists.
-        data, count = supabase.table('app_config').upsert({
+        rows = get_storage().upsert('app_config', [{
             'key': key,
             'value': value
-        }).execute()
+        }], on_conflict='key')
         
-        print("Upsert successful:", data[1])
+        print("Upsert successful:", rows)
     except Exception as e:
         print(f"Error upserting config value: {e}")
 
@@ -111,16 +80,16 @@ def add_link(url: str, source: str):
     # try:
     # Set ignore_duplicates=True to prevent an error if the URL already exists.
     # The database will simply ignore the new record.
-    data, count = supabase.table('links').insert({
+    rows = get_storage().insert('links', [{
         'url': url,
         'source_website': source,
         'scraped_date': datetime.utcnow().isoformat()
-    }).execute()
+    }])
 
-    # If data[1] is not empty, the insert was successful.
-    if data[1]:
+    # If rows is not empty, the insert was successful.
+    if rows:
         print("Link added successfully.")
-        return data[1][0] # Return the inserted record
+        return rows[0] # Return the inserted record
     else:
         print("Link is a duplicate and was ignored.")
         return None
@@ -129,10 +98,51 @@ def add_link(url: str, source: str):
     #     print(f"An error occurred while adding the link: {e}")
     #     return None
 
+def add_links(urls: List[str], source: str) -> List[Dict[str, Any]]:
+    """
+    Adds many links in bulk and returns only the newly inserted records.
+
+    The URLs are deduplicated and sent in chunks of LINK_UPSERT_CHUNK_SIZE, one
+    upsert request per chunk; links that are already stored are skipped by the
+    database's ON CONFLICT (url) DO NOTHING.
+    """
+    candidates = list(dict.fromkeys(url for url in urls if url))
+    if not candidates:
+        print(f"No links to add for {source}.")
+        return []
+
+    inserted: List[Dict[str, Any]] = []
+    scraped_date = datetime.utcnow().isoformat()
+    for start in range(0, len(candidates), LINK_UPSERT_CHUNK_SIZE):
+        chunk = candidates[start:start + LINK_UPSERT_CHUNK_SIZE]
+        records = [{'url': url, 'source_website': source, 'scraped_date': scraped_date} for url in chunk]
+        try:
+            # ignore_duplicates turns this into INSERT ... ON CONFLICT (url) DO NOTHING,
+            # so only the rows that were actually inserted come back.
+            inserted.extend(get_storage().upsert('links', records, on_conflict='url', ignore_duplicates=True))
+        except Exception as e:
+            print(f"An error occurred while adding links for {source}: {e}")
+
+    print(f"Added {len(inserted)} new links for {source} ({len(candidates)} found).")
+    return inserted
+
 def add_article(link_id: int, article_data: dict):
-    """Adds a scraped article to the database, ignoring duplicates based on URL."""
+    """
+    Adds a scraped article to the database, ignoring duplicates based on URL.
+    Articles whose text nearly matches an earlier one are linked to it through
+    canonical_article_id, so the analysis step can reuse its sentiments.
+    The scraped publication_date is kept as-is; published_at holds it normalized
+    to UTC, taken from article_data if the caller already normalized it.
+    """
     print(f"Attempting to add article for link_id: {link_id}")
     try:
+        # Fingerprint the text and look for an earlier version of the same story.
+        signature = compute_signature(article_data.get('cleaned_text') or '')
+        index = get_near_duplicate_index()
+        canonical_article_id = index.find_canonical(signature) if signature else None
+        if canonical_article_id:
+            print(f"Near-duplicate of article {canonical_article_id} detected.")
+
         # Prepare the record for insertion.
         record_to_insert = {
             'link_id': link_id,
@@ -140,23 +150,53 @@ def add_article(link_id: int, article_data: dict):
             'title': article_data.get('title'),
             'author': article_data.get('author'),
             'publication_date': article_data.get('publication_date'),
+            'published_at': article_data.get('published_at') or normalize_publication_date(article_data.get('publication_date')),
             'raw_text': article_data.get('raw_text'),
-            'cleaned_text': article_data.get('cleaned_text')
+            'cleaned_text': article_data.get('cleaned_text'),
+            'canonical_article_id': canonical_article_id
         }
 
         # Use ignore_duplicates=True to avoid errors on unique URL constraint.
-        data, count = supabase.table('articles').insert(record_to_insert).execute()
+        rows = get_storage().insert('articles', [record_to_insert])
+
+        # Only canonical articles are indexed, so later matches always resolve to the original.
+        if rows and signature and not canonical_article_id:
+            rows[0] = _index_canonical_article(index, rows[0], signature)
 
-        if data[1]:
+        if rows:
             print("Article added successfully.")
-            return data[1][0] # Return the newly created article record
+            mark_link_as_scraped(link_id)
+            return rows[0] # Return the newly created article record
         else:
             print("Article with this URL already exists and was ignored.")
+            mark_link_as_scraped(link_id)
             return None
+    except DuplicateKeyError as e:
+        # Another link already produced this article; don't keep this link pending forever.
+        print(f"Article with this URL already exists: {e}")
+        mark_link_as_scraped(link_id)
+        return None
     except Exception as e:
         print(f"An error occurred while adding the article: {e}")
         return None
     
+def _index_canonical_article(index, article: Dict[str, Any], signature: Tuple[int, ...]) -> Dict[str, Any]:
+    """
+    Indexes a newly stored article that had no near-duplicate when it was looked up.
+    A concurrent scrape worker may have stored another version of the same story in
+    the meantime, so the lookup is repeated under the index lock together with the
+    add: the version indexed first stays canonical and the other one is linked to it.
+    Only this step is serialized; inserts from different workers still overlap.
+    """
+    with index.lock:
+        canonical_article_id = index.find_canonical(signature)
+        if not canonical_article_id:
+            index.add(article['id'], signature)
+            return article
+    print(f"Near-duplicate of article {canonical_article_id} detected.")
+    get_storage().update('articles', {'canonical_article_id': canonical_article_id}, [('id', 'eq', article['id'])])
+    return {**article, 'canonical_article_id': canonical_article_id}
+
 def add_sentiment(article_id: int, entity_name: str, entity_type: str, financial_sentiment: str, overall_sentiment: str, reasoning: str):
     """Adds a sentiment record to the database."""
     print(f"Attempting to add sentiment for article_id: {article_id}")
@@ -169,11 +209,11 @@ def add_sentiment(article_id: int, entity_name: str, entity_type: str, financial
             'overall_sentiment': overall_sentiment,
             'reasoning': reasoning
         }
-        data, count = supabase.table('sentiments').insert(record).execute()
+        rows = get_storage().insert('sentiments', [record])
         
-        if data[1]:
+        if rows:
             print("Sentiment added successfully.")
-            return data[1][0]
+            return rows[0]
         return None
     except Exception as e:
         print(f"An error occurred while adding sentiment: {e}")
@@ -192,11 +232,11 @@ def add_usage_log(article_id: int, provider: str, usage_stats: dict):
             'total_cost_usd': usage_stats.get('total_cost_usd'),
             'timestamp': datetime.utcnow().isoformat()
         }
-        data, count = supabase.table('usage_logs').insert(record).execute()
+        rows = get_storage().insert('usage_logs', [record])
         
-        if data[1]:
+        if rows:
             print("Usage log added successfully.")
-            return data[1][0]
+            return rows[0]
         return None
     except Exception as e:
         print(f"An error occurred while adding usage log: {e}")
@@ -204,57 +244,442 @@ def add_usage_log(article_id: int, provider: str, usage_stats: dict):
     
 
 def add_pipeline_run(stats: dict):
-    """Adds a new pipeline run record to the database."""
+    """
+    Adds a new pipeline run record to the database. Analysis results that could not be
+    committed ('analysis_commit_failures') are noted in the recorded status.
+    """
     print("Attempting to log a pipeline run...")
     try:
+        status = stats.get('status', 'Completed')
+        if stats.get('analysis_commit_failures'):
+            status += f" ({stats['analysis_commit_failures']} article analyses failed to commit)"
         record = {
             'run_timestamp': datetime.utcnow().isoformat(),
             'new_links_found': stats.get('new_links_found', 0),
             'articles_scraped': stats.get('articles_scraped', 0),
             'entities_analyzed': stats.get('entities_analyzed', 0),
-            'status': stats.get('status', 'Completed')
+            'status': status
         }
-        data, count = supabase.table('pipeline_runs').insert(record).execute()
+        rows = get_storage().insert('pipeline_runs', [record])
         
-        if data[1]:
+        if rows:
             print("Pipeline run logged successfully.")
-            return data[1][0]
+            _notify_pipeline_run(rows[0])
+            return rows[0]
         return None
     except Exception as e:
         print(f"An error occurred while logging the pipeline run: {e}")
         return None
+
+def on_pipeline_run(listener: Callable[[Dict[str, Any]], None]):
+    """
+    Registers a callback invoked with every pipeline run recorded by add_pipeline_run.
+    A recorded run means the pipeline finished and the data behind read endpoints may have changed.
+    """
+    _pipeline_run_listeners.append(listener)
+
+def _notify_pipeline_run(run: Dict[str, Any]):
+    for listener in _pipeline_run_listeners:
+        try:
+            listener(run)
+        except Exception as e:
+            print(f"A pipeline run listener failed: {e}")
+
+# --- Data Version ---
+# Tables whose newest id changes whenever data behind the read endpoints is added.
+DATA_VERSION_TABLES = ('articles', 'sentiments', 'pipeline_runs')
+
+def get_data_version() -> str:
+    """
+    Returns a string that changes whenever the data behind the read endpoints does: the
+    newest id of each of DATA_VERSION_TABLES, plus the 'data_epoch' config value that
+    maintenance commands rewriting existing rows bump through touch_data_version.
+    One indexed lookup per table, so it is cheap enough to check on every request.
+    """
+    storage = get_storage()
+    parts = []
+    for table in DATA_VERSION_TABLES:
+        rows = storage.select(table, 'id', order_by='id', desc=True, limit=1)
+        parts.append(str(rows[0]['id']) if rows else '0')
+    epoch = storage.select('app_config', 'value', [('key', 'eq', 'data_epoch')])
+    parts.append(epoch[0]['value'] if epoch else '0')
+    return '.'.join(parts)
+
+def touch_data_version():
+    """Changes the data version after existing rows were rewritten in place (backfills, rebuilds)."""
+    set_config_value('data_epoch', datetime.utcnow().isoformat())
+
+# --- Analysis Commit ---
+def publication_day(published_at: Optional[str]) -> Optional[str]:
+    """Returns the UTC 'YYYY-MM-DD' day of a normalized published_at timestamp, or None."""
+    return str(published_at)[:10] if published_at else None
+
+def build_analysis_result(article_id: int, provider: str, entities: List[Any], usage_stats: Optional[dict],
+                          published_at: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Packs everything the analysis of one article produces (its usage log and
+    sentiments) into the payload accepted by commit_article_analyses. The
+    article's UTC publication day places its sentiments in the daily entity series.
+    """
+    usage_log = None
+    if usage_stats:
+        usage_log = {
+            'provider': provider,
+            'total_tokens': usage_stats.get('total_tokens'),
+            'prompt_tokens': usage_stats.get('prompt_tokens'),
+            'completion_tokens': usage_stats.get('completion_tokens'),
+            'total_cost_usd': usage_stats.get('total_cost_usd'),
+            'timestamp': datetime.utcnow().isoformat()
+        }
+    sentiments = [
+        {
+            'entity_name': entity.entity_name,
+            'entity_type': entity.entity_type,
+            'financial_sentiment': entity.financial_sentiment,
+            'overall_sentiment': entity.overall_sentiment,
+            'reasoning': entity.reasoning
+        }
+        for entity in entities or []
+    ]
+    return {'article_id': article_id, 'usage_log': usage_log, 'sentiments': sentiments,
+            'published_day': publication_day(published_at)}
+
+def commit_article_analyses(results: List[Dict[str, Any]]) -> List[int]:
+    """
+    Atomically stores the usage log and sentiments of each article and marks it analyzed.
+
+    Each article is all-or-nothing, so a crash can no longer leave partial sentiments
+    behind an is_analyzed = 0 flag. Articles that are already analyzed are skipped,
+    which makes retrying a batch safe. Entity names are resolved to registry ids for
+    the whole batch first, so every sentiment is stored with its entity_id.
+
+    Returns:
+        The ids of the articles committed.
+
+    Raises:
+        Whatever the storage backend raised; nothing in the batch was committed then.
+    """
+    if not results:
+        return []
+    print(f"Committing analysis results for {len(results)} articles...")
+    sentiments = [s for result in results for s in result.get('sentiments') or []]
+    entity_ids = get_entity_registry().resolve((s['entity_name'], s['entity_type']) for s in sentiments)
+    for s in sentiments:
+        s['entity_id'] = entity_ids.get((s['entity_name'], s['entity_type']))
+    committed = get_storage().commit_article_analyses(results)
+    print(f"Committed {len(committed)} articles.")
+    return committed
+
+
+def rebuild_entity_rollups():
+    """
+    Recomputes the entity_sentiment_counts and sentiment_stats rollups from the stored
+    sentiments. They are normally kept current by commit_article_analyses; this is the
+    backfill for existing data or after sentiments were edited by hand.
+    """
+    print("Rebuilding entity sentiment rollups...")
+    get_storage().rebuild_entity_rollups()
+    print("Entity sentiment rollups rebuilt.")
+
+def backfill_published_at(chunk_size: int = PUBLISHED_AT_BACKFILL_CHUNK_SIZE) -> int:
+    """
+    Fills in published_at for articles stored before it existed, reading each date in
+    its source's timezone like the scraping stage does. Each chunk is written back with
+    a single upsert on id rather than one update per article. Dates that can't be
+    parsed stay NULL. Returns the number of articles updated.
+    """
+    print("Backfilling normalized publication timestamps...")
+    storage = get_storage()
+    articles = storage.iter_rows(
+        'articles', 'id, link_id, url, publication_date',
+        [('published_at', 'is', None), ('publication_date', 'not_is', None)], prefetch=True
+    )
+    updated = 0
+    while True:
+        chunk = list(itertools.islice(articles, chunk_size))
+        if not chunk:
+            break
+        link_ids = list(dict.fromkeys(article['link_id'] for article in chunk))
+        sources: Dict[int, str] = {}
+        for start in range(0, len(link_ids), JOIN_CHUNK_SIZE):
+            for link in storage.select('links', 'id, source_website', [('id', 'in', link_ids[start:start + JOIN_CHUNK_SIZE])]):
+                sources[link['id']] = link['source_website']
+        # link_id and url are resent unchanged so the row satisfies NOT NULL on the insert side of the upsert.
+        rows = []
+        for article in chunk:
+            published_at = normalize_publication_date(article['publication_date'], sources.get(article['link_id']))
+            if published_at:
+                rows.append({'id': article['id'], 'link_id': article['link_id'], 'url': article['url'],
+                             'published_at': published_at})
+        storage.upsert('articles', rows, on_conflict='id', returning=False)
+        updated += len(rows)
+    print(f"Backfilled published_at for {updated} articles.")
+    return updated + backfill_sentiment_published_at(chunk_size)
+
+def backfill_sentiment_published_at(chunk_size: int = PUBLISHED_AT_BACKFILL_CHUNK_SIZE) -> int:
+    """
+    Copies each article's published_at onto its sentiments where it is missing, one
+    upsert on id per chunk. New sentiments get it when they are committed.
+    Returns the number of sentiments updated.
+    """
+    storage = get_storage()
+    sentiments = storage.iter_rows(
+        'sentiments', 'id, article_id, entity_name, entity_type, financial_sentiment, overall_sentiment',
+        [('published_at', 'is', None)], prefetch=True
+    )
+    updated = 0
+    while True:
+        chunk = list(itertools.islice(sentiments, chunk_size))
+        if not chunk:
+            break
+        # The NOT NULL columns are resent unchanged for the insert side of the upsert.
+        rows = [
+            {**{k: v for k, v in row.items() if k != 'article'}, 'published_at': row['article']['published_at']}
+            for row in attach_articles(chunk, columns='id, published_at', field='article')
+            if row['article'] and row['article']['published_at']
+        ]
+        storage.upsert('sentiments', rows, on_conflict='id', returning=False)
+        updated += len(rows)
+    print(f"Backfilled published_at for {updated} sentiments.")
+    return updated
+
+def backfill_entity_ids(chunk_size: int = ENTITY_ID_BACKFILL_CHUNK_SIZE) -> int:
+    """
+    Registers the entities of sentiments stored before the registry existed and fills
+    in their entity_id, one upsert on id per chunk. Returns the number of sentiments updated.
+    """
+    print("Backfilling sentiment entity ids...")
+    storage = get_storage()
+    sentiments = storage.iter_rows(
+        'sentiments', 'id, article_id, entity_name, entity_type, financial_sentiment, overall_sentiment, reasoning',
+        [('entity_id', 'is', None)], prefetch=True
+    )
+    updated = 0
+    while True:
+        chunk = list(itertools.islice(sentiments, chunk_size))
+        if not chunk:
+            break
+        entity_ids = get_entity_registry().resolve((row['entity_name'], row['entity_type']) for row in chunk)
+        # The NOT NULL columns are resent unchanged for the insert side of the upsert.
+        rows = [{**row, 'entity_id': entity_ids[(row['entity_name'], row['entity_type'])]}
+                for row in chunk if (row['entity_name'], row['entity_type']) in entity_ids]
+        storage.upsert('sentiments', rows, on_conflict='id', returning=False)
+        updated += len(rows)
+    print(f"Backfilled entity_id for {updated} sentiments.")
+    return updated
+
+# Numeric value of each sentiment label in the daily series; anything else counts as 0.
+_SENTIMENT_SCORES = {'positive': 1, 'negative': -1}
+
+def rebuild_entity_series(chunk_size: int = 1000):
+    """
+    Recomputes the entity_daily_sentiment series from the stored sentiments of analyzed
+    articles, placed by the UTC day of their published_at, the same as new results.
+    Run it while no pipeline is writing, e.g. once after backfill_published_at.
+    """
+    print("Rebuilding daily entity sentiment series...")
+    series: Dict[tuple, Dict[str, Any]] = {}
+    sentiments = get_storage().iter_rows(
+        'sentiments', 'id, article_id, entity_name, entity_type, financial_sentiment, overall_sentiment', prefetch=True
+    )
+    while True:
+        chunk = list(itertools.islice(sentiments, chunk_size))
+        if not chunk:
+            break
+        for row in attach_articles(chunk, columns='id, published_at, is_analyzed', field='article'):
+            article = row['article']
+            day = publication_day(article['published_at']) if article and article['is_analyzed'] else None
+            if not day:
+                continue
+            key = (row['entity_name'], row['entity_type'], day)
+            point = series.setdefault(key, {
+                'entity_name': key[0], 'entity_type': key[1], 'day': day,
+                'mentions': 0, 'financial_score_sum': 0, 'overall_score_sum': 0
+            })
+            point['mentions'] += 1
+            point['financial_score_sum'] += _SENTIMENT_SCORES.get(row['financial_sentiment'], 0)
+            point['overall_score_sum'] += _SENTIMENT_SCORES.get(row['overall_sentiment'], 0)
+
+    # Points that no longer have any sentiments (e.g. their article's day moved) are zeroed, not left stale.
+    for existing in get_storage().iter_rows('entity_daily_sentiment', 'id, entity_name, entity_type, day'):
+        key = (existing['entity_name'], existing['entity_type'], str(existing['day'])[:10])
+        series.setdefault(key, {'entity_name': key[0], 'entity_type': key[1], 'day': key[2],
+                                'mentions': 0, 'financial_score_sum': 0, 'overall_score_sum': 0})
+
+    rows = list(series.values())
+    for start in range(0, len(rows), chunk_size):
+        get_storage().upsert('entity_daily_sentiment', rows[start:start + chunk_size],
+                             on_conflict='entity_name,entity_type,day', returning=False)
+    print(f"Daily entity sentiment series rebuilt ({len(rows)} points).")
+
+
+class AnalysisWriteBuffer:
+    """
+    A write-behind buffer for analysis results. Results are coalesced and committed
+    through commit_article_analyses once `batch_size` articles are pending, or
+    `flush_interval` seconds after the first one arrived, whichever comes first.
+    Call close() (or use it as a context manager) to commit what is left.
+
+    Totals only count what was actually committed: `committed` articles and their
+    `sentiments_committed` sentiment records. Batches whose commit failed are counted
+    in `failed` with the error kept in `errors`; their articles stay unanalyzed and are
+    picked up again by the next run.
+    """
+    def __init__(self, batch_size: Optional[int] = None, flush_interval: Optional[float] = None):
+        self.batch_size = batch_size or ANALYSIS_COMMIT_BATCH_SIZE
+        self.flush_interval = flush_interval or ANALYSIS_COMMIT_INTERVAL
+        self.committed = 0
+        self.sentiments_committed = 0
+        self.failed = 0
+        self.errors: List[Exception] = []
+        self._pending: List[Dict[str, Any]] = []
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+        # Serializes commits without blocking producers that are only appending.
+        self._flush_lock = threading.Lock()
+
+    def add(self, result: Dict[str, Any]):
+        """Queues one article's result, committing the batch once it is full."""
+        with self._lock:
+            self._pending.append(result)
+            if len(self._pending) < self.batch_size:
+                if self._timer is None:
+                    self._timer = threading.Timer(self.flush_interval, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+        self.flush()
+
+    def flush(self) -> List[int]:
+        """
+        Commits every pending result. Returns the ids of the articles committed;
+        a failed commit is reported and recorded in `failed` and `errors`, not raised,
+        since flushes also run on the timer thread.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                batch, self._pending = self._pending, []
+            if not batch:
+                return []
+            try:
+                committed = commit_article_analyses(batch)
+            except Exception as e:
+                print(f"Failed to commit analysis results for {len(batch)} articles; they stay unanalyzed: {e}")
+                self.failed += len(batch)
+                self.errors.append(e)
+                return []
+            # If an article was queued twice, its first result is the one committed.
+            sentiment_counts: Dict[int, int] = {}
+            for result in batch:
+                sentiment_counts.setdefault(result['article_id'], len(result.get('sentiments') or []))
+            self.committed += len(committed)
+            self.sentiments_committed += sum(sentiment_counts.get(article_id, 0) for article_id in committed)
+            return committed
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self) -> 'AnalysisWriteBuffer':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
     
     
+def backfill_near_duplicate_index(chunk_size: int = NEAR_DUPLICATE_BACKFILL_CHUNK_SIZE) -> int:
+    """
+    Fingerprints the canonical articles stored before the near-duplicate index existed,
+    so new articles are matched against the whole history. Re-running is harmless.
+    Returns the number of articles indexed.
+    """
+    print("Backfilling the near-duplicate index...")
+    articles = get_storage().iter_rows(
+        'articles', 'id, cleaned_text', [('canonical_article_id', 'is', None), ('cleaned_text', 'not_is', None)], prefetch=True
+    )
+    indexed = 0
+    while True:
+        chunk = list(itertools.islice(articles, chunk_size))
+        if not chunk:
+            break
+        signatures = [(article['id'], compute_signature(article['cleaned_text'])) for article in chunk]
+        entries = [(article_id, signature) for article_id, signature in signatures if signature]
+        get_near_duplicate_index().add_many(entries)
+        indexed += len(entries)
+    print(f"Indexed {indexed} articles for near-duplicate detection.")
+    return indexed
+
 # --- Data Retrieval ---
+def attach_articles(rows: List[Dict[str, Any]], columns: str = 'id, publication_date', key: str = 'article_id',
+                    field: str = 'articles') -> List[Dict[str, Any]]:
+    """
+    Attaches each row's article under `field`, like a PostgREST embedded select.
+
+    Embedded joins only exist on Supabase, so the join is done in two steps that
+    work on every backend: the distinct article ids are fetched in chunks of
+    JOIN_CHUNK_SIZE with one `in` query each, then matched back in memory.
+    Rows whose article no longer exists get None.
+    """
+    article_ids = list(dict.fromkeys(row[key] for row in rows if row.get(key) is not None))
+    if 'id' not in [column.strip() for column in columns.split(',')]:
+        columns = f"id, {columns}"
+    articles: Dict[int, Dict[str, Any]] = {}
+    for start in range(0, len(article_ids), JOIN_CHUNK_SIZE):
+        chunk = article_ids[start:start + JOIN_CHUNK_SIZE]
+        for article in get_storage().select('articles', columns, [('id', 'in', chunk)]):
+            articles[article['id']] = article
+    for row in rows:
+        row[field] = articles.get(row.get(key))
+    return rows
+
+def page_article_ids(sentiment_filters: List[tuple], limit: int, after: Optional[tuple] = None) -> List[int]:
+    """
+    Returns the ids of the next `limit` articles, newest first, that have a sentiment
+    matching the filters, starting after the (published_at, article id) pair `after`.
+
+    Sentiments are read in bounded keyset pages on their copy of published_at, and
+    each page resumes after the last article seen, so neither the sentiments read
+    nor the resulting id list grow with the history of a popular entity.
+    """
+    article_ids: List[int] = []
+    batch_size = max(limit * 4, 50)
+    while len(article_ids) < limit:
+        rows = get_storage().select_page('sentiments', 'id, article_id, published_at', sentiment_filters,
+                                         sort='published_at', key='article_id', after=after, limit=batch_size)
+        for row in rows:
+            if row['article_id'] not in article_ids:
+                article_ids.append(row['article_id'])
+        if len(rows) < batch_size:
+            break
+        # The last article may have more matching sentiments past this page; they are skipped, it is already counted.
+        after = (rows[-1]['published_at'], rows[-1]['article_id'])
+    return article_ids[:limit]
+
 def get_unscraped_links() -> List[Dict[str, Any]]:
     """
-    Fetches links from the 'links' table that do not have a corresponding
-    entry in the 'articles' table.
+    Fetches links that have not been scraped yet (is_scraped = 0).
 
-    This is achieved by performing a LEFT JOIN from 'links' to 'articles'
-    and filtering for rows where the 'articles.id' is NULL.
+    The partial index on links (id) WHERE is_scraped = 0 keeps this proportional
+    to the number of pending links rather than the whole history. Rows are read in
+    id-ordered pages, which stays below the PostgREST row cap.
     """
     try:
-        print("Fetching unscraped links from Supabase...")
-        response = supabase.table('links').select(
-            'id, url, source_website'
-        ).execute()
-        
-        all_links = response.data
-        
-        # Get all link_ids from articles table
-        articles_response = supabase.table('articles').select('link_id').execute()
-        scraped_link_ids = {article['link_id'] for article in articles_response.data}
-        # Filter links that have not been scraped
-        unscraped_links = [
-            link for link in all_links if link['id'] not in scraped_link_ids
-        ]
+        print("Fetching unscraped links...")
+        unscraped_links = list(get_storage().iter_rows('links', 'id, url, source_website', [('is_scraped', 'eq', 0)]))
 
         print(f"Found {len(unscraped_links)} unscraped links.")
         return unscraped_links
     except Exception as e:
         print(f"An error occurred while fetching unscraped links: {e}")
         return []
+
+def mark_link_as_scraped(link_id: int):
+    """
+    Marks a link as scraped by setting is_scraped to 1.
+    """
+    return get_storage().update('links', {'is_scraped': 1}, [('id', 'eq', link_id)])
     
 
 def get_unanalyzed_articles():
@@ -262,8 +687,11 @@ def get_unanalyzed_articles():
     Fetches articles that have not been analyzed (is_analyzed = 0)
     and have valid cleaned_text.
     """
-    response = supabase.table('articles').select('id, cleaned_text').eq('is_analyzed', 0).neq('cleaned_text', None).neq('cleaned_text', 'N/A').execute()
-    articles = response.data
+    articles = list(get_storage().iter_rows(
+        'articles', 'id, cleaned_text, canonical_article_id, published_at',
+        [('is_analyzed', 'eq', 0), ('cleaned_text', 'not_is', None), ('cleaned_text', 'neq', 'N/A')],
+        prefetch=True
+    ))
     # Rename 'cleaned_text' to 'text' for compatibility with your usage.
     for article in articles:
         article['text'] = article.pop('cleaned_text')
@@ -273,5 +701,4 @@ def mark_article_as_analyzed(article_id):
     """
     Marks an article as analyzed by setting is_analyzed to 1.
     """
-    response = supabase.table('articles').update({'is_analyzed': 1}).eq('id', article_id).execute()
-    return response
\ No newline at end of file
+    return get_storage().update('articles', {'is_analyzed': 1}, [('id', 'eq', article_id)])
@@ -0,0 +1,45 @@
+# exports.py
+
+import io
+import csv
+import json
+from typing import Any, Dict, Iterable, Iterator, Sequence
+
+# --- Export Configuration ---
+EXPORT_FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+# Rows are serialized into chunks of roughly this many bytes before being handed to the server,
+# so the response isn't flushed once per row.
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+
+def _ndjson_lines(rows: Iterable[Dict[str, Any]], columns: Sequence[str]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps({column: row.get(column) for column in columns}, ensure_ascii=False, default=str) + '\n'
+
+def _csv_lines(rows: Iterable[Dict[str, Any]], columns: Sequence[str]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([row.get(column) for column in columns])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def stream_rows(rows: Iterable[Dict[str, Any]], columns: Sequence[str], export_format: str) -> Iterator[bytes]:
+    """
+    Serializes rows lazily as NDJSON (one object per line) or CSV (with a header row),
+    keeping only `columns`. Rows are pulled from `rows` as the client reads, so memory
+    use doesn't depend on the size of the export.
+    """
+    lines = _ndjson_lines(rows, columns) if export_format == 'ndjson' else _csv_lines(rows, columns)
+    chunk, size = [], 0
+    for line in lines:
+        chunk.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield ''.join(chunk).encode('utf-8')
+            chunk, size = [], 0
+    if chunk:
+        yield ''.join(chunk).encode('utf-8')
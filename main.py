@@ -1,12 +1,21 @@
 # main.py
 
+import time
+_import_started = time.perf_counter()
+
 import database
 import pipeline
+import snapshots
 from scrapers import scraper_manager
+from storage import get_storage
+import argparse
 import threading
 from typing import Dict, Any
 
-def main():
+# Heavy clients (storage backend, LLM SDKs) are created on first use, not at import.
+IMPORT_SECONDS = time.perf_counter() - _import_started
+
+def main(stream: bool = False, profile_startup: bool = False):
     """
     Main function to run the full data pipeline from the command line.
     This script will:
@@ -14,11 +23,20 @@ def main():
     2. Discover all available scrapers.
     3. Run the scraping pipeline to gather new article links and content.
     4. Run the analysis pipeline to process new articles for sentiment.
+
+    With `stream=True`, steps 3 and 4 run together: articles are analyzed as soon as they are scraped.
+    With `profile_startup=True`, import time and storage client start-up time are reported.
     """
     print("--- Starting Command-Line Pipeline Execution ---")
+    if profile_startup:
+        print(f"[startup] Modules imported in {IMPORT_SECONDS * 1000:.1f} ms.")
 
     # 1. Initialize the database
     database.create_database()
+    if profile_startup:
+        started = time.perf_counter()
+        get_storage()
+        print(f"[startup] Storage backend ready in {(time.perf_counter() - started) * 1000:.1f} ms.")
 
     # 2. Discover all available scrapers
     print("\nDiscovering scraper modules...")
@@ -39,6 +57,14 @@ def main():
     # but required by the function signature.
     stop_event = threading.Event()
 
+    if stream:
+        print("\n" + "="*20 + " STREAMING: SCRAPING + ANALYSIS " + "="*20)
+        pipeline.run_streaming_pipeline(status_tracker, scraper_modules, stop_event)
+        print("\n" + "="*50)
+        print("--- Command-Line Pipeline Execution Complete ---")
+        print("="*50)
+        return
+
     # 4. Run the scraping pipeline
     print("\n" + "="*20 + " STAGE 1: SCRAPING " + "="*20)
     pipeline.run_scraping_pipeline(status_tracker, scraper_modules, stop_event)
@@ -54,4 +80,33 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Run the news scraping and sentiment analysis pipeline.")
+    parser.add_argument("--stream", action="store_true", help="Analyze articles while scraping instead of afterwards.")
+    parser.add_argument("--profile-startup", action="store_true", help="Report import and client start-up times.")
+    parser.add_argument("--rebuild-rollups", action="store_true", help="Recompute the entity sentiment rollups and daily series, then exit.")
+    parser.add_argument("--backfill-dates", action="store_true", help="Normalize publication dates of existing articles to UTC, then exit.")
+    parser.add_argument("--backfill-entities", action="store_true", help="Register existing entity names and link their sentiments, then exit.")
+    parser.add_argument("--backfill-near-duplicates", action="store_true", help="Index existing articles for near-duplicate detection, then exit.")
+    parser.add_argument("--snapshot", action="store_true", help="Append new sentiments to the Parquet snapshot (needs pyarrow), then exit.")
+    parser.add_argument("--rebuild-snapshot", action="store_true", help="Rewrite the Parquet snapshot from scratch (needs pyarrow), then exit.")
+    args = parser.parse_args()
+    if args.backfill_dates:
+        database.backfill_published_at()
+        database.touch_data_version()
+    elif args.backfill_entities:
+        database.backfill_entity_ids()
+        database.touch_data_version()
+    elif args.backfill_near_duplicates:
+        database.backfill_near_duplicate_index()
+    elif args.rebuild_rollups:
+        database.rebuild_entity_rollups()
+        database.rebuild_entity_series()
+        database.touch_data_version()
+    elif args.snapshot or args.rebuild_snapshot:
+        if not snapshots.available():
+            parser.error("snapshots need pyarrow; install it with `pip install pyarrow`")
+        snapshots.rebuild_snapshot() if args.rebuild_snapshot else snapshots.append_snapshot()
+    else:
+        main(stream=args.stream, profile_startup=args.profile_startup)
+        if snapshots.SNAPSHOT_AFTER_RUN and snapshots.available():
+            snapshots.append_snapshot()
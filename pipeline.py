@@ -1,11 +1,39 @@
 # pipeline.py
 
 import database
-from analysis.sentiment_analyzer import SentimentAnalyzer
+from scrapers.date_normalizer import normalize_publication_date
+import os
 import threading
-from typing import List, Dict, Any
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future, FIRST_COMPLETED, wait
+import asyncio
+import queue
+from typing import List, Dict, Any, Optional, Callable, Tuple, TYPE_CHECKING
 
-def run_scraping_pipeline(status_tracker: Dict[str, Any], scraper_modules: List[Any], stop_event: threading.Event) -> Dict[str, int]:
+if TYPE_CHECKING:
+    # The analyzer pulls in LangChain and the provider SDKs; it is imported when analysis starts.
+    from analysis.sentiment_analyzer import SentimentAnalyzer
+
+# --- Scraping Concurrency Configuration ---
+# Article pages are fetched on a shared worker pool. Each source is additionally capped
+# so that no single site receives more than a few simultaneous requests.
+SCRAPE_MAX_WORKERS = int(os.getenv("SCRAPE_MAX_WORKERS", 8))
+SCRAPE_PER_SOURCE_LIMIT = int(os.getenv("SCRAPE_PER_SOURCE_LIMIT", 3))
+
+# --- Streaming Configuration ---
+# In streaming mode scraped articles are handed to analysis workers through a bounded
+# queue; when it is full, scraping waits for the analyzers to catch up.
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", 20))
+STREAM_ANALYSIS_WORKERS = int(os.getenv("STREAM_ANALYSIS_WORKERS", 2))
+
+# --- Analysis Concurrency Configuration ---
+# Maximum number of concurrent LLM requests in run_analysis_pipeline. 1 keeps the
+# original sequential behaviour; anything higher uses the async analysis mode.
+ANALYSIS_MAX_IN_FLIGHT = int(os.getenv("ANALYSIS_MAX_IN_FLIGHT", 1))
+
+def run_scraping_pipeline(status_tracker: Dict[str, Any], scraper_modules: List[Any], stop_event: threading.Event,
+                          max_workers: Optional[int] = None, per_source_limit: Optional[int] = None,
+                          on_article: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, int]:
     """
     Executes the scraping part of the data pipeline. It now accepts a list
     of scraper modules to run and a stop event for graceful termination.
@@ -14,6 +42,9 @@ def run_scraping_pipeline(status_tracker: Dict[str, Any], scraper_modules: List[
         status_tracker: A dictionary to update the real-time status of the pipeline.
         scraper_modules: A list of imported scraper modules to execute.
         stop_event: A threading.Event object to signal when to stop the process.
+        max_workers: Size of the article fetching worker pool. Defaults to SCRAPE_MAX_WORKERS.
+        per_source_limit: Maximum concurrent fetches per source. Defaults to SCRAPE_PER_SOURCE_LIMIT.
+        on_article: Optional callback invoked with each newly stored article record.
 
     Returns:
         A dictionary containing statistics about the scraping run.
@@ -26,30 +57,12 @@ def run_scraping_pipeline(status_tracker: Dict[str, Any], scraper_modules: List[
 
     print("run scraping pipelines.................")
     
-    new_links_found = 0
-    for i, scraper in enumerate(scraper_modules):
-        if stop_event.is_set():
-            print("Stop request received. Halting link scraping.")
-            status_tracker['status'] = 'Stopping...'
-            return {'new_links_found': new_links_found, 'articles_scraped': 0}
-        
-        source_name = getattr(scraper, 'SOURCE_NAME', 'Unknown Scraper')
-        print(f"\nRunning scraper for: {source_name}")
-        status_tracker['current_task'] = f"Fetching links from {source_name}"
-        
-        try:
-            urls = scraper.get_article_urls()
-            if not urls: 
-                print(f"No links found for {source_name}.")
-                continue
-            for url in urls:
-                if database.add_link(url=url, source=source_name):
-                    new_links_found += 1
-        except Exception as e:
-            print(f"Error running scraper {source_name}: {e}")
-
-        status_tracker['progress'] = i + 1
-    
+    new_links_found = _discover_links_concurrently(status_tracker, scraper_modules, stop_event)
+    if stop_event.is_set():
+        print("Stop request received. Halting link scraping.")
+        status_tracker['status'] = 'Stopping...'
+        return {'new_links_found': new_links_found, 'articles_scraped': 0}
+
     print(f"Finished scraping links. Found {new_links_found} new URLs.")
 
     print("===="*5)
@@ -70,32 +83,151 @@ def run_scraping_pipeline(status_tracker: Dict[str, Any], scraper_modules: List[
     if not links_to_scrape:
         status_tracker['current_task'] = 'No new articles to scrape.'
     else:
-        # Create a mapping from source name to scraper module for efficient lookup
-        scraper_map = {getattr(s, 'SOURCE_NAME', 'Unknown'): s for s in scraper_modules}
-        for i, link in enumerate(links_to_scrape):
+        articles_scraped_count = _scrape_links_concurrently(
+            status_tracker, scraper_modules, links_to_scrape, stop_event,
+            max_workers or SCRAPE_MAX_WORKERS, per_source_limit or SCRAPE_PER_SOURCE_LIMIT, on_article
+        )
+
+    print(f"Finished scraping articles. Scraped {articles_scraped_count} new articles.")
+    return {'new_links_found': new_links_found, 'articles_scraped': articles_scraped_count}
+
+def _fetch_source_links(scraper: Any) -> List[str]:
+    """Runs a scraper's link discovery. Runs inside a worker thread."""
+    source_name = getattr(scraper, 'SOURCE_NAME', 'Unknown Scraper')
+    print(f"\nRunning scraper for: {source_name}")
+    return scraper.get_article_urls() or []
+
+def _discover_links_concurrently(status_tracker: Dict[str, Any], scraper_modules: List[Any], stop_event: threading.Event) -> int:
+    """
+    Fetches the listing pages of all scrapers at the same time and stores new links
+    as each source's results arrive. A failing source is reported and skipped without
+    affecting the others.
+
+    Returns:
+        The number of new links added to the database.
+    """
+    new_links_found = 0
+    if not scraper_modules:
+        return new_links_found
+
+    executor = ThreadPoolExecutor(max_workers=len(scraper_modules), thread_name_prefix='link-discovery')
+    in_flight = {executor.submit(_fetch_source_links, scraper): getattr(scraper, 'SOURCE_NAME', 'Unknown Scraper')
+                 for scraper in scraper_modules}
+    completed = 0
+    try:
+        while in_flight and not stop_event.is_set():
+            # A short timeout keeps the loop responsive to stop_event while listings load.
+            done, _ = wait(in_flight, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in done:
+                source_name = in_flight.pop(future)
+                completed += 1
+                status_tracker['current_task'] = f"Fetching links from {source_name}"
+                try:
+                    urls = future.result()
+                    if not urls:
+                        print(f"No links found for {source_name}.")
+                    else:
+                        new_links_found += len(database.add_links(urls, source=source_name))
+                except Exception as e:
+                    print(f"Error running scraper {source_name}: {e}")
+                status_tracker['progress'] = completed
+    finally:
+        # Don't block on listings that are still loading after a stop request.
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return new_links_found
+
+def _scrape_link(scraper: Any, link: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Fetches a single link and stores the article. Runs inside a worker thread.
+    The publication date is normalized to UTC here, where the source (and so its timezone) is known.
+
+    Returns:
+        A tuple of the scraped article data and the stored article record (None if not stored).
+    """
+    print("link : ",link)
+    article_data = scraper.scrape_article_content(link['url'])
+    stored_article = None
+    if article_data:
+        article_data['published_at'] = normalize_publication_date(article_data.get('publication_date'), link['source_website'])
+        stored_article = database.add_article(link_id=link['id'], article_data=article_data)
+    return article_data, stored_article
+
+def _scrape_links_concurrently(status_tracker: Dict[str, Any], scraper_modules: List[Any], links: List[Dict[str, Any]],
+                               stop_event: threading.Event, max_workers: int, per_source_limit: int,
+                               on_article: Optional[Callable[[Dict[str, Any]], None]] = None) -> int:
+    """
+    Fetches article content for the given links on a shared worker pool.
+
+    Links are queued per source and handed to the pool round-robin, never keeping
+    more than `per_source_limit` requests in flight against a single source. All
+    status_tracker updates happen on the calling thread as fetches complete, so
+    progress stays consistent. Once stop_event is set no new fetches are started;
+    fetches already in flight are allowed to finish. `on_article` is also called on
+    the calling thread, so a blocking callback slows down dispatching new fetches.
+
+    Returns:
+        The number of articles scraped and stored.
+    """
+    # Create a mapping from source name to scraper module for efficient lookup
+    scraper_map = {getattr(s, 'SOURCE_NAME', 'Unknown'): s for s in scraper_modules}
+
+    pending: Dict[str, deque] = {}
+    completed = 0
+    for link in links:
+        if link['source_website'] in scraper_map:
+            pending.setdefault(link['source_website'], deque()).append(link)
+        else:
+            completed += 1 # No scraper selected for this source; nothing to fetch.
+    status_tracker['progress'] = completed
+
+    articles_scraped_count = 0
+    in_flight: Dict[Future, Dict[str, Any]] = {}
+    active_per_source: Dict[str, int] = {source: 0 for source in pending}
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scraper') as executor:
+        while pending or in_flight:
             if stop_event.is_set():
-                print("Stop request received. Halting article scraping.")
-                status_tracker['status'] = 'Stopping...'
-                break # Exit the loop gracefully
+                if pending:
+                    print("Stop request received. Halting article scraping.")
+                    status_tracker['status'] = 'Stopping...'
+                    pending.clear()
+            else:
+                # Fill free worker slots, rotating over sources that are below their cap.
+                for source in list(pending):
+                    while (len(in_flight) < max_workers and active_per_source[source] < per_source_limit
+                           and pending.get(source)):
+                        link = pending[source].popleft()
+                        future = executor.submit(_scrape_link, scraper_map[source], link)
+                        in_flight[future] = link
+                        active_per_source[source] += 1
+                    if source in pending and not pending[source]:
+                        del pending[source]
 
-            print("link : ",link)
+            if not in_flight:
+                break
 
-            scraper_to_use = scraper_map.get(link['source_website'])
-            if scraper_to_use:
+            # A short timeout keeps the loop responsive to stop_event while fetches are slow.
+            done, _ = wait(in_flight, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in done:
+                link = in_flight.pop(future)
+                active_per_source[link['source_website']] -= 1
+                completed += 1
                 try:
-                    article_data = scraper_to_use.scrape_article_content(link['url'])
+                    article_data, stored_article = future.result()
                     if article_data:
-                        database.add_article(link_id=link['id'], article_data=article_data)
                         articles_scraped_count += 1
                         status_tracker['current_task'] = f"Scraped: {article_data.get('title', 'N/A')}"
+                    if stored_article and on_article:
+                        on_article(stored_article)
                 except Exception as e:
                     print(f"Error scraping content from {link['url']}: {e}")
-            status_tracker['progress'] = i + 1
+                status_tracker['progress'] = completed
 
-    print(f"Finished scraping articles. Scraped {articles_scraped_count} new articles.")
-    return {'new_links_found': new_links_found, 'articles_scraped': articles_scraped_count}
+    return articles_scraped_count
 
-def run_analysis_pipeline(status_tracker: Dict[str, Any], stop_event: threading.Event, **kwargs: Any) -> Dict[str, int]:
+def run_analysis_pipeline(status_tracker: Dict[str, Any], stop_event: threading.Event,
+                          max_in_flight: Optional[int] = None, **kwargs: Any) -> Dict[str, int]:
     """
     Executes the analysis part of the pipeline. It now accepts a stop_event
     for graceful termination.
@@ -103,6 +235,8 @@ def run_analysis_pipeline(status_tracker: Dict[str, Any], stop_event: threading.
     Args:
         status_tracker: A dictionary to update the real-time status of the pipeline.
         stop_event: A threading.Event object to signal when to stop the process.
+        max_in_flight: Maximum concurrent LLM requests. Values above 1 switch to the async
+            analysis mode. Defaults to ANALYSIS_MAX_IN_FLIGHT.
         **kwargs: Configuration for the SentimentAnalyzer (provider, model_name, api keys).
 
     Returns:
@@ -111,6 +245,7 @@ def run_analysis_pipeline(status_tracker: Dict[str, Any], stop_event: threading.
 
     print("run analysis===================")
     try:
+        from analysis.sentiment_analyzer import SentimentAnalyzer
         analyzer = SentimentAnalyzer(**kwargs)
     except Exception as e:
         print(f"Failed to initialize SentimentAnalyzer: {e}")
@@ -126,41 +261,264 @@ def run_analysis_pipeline(status_tracker: Dict[str, Any], stop_event: threading.
 
     print("Analysis : ",len(articles_to_analyze))
     
-    sentiments_found_count = 0
     total_session_cost = 0.0
+    # Results are committed per article in one transaction, coalesced into batches.
+    writer = database.AnalysisWriteBuffer()
     
+    max_in_flight = max_in_flight or ANALYSIS_MAX_IN_FLIGHT
     if not articles_to_analyze:
         status_tracker['current_task'] = 'No new articles to analyze.'
+    elif max_in_flight > 1:
+        with writer:
+            total_session_cost = asyncio.run(_analyze_articles_async(
+                analyzer, articles_to_analyze, status_tracker, stop_event, max_in_flight, writer
+            ))
     else:
-        for i, article in enumerate(articles_to_analyze):
-            if stop_event.is_set():
-                print("Stop request received. Halting analysis.")
-                status_tracker['status'] = 'Stopping...'
-                break # Exit the loop gracefully
+        with writer:
+            for i, article in enumerate(articles_to_analyze):
+                if stop_event.is_set():
+                    print("Stop request received. Halting analysis.")
+                    status_tracker['status'] = 'Stopping...'
+                    break # Exit the loop gracefully
+
+                status_tracker['current_task'] = f"Analyzing article ID: {article['id']}"
+                try:
+                    total_session_cost += _analyze_article(analyzer, article, writer)
+                except Exception as e:
+                    print(f"Error analyzing article ID {article['id']}: {e}")
+
+                status_tracker['progress'] = i + 1
+            
+    # Counted from the writer, so results whose commit failed are not reported as stored.
+    print(f"\nFinished sentiment analysis. Stored {writer.sentiments_committed} new sentiment records.")
+    print(f"Total estimated cost for this session: ${total_session_cost:.6f} USD")
+    if analyzer.cache:
+        print(f"Analysis cache: {analyzer.cache.stats()}")
+    return _analysis_stats(writer)
+
+def _analysis_stats(writer: database.AnalysisWriteBuffer) -> Dict[str, int]:
+    """Run statistics from what the writer actually committed, plus the articles whose commit failed."""
+    if writer.failed:
+        print(f"{writer.failed} analyzed articles could not be committed and will be retried next run.")
+    return {'entities_analyzed': writer.sentiments_committed, 'analysis_commit_failures': writer.failed}
+
+def _analyze_article(analyzer: "SentimentAnalyzer", article: Dict[str, Any],
+                     writer: database.AnalysisWriteBuffer) -> float:
+    """
+    Analyzes one article and hands its usage log and sentiments to the writer,
+    which commits them and marks the article analyzed.
+
+    Returns:
+        The estimated cost in USD.
+    """
+    if _reuse_canonical_analysis(article, writer):
+        return 0.0
+    entities_list, usage_stats = analyzer.analyze_text_for_sentiment(article['text'])
+    return _store_analysis(analyzer.provider, article, entities_list, usage_stats, writer)
+
+def _reuse_canonical_analysis(article: Dict[str, Any], writer: database.AnalysisWriteBuffer) -> bool:
+    """
+    Near-duplicates (articles with a canonical_article_id) are not sent to the LLM.
+    Their sentiments are those of the canonical article, so they are only marked as
+    analyzed and don't add a second set of sentiment records for the same story.
+
+    Returns:
+        True if the article was handled as a near-duplicate.
+    """
+    canonical_article_id = article.get('canonical_article_id')
+    if not canonical_article_id:
+        return False
+    print(f"Article ID {article['id']} is a near-duplicate of {canonical_article_id}; reusing its sentiments.")
+    writer.add(database.build_analysis_result(article['id'], None, [], None))
+    return True
+
+def _store_analysis(provider: str, article: Dict[str, Any], entities_list: List[Any], usage_stats: Dict[str, Any],
+                    writer: database.AnalysisWriteBuffer) -> float:
+    """
+    Queues the usage log and sentiments produced for one article. The writer commits
+    them together with the analyzed flag, so the article is stored all-or-nothing,
+    and counts the sentiments once they are committed.
+
+    Returns:
+        The estimated cost in USD.
+    """
+    writer.add(database.build_analysis_result(
+        article['id'], provider, entities_list, usage_stats, published_at=article.get('published_at')
+    ))
+    return usage_stats.get('total_cost_usd', 0.0) if usage_stats else 0.0
+
+async def _analyze_articles_async(analyzer: "SentimentAnalyzer", articles: List[Dict[str, Any]], status_tracker: Dict[str, Any],
+                                  stop_event: threading.Event, max_in_flight: int,
+                                  writer: database.AnalysisWriteBuffer) -> float:
+    """
+    Analyzes articles concurrently with the chain's ainvoke, keeping at most
+    `max_in_flight` LLM requests open. Database writes run in worker threads so
+    they don't block the event loop. When stop_event is set, requests still in
+    flight are cancelled and no new ones are started.
 
+    Returns:
+        The total estimated cost in USD.
+    """
+    semaphore = asyncio.Semaphore(max_in_flight)
+    totals = {'cost': 0.0, 'completed': 0}
+
+    async def analyze_one(article: Dict[str, Any]):
+        async with semaphore:
+            if stop_event.is_set():
+                return
             status_tracker['current_task'] = f"Analyzing article ID: {article['id']}"
             try:
-                entities_list, usage_stats = analyzer.analyze_text_for_sentiment(article['text'])
-                
-                if usage_stats:
-                    database.add_usage_log(article['id'], analyzer.provider, usage_stats)
-                    total_session_cost += usage_stats.get('total_cost_usd', 0.0)
-
-                if entities_list:
-                    for entity in entities_list:
-                        database.add_sentiment(
-                            article_id=article['id'], entity_name=entity.entity_name,
-                            entity_type=entity.entity_type, financial_sentiment=entity.financial_sentiment,
-                            overall_sentiment=entity.overall_sentiment, reasoning=entity.reasoning
-                        )
-                        sentiments_found_count += 1
-                
-                database.mark_article_as_analyzed(article['id'])
+                if await asyncio.to_thread(_reuse_canonical_analysis, article, writer):
+                    totals['completed'] += 1
+                    status_tracker['progress'] = totals['completed']
+                    return
+                entities_list, usage_stats = await analyzer.aanalyze_text_for_sentiment(article['text'])
+                totals['cost'] += await asyncio.to_thread(
+                    _store_analysis, analyzer.provider, article, entities_list, usage_stats, writer
+                )
             except Exception as e:
                 print(f"Error analyzing article ID {article['id']}: {e}")
+            totals['completed'] += 1
+            status_tracker['progress'] = totals['completed']
 
-            status_tracker['progress'] = i + 1
-            
-    print(f"\nFinished sentiment analysis. Found {sentiments_found_count} new sentiment records.")
-    print(f"Total estimated cost for this session: ${total_session_cost:.6f} USD")
-    return {'entities_analyzed': sentiments_found_count}
+    tasks = [asyncio.create_task(analyze_one(article)) for article in articles]
+    while not all(task.done() for task in tasks):
+        if stop_event.is_set():
+            print("Stop request received. Halting analysis.")
+            status_tracker['status'] = 'Stopping...'
+            for task in tasks:
+                task.cancel()
+            break
+        await asyncio.wait(tasks, timeout=0.5, return_when=asyncio.FIRST_COMPLETED)
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    return totals['cost']
+
+def _has_analyzable_text(article: Dict[str, Any]) -> bool:
+    """Mirrors the cleaned_text filter used by database.get_unanalyzed_articles."""
+    text = article.get('cleaned_text', article.get('text'))
+    return bool(text) and text != 'N/A'
+
+def _put_until_stopped(work_queue: queue.Queue, item: Any, stop_event: threading.Event) -> bool:
+    """Blocks until the item fits in the queue. Returns False if stop_event was set first."""
+    while not stop_event.is_set():
+        try:
+            work_queue.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def run_streaming_pipeline(status_tracker: Dict[str, Any], scraper_modules: List[Any], stop_event: threading.Event,
+                           queue_size: Optional[int] = None, analysis_workers: Optional[int] = None,
+                           **kwargs: Any) -> Dict[str, int]:
+    """
+    Runs scraping and analysis at the same time. Each newly stored article is pushed
+    through a bounded queue straight to SentimentAnalyzer worker threads instead of
+    waiting for the whole scraping stage to finish. Articles left unanalyzed by earlier
+    runs are queued once scraping is done.
+
+    The scraping stage reports through the top-level status_tracker keys as usual,
+    while the analysis stage reports under status_tracker['analysis'].
+
+    Args:
+        status_tracker: A dictionary to update the real-time status of the pipeline.
+        scraper_modules: A list of imported scraper modules to execute.
+        stop_event: A threading.Event object to signal when to stop the process.
+        queue_size: Maximum number of articles waiting for analysis. Defaults to STREAM_QUEUE_SIZE.
+        analysis_workers: Number of analysis threads, each with at most one LLM request open,
+            so this is the stream's max_in_flight. Defaults to STREAM_ANALYSIS_WORKERS.
+        **kwargs: Configuration for the SentimentAnalyzer (provider, model_name, api keys).
+
+    Returns:
+        A dictionary containing the combined scraping and analysis statistics.
+    """
+    print("run streaming pipeline===================")
+    try:
+        from analysis.sentiment_analyzer import SentimentAnalyzer
+        analyzer = SentimentAnalyzer(**kwargs)
+    except Exception as e:
+        print(f"Failed to initialize SentimentAnalyzer: {e}")
+        status_tracker['status'] = f"Error: {e}"
+        return {**run_scraping_pipeline(status_tracker, scraper_modules, stop_event), 'entities_analyzed': 0}
+
+    work_queue: queue.Queue = queue.Queue(maxsize=queue_size or STREAM_QUEUE_SIZE)
+    worker_count = analysis_workers or STREAM_ANALYSIS_WORKERS
+    stats_lock = threading.Lock()
+    analysis_status = {'status': 'Waiting for articles', 'progress': 0, 'total': 0, 'queued': 0, 'current_task': 'N/A'}
+    status_tracker['analysis'] = analysis_status
+    totals = {'cost': 0.0}
+    enqueued_ids = set()
+    writer = database.AnalysisWriteBuffer()
+
+    def analysis_worker():
+        while True:
+            article = work_queue.get()
+            if article is None:
+                work_queue.task_done()
+                return
+            try:
+                # After a stop request the remaining queue is drained without analysis.
+                if not stop_event.is_set():
+                    with stats_lock:
+                        analysis_status['status'] = 'Analyzing sentiment'
+                        analysis_status['current_task'] = f"Analyzing article ID: {article['id']}"
+                    try:
+                        cost = _analyze_article(analyzer, article, writer)
+                        with stats_lock:
+                            totals['cost'] += cost
+                    except Exception as e:
+                        print(f"Error analyzing article ID {article['id']}: {e}")
+                    with stats_lock:
+                        analysis_status['progress'] += 1
+            finally:
+                with stats_lock:
+                    analysis_status['queued'] = work_queue.qsize()
+                work_queue.task_done()
+
+    def enqueue(article: Dict[str, Any]):
+        if article['id'] in enqueued_ids or not _has_analyzable_text(article):
+            return
+        item = {'id': article['id'], 'text': article.get('cleaned_text', article.get('text')),
+                'canonical_article_id': article.get('canonical_article_id'),
+                'published_at': article.get('published_at')}
+        if _put_until_stopped(work_queue, item, stop_event):
+            enqueued_ids.add(article['id'])
+            with stats_lock:
+                analysis_status['total'] += 1
+                analysis_status['queued'] = work_queue.qsize()
+
+    workers = [threading.Thread(target=analysis_worker, name=f"analysis-{n}", daemon=True) for n in range(worker_count)]
+    for worker in workers:
+        worker.start()
+
+    scraping_stats = {'new_links_found': 0, 'articles_scraped': 0}
+    try:
+        scraping_stats = run_scraping_pipeline(status_tracker, scraper_modules, stop_event, on_article=enqueue)
+
+        # Pick up anything earlier runs scraped but never analyzed.
+        if not stop_event.is_set():
+            status_tracker.update({'status': 'Analyzing sentiment', 'current_task': 'Queueing previously unanalyzed articles.'})
+            for article in database.get_unanalyzed_articles():
+                if stop_event.is_set():
+                    break
+                enqueue(article)
+    finally:
+        for _ in workers:
+            # Sentinels go in with a blocking put so that every worker is released.
+            work_queue.put(None)
+        for worker in workers:
+            worker.join()
+        writer.close()
+
+    if stop_event.is_set():
+        print("Stop request received. Halting streaming pipeline.")
+        status_tracker['status'] = 'Stopping...'
+        analysis_status['status'] = 'Stopping...'
+    else:
+        analysis_status['status'] = 'Done'
+    analysis_status['queued'] = 0
+
+    print(f"\nFinished streaming pipeline. Stored {writer.sentiments_committed} new sentiment records.")
+    print(f"Total estimated cost for this session: ${totals['cost']:.6f} USD")
+    return {**scraping_stats, **_analysis_stats(writer)}
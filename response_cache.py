@@ -0,0 +1,97 @@
+# response_cache.py
+
+import os
+import time
+import threading
+import functools
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from flask import current_app, request
+
+# --- Cache Configuration ---
+# Read endpoints only change when a pipeline run finishes, which clears the cache;
+# the TTL bounds staleness for processes that didn't run the pipeline themselves.
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", 300))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 512))
+
+
+class ResponseCache:
+    """A thread-safe in-memory cache with a per-entry TTL and least-recently-used eviction."""
+    def __init__(self, ttl: float = RESPONSE_CACHE_TTL, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Returns the cached value, or None if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        """Stores a value, evicting the least recently used entries beyond max_entries."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drops every entry, e.g. after new data was written."""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters and the current number of entries."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits, 'misses': self.misses,
+                'hit_rate': (self.hits / total) if total else 0.0,
+                'entries': len(self._entries), 'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl, 'invalidations': self.invalidations
+            }
+
+
+# --- Flask Integration ---
+response_cache = ResponseCache()
+
+def _request_key() -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+    """Keys a request by its path and its query args, sorted and stripped, so equivalent URLs share an entry."""
+    args = tuple(sorted((name, value.strip()) for name, value in request.args.items(multi=True)))
+    return request.path, args
+
+def cached_response(view: Callable) -> Callable:
+    """
+    Caches the successful (200) responses of a read-only Flask view in response_cache.
+    Error responses are never cached. Responses carry an X-Cache: HIT/MISS header.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        key = _request_key()
+        cached = response_cache.get(key)
+        if cached is not None:
+            body, mimetype = cached
+            response = current_app.response_class(body, status=200, mimetype=mimetype)
+            response.headers['X-Cache'] = 'HIT'
+            return response
+
+        response = current_app.make_response(view(*args, **kwargs))
+        if response.status_code == 200:
+            response_cache.set(key, (response.get_data(), response.mimetype))
+        response.headers['X-Cache'] = 'MISS'
+        return response
+    return wrapper
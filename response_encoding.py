@@ -0,0 +1,196 @@
+# response_encoding.py
+
+import os
+import gzip
+import hashlib
+import functools
+from typing import Any, Callable, Optional
+
+from flask import Flask, current_app, request
+from flask.json.provider import DefaultJSONProvider
+
+from response_cache import ResponseCache
+
+# orjson and brotli are optional: without them responses use Flask's json module and gzip only.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# --- Encoding Configuration ---
+# 'orjson' (the default when it is installed) or 'default' for Flask's own provider.
+JSON_PROVIDER = os.getenv("JSON_PROVIDER", "orjson")
+# Bodies smaller than this are sent as they are; compressing them costs more than it saves.
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", 1024))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 6))
+# Brotli's default quality (11) is meant for static assets; 5 compresses better than gzip at similar speed.
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", 5))
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/plain', 'text/html', 'text/csv'}
+# Seconds a data version is reused before it is read again, so a burst of conditional requests costs one read.
+DATA_VERSION_TTL = float(os.getenv("DATA_VERSION_TTL", 5))
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson. Output matches the default provider's
+    (sorted keys, compact, same fallback for dates and other types), just faster.
+    """
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return self._dumps(obj, indent=bool(kwargs.get('indent'))).decode('utf-8')
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+    def _dumps(self, obj: Any, indent: bool = False) -> bytes:
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=options)
+
+    def response(self, *args: Any, **kwargs: Any):
+        # Skips the str round trip: orjson already produces UTF-8 bytes.
+        if self._app.debug:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(self._dumps(self._prepare_response_obj(args, kwargs)) + b'\n', mimetype=self.mimetype)
+
+
+# --- Conditional Requests & Compression ---
+# Recently compressed bodies by (body hash, encoding), so cached responses aren't recompressed on every hit.
+_compressed_bodies = ResponseCache(max_entries=int(os.getenv("COMPRESSED_CACHE_MAX_ENTRIES", 64)))
+
+def _negotiate_encoding() -> Optional[str]:
+    """Picks brotli or gzip from the request's Accept-Encoding, or None for identity."""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+def encode_response(response):
+    """
+    after_request hook for GET responses that are complete in memory (streamed exports are left alone).
+
+    Responses of views without a data-versioned ETag (see etag_from_data_version) get a
+    strong ETag computed from the body, and a 304 Not Modified when it matches
+    If-None-Match; the view has run by then, so this saves bandwidth, not queries.
+    Bodies of at least COMPRESS_MIN_BYTES are compressed with brotli or gzip, as the
+    client accepts; each encoding is a separate representation with its own ETag suffix.
+    """
+    if (request.method != 'GET' or response.status_code != 200 or response.is_streamed
+            or response.direct_passthrough or 'Content-Encoding' in response.headers):
+        return response
+
+    body = response.get_data()
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    compressible = len(body) >= COMPRESS_MIN_BYTES and response.mimetype in COMPRESSIBLE_MIMETYPES
+    encoding = _negotiate_encoding() if compressible else None
+    if compressible:
+        response.vary.add('Accept-Encoding')
+    if 'ETag' not in response.headers:
+        response.set_etag(f"{digest}-{encoding}" if encoding else digest)
+        response.make_conditional(request)
+        if response.status_code == 304:
+            return response
+    if not encoding:
+        return response
+
+    compressed = _compressed_bodies.get((digest, encoding))
+    if compressed is None:
+        compressed = _compress(body, encoding)
+        _compressed_bodies.set((digest, encoding), compressed)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+# --- Data-Versioned ETags ---
+class DataVersion:
+    """
+    Reads the version of the stored data through `source`, reusing it for `ttl` seconds.
+    `on_change` is called whenever a read returns a different version than the last one,
+    e.g. to drop responses cached before another process wrote new data.
+    """
+    def __init__(self, source: Callable[[], str], ttl: float = DATA_VERSION_TTL,
+                 on_change: Optional[Callable[[], None]] = None):
+        self.source = source
+        self.on_change = on_change
+        self._versions = ResponseCache(ttl=ttl, max_entries=1)
+        self._last_version: Optional[str] = None
+
+    def get(self) -> Optional[str]:
+        """Returns the current data version, or None if it can't be read."""
+        version = self._versions.get('version')
+        if version is not None:
+            return version
+        try:
+            version = self.source()
+        except Exception as e:
+            print(f"Could not read the data version, falling back to body ETags: {e}")
+            return None
+        self._versions.set('version', version)
+        if self._last_version is not None and version != self._last_version and self.on_change:
+            self.on_change()
+        self._last_version = version
+        return version
+
+    def invalidate(self):
+        """Forces the next get() to read the version again, e.g. after a pipeline run."""
+        self._versions.clear()
+
+def etag_from_data_version(view: Callable) -> Callable:
+    """
+    Gives a read-only view a strong ETag derived from the data version instead of from its
+    body, and checks it before the view runs: an unchanged dashboard gets its 304 Not
+    Modified without any of the view's queries. The ETag covers the URL, its query args and
+    the encoding the client accepts, since each of those is a separate representation.
+    Views run as usual when the app has no data version (see init_response_encoding).
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        data_version = current_app.extensions.get('data_version')
+        version = data_version.get() if data_version else None
+        if version is None:
+            return view(*args, **kwargs)
+
+        encoding = _negotiate_encoding()
+        request_key = (version, request.path, sorted(request.args.items(multi=True)))
+        digest = hashlib.sha256(repr(request_key).encode('utf-8')).hexdigest()[:32]
+        etag = f"{digest}-{encoding}" if encoding else digest
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+        else:
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag)
+        response.vary.add('Accept-Encoding')
+        return response
+    return wrapper
+
+def init_response_encoding(app: Flask, data_version: Optional[Callable[[], str]] = None,
+                           on_data_change: Optional[Callable[[], None]] = None) -> Optional[DataVersion]:
+    """
+    Installs the orjson provider (if available and selected) and the ETag/compression hook.
+    With a `data_version` function, views decorated with etag_from_data_version get ETags
+    derived from it; the DataVersion tracking it is returned.
+    """
+    if orjson is not None and JSON_PROVIDER == 'orjson':
+        app.json = OrjsonProvider(app)
+    app.after_request(encode_response)
+    if data_version is None:
+        return None
+    app.extensions['data_version'] = DataVersion(data_version, on_change=on_data_change)
+    return app.extensions['data_version']
@@ -0,0 +1,70 @@
+# scrapers/date_normalizer.py
+
+import re
+from datetime import datetime, timezone
+from typing import Optional
+
+import pytz
+
+# Timezone assumed for dates a source prints without an offset ('July 2, 2025 10:30').
+SOURCE_TIMEZONES = {
+    'gulfnews.com': 'Asia/Dubai',
+    'zawya.com': 'Asia/Dubai',
+    'menabytes.com': 'Asia/Dhaka',
+}
+# Placeholders the scrapers store when a page has no date.
+MISSING_DATES = {'', 'n/a', 'date not found', 'none', 'null'}
+# Human-readable formats seen on article pages, tried after ISO 8601.
+DISPLAY_FORMATS = (
+    '%B %d, %Y', '%b %d, %Y', '%d %B %Y', '%d %b %Y',
+    '%B %d, %Y %H:%M', '%b %d, %Y %H:%M', '%B %d, %Y %I:%M %p', '%b %d, %Y %I:%M %p',
+    '%d %B %Y %H:%M', '%d %b %Y %H:%M',
+)
+# Canonical stored form; fixed width and always UTC, so it also sorts correctly as text.
+UTC_FORMAT = '%Y-%m-%dT%H:%M:%S+00:00'
+
+_LABEL_PREFIX = re.compile(r'^(published|updated|last updated)\s*(on)?\s*[:\-]?\s*', re.IGNORECASE)
+
+
+def _parse(value: str) -> Optional[datetime]:
+    """Parses ISO 8601 or one of DISPLAY_FORMATS; the result may be naive."""
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        pass
+    for date_format in DISPLAY_FORMATS:
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+    return None
+
+def parse_publication_date(value: Optional[str], source: Optional[str] = None) -> Optional[datetime]:
+    """
+    Parses a scraped publication date into a timezone-aware UTC datetime.
+
+    Values with an offset are converted to UTC. Naive timestamps are read in the
+    source's timezone (SOURCE_TIMEZONES), or as UTC for unknown sources. Bare dates
+    ('2025-06-30', 'July 2, 2025') have no time to convert and become midnight UTC
+    of that day, so their calendar day is kept. Returns None for placeholders like
+    'N/A' and anything unparseable.
+    """
+    if value is None:
+        return None
+    text = _LABEL_PREFIX.sub('', str(value).strip())
+    if text.lower() in MISSING_DATES:
+        return None
+    parsed = _parse(text)
+    if parsed is None:
+        return None
+    if parsed.tzinfo is not None:
+        return parsed.astimezone(timezone.utc)
+    # Without a ':' there is no time of day, only a calendar date.
+    if ':' not in text or source not in SOURCE_TIMEZONES:
+        return parsed.replace(tzinfo=timezone.utc)
+    return pytz.timezone(SOURCE_TIMEZONES[source]).localize(parsed).astimezone(timezone.utc)
+
+def normalize_publication_date(value: Optional[str], source: Optional[str] = None) -> Optional[str]:
+    """Returns the publication date as a UTC ISO 8601 string (UTC_FORMAT), or None if it can't be read."""
+    parsed = parse_publication_date(value, source)
+    return parsed.strftime(UTC_FORMAT) if parsed else None
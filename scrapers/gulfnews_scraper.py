@@ -2,12 +2,17 @@ import requests
 import json
 from bs4 import BeautifulSoup
 import re
+from scrapers import http_client
 
 # --- Scraper Configuration ---
 SOURCE_NAME = "gulfnews.com"
 # URL for the main page to start scraping links from
 BASE_URL = "https://gulfnews.com/business"
 
+# Pooled session used for all requests; scraper_manager hands in the shared one.
+# It applies http_client.DEFAULT_TIMEOUT to every request.
+http_session = http_client.get_session()
+
 def get_article_urls():
     """
     Scrapes the Gulf News business section page to find all news article links.
@@ -19,7 +24,7 @@ def get_article_urls():
     print(f"--- Fetching article links from: {BASE_URL} ---")
     try:
         # Use the BASE_URL constant defined in this file
-        response = requests.get(BASE_URL, headers={'User-Agent': 'Mozilla/5.0'})
+        response = http_session.get(BASE_URL)
         response.raise_for_status()
         
         soup = BeautifulSoup(response.content, 'html.parser')
@@ -63,8 +68,7 @@ def scrape_article_content(url):
     """
     print(f"--- Scraping article content from: {url} ---")
     try:
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        response = requests.get(url, headers=headers)
+        response = http_session.get(url)
         response.raise_for_status()
         
         soup = BeautifulSoup(response.content, 'html.parser')
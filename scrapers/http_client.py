@@ -0,0 +1,62 @@
+# scrapers/http_client.py
+
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# --- HTTP Configuration ---
+# Connection pools are kept per host, so these values bound the number of
+# keep-alive connections held open against each news site.
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 10
+# (connect, read) timeout in seconds applied to every request that doesn't set its own.
+DEFAULT_TIMEOUT = (5, 15)
+
+# Only advertise brotli when a decoder is installed; urllib3 picks it up automatically.
+try:
+    import brotli  # noqa: F401
+    _ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        _ACCEPT_ENCODING = 'gzip, deflate, br'
+    except ImportError:
+        _ACCEPT_ENCODING = 'gzip, deflate'
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0',
+    'Accept-Encoding': _ACCEPT_ENCODING,
+    'Connection': 'keep-alive',
+}
+
+
+class PooledSession(requests.Session):
+    """A requests.Session with keep-alive connection pools and a default timeout."""
+    def __init__(self, timeout=DEFAULT_TIMEOUT, pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE):
+        super().__init__()
+        self.timeout = timeout
+        self.headers.update(DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+    def request(self, method, url, **kwargs):
+        """Sends the request, applying the session timeout unless one is given."""
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().request(method, url, **kwargs)
+
+
+_session: Optional[PooledSession] = None
+_session_lock = threading.Lock()
+
+def get_session() -> PooledSession:
+    """Returns the process-wide pooled session shared by all scrapers."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = PooledSession()
+    return _session
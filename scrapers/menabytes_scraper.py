@@ -2,18 +2,22 @@
 
 import requests
 from bs4 import BeautifulSoup
+from scrapers import http_client
 
 # --- Scraper Configuration ---
 SOURCE_NAME = "menabytes.com"
 BASE_URL = "https://www.menabytes.com"
 
+# Pooled session used for all requests; scraper_manager hands in the shared one.
+http_session = http_client.get_session()
+
 def get_article_urls():
     """
     Scrapes the main page of menabytes.com to find all news article links.
     """
     print(f"Fetching article links from: {BASE_URL}")
     try:
-        response = requests.get(BASE_URL, headers={'User-Agent': 'Mozilla/5.0'})
+        response = http_session.get(BASE_URL)
         response.raise_for_status()
         
         soup = BeautifulSoup(response.content, 'html.parser')
@@ -40,7 +44,7 @@ def scrape_article_content(url):
     """
     print(f"Scraping article content from: {url}")
     try:
-        response = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'})
+        response = http_session.get(url)
         response.raise_for_status()
         soup = BeautifulSoup(response.content, 'html.parser')
 
@@ -2,6 +2,7 @@ import os
 import importlib
 import inspect
 from typing import List, Dict, Any, Optional
+from scrapers import http_client
 
 # A cache to avoid re-discovering scrapers on every request
 _scraper_cache: Dict[str, Any] = {}
@@ -15,6 +16,9 @@ def discover_scrapers() -> Dict[str, Any]:
     - A `get_article_urls` function
     - A `scrape_article_content` function
 
+    Every valid module is handed the shared pooled HTTP session as its
+    `http_session` attribute, so connections are reused across all scrapers.
+
     Returns:
         A dictionary mapping the scraper's SOURCE_NAME to its imported module object.
     """
@@ -40,6 +44,7 @@ def discover_scrapers() -> Dict[str, Any]:
                     source_name = getattr(module, 'SOURCE_NAME')
                     if source_name in discovered_scrapers:
                         print(f"Warning: Duplicate scraper source name '{source_name}' found. Overwriting.")
+                    module.http_session = http_client.get_session()
                     discovered_scrapers[source_name] = module
                 else:
                     print(f"Warning: Scraper module {module_name} is missing required attributes and will be ignored.")
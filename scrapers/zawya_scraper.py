@@ -2,17 +2,20 @@
 
 import requests
 from bs4 import BeautifulSoup
+from scrapers import http_client
 
 SOURCE_NAME = "zawya.com"
 BASE_URL = "https://www.zawya.com"
 
+# Pooled session used for all requests; scraper_manager hands in the shared one.
+http_session = http_client.get_session()
+
 def get_article_urls():
     """Scrapes the list of article URLs from the Zawya business page."""
     list_url = f"{BASE_URL}/en/business"
     print(f"Fetching article links from: {list_url}")
     try:
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        response = requests.get(list_url, headers=headers, timeout=15)
+        response = http_session.get(list_url, timeout=15)
         response.raise_for_status()
         
         soup = BeautifulSoup(response.content, 'lxml')
@@ -35,8 +38,7 @@ def scrape_article_content(url):
     """
     print(f"Scraping article content from: {url}")
     try:
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        response = requests.get(url, headers=headers, timeout=10)
+        response = http_session.get(url, timeout=10)
         response.raise_for_status()
 
         soup = BeautifulSoup(response.content, 'lxml')
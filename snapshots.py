@@ -0,0 +1,131 @@
+# snapshots.py
+
+import os
+import shutil
+import itertools
+import threading
+from datetime import datetime
+from typing import Any, Dict, List
+
+import database
+from storage import get_storage
+
+# pyarrow is optional: without it snapshots are unavailable and everything else works as before.
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError:
+    pa = ds = None
+
+# --- Snapshot Configuration ---
+# Hive-partitioned Parquet dataset of sentiments joined with their articles: <dir>/month=YYYY-MM/part-*.parquet
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join("snapshots", "sentiments"))
+# Append new sentiments to the snapshot after every pipeline run (when pyarrow is installed).
+SNAPSHOT_AFTER_RUN = os.getenv("SNAPSHOT_AFTER_RUN", "1") == "1"
+# Sentiments per Parquet write; bounds memory while appending.
+SNAPSHOT_CHUNK_ROWS = int(os.getenv("SNAPSHOT_CHUNK_ROWS", 50000))
+# app_config key holding the id of the last sentiment written to the snapshot.
+WATERMARK_KEY = 'snapshot_last_sentiment_id'
+# Partition for sentiments whose article has no usable publication date.
+UNKNOWN_MONTH = 'unknown'
+
+_snapshot_lock = threading.Lock()
+
+if pa is not None:
+    # Entity names and the sentiment labels repeat heavily, so they are dictionary-encoded.
+    SNAPSHOT_SCHEMA = pa.schema([
+        ('sentiment_id', pa.int64()),
+        ('article_id', pa.int64()),
+        ('entity_id', pa.int64()),
+        ('entity_name', pa.dictionary(pa.int32(), pa.string())),
+        ('entity_type', pa.dictionary(pa.int8(), pa.string())),
+        ('financial_sentiment', pa.dictionary(pa.int8(), pa.string())),
+        ('overall_sentiment', pa.dictionary(pa.int8(), pa.string())),
+        ('reasoning', pa.string()),
+        ('published_at', pa.timestamp('s', tz='UTC')),
+        ('title', pa.string()),
+        ('url', pa.string()),
+        ('month', pa.string()),
+    ])
+
+
+def available() -> bool:
+    """True if pyarrow is installed, so snapshots can be written."""
+    return pa is not None
+
+def _to_table(rows: List[Dict[str, Any]]) -> "pa.Table":
+    """Builds one Arrow table from sentiment rows with their article attached."""
+    columns: Dict[str, list] = {field.name: [] for field in SNAPSHOT_SCHEMA}
+    for row in rows:
+        article = row.get('article') or {}
+        published_at = datetime.fromisoformat(str(row['published_at']).replace('Z', '+00:00')) if row.get('published_at') else None
+        columns['sentiment_id'].append(row['id'])
+        columns['article_id'].append(row['article_id'])
+        columns['entity_id'].append(row.get('entity_id'))
+        for name in ('entity_name', 'entity_type', 'financial_sentiment', 'overall_sentiment', 'reasoning'):
+            columns[name].append(row.get(name))
+        columns['published_at'].append(published_at)
+        columns['title'].append(article.get('title'))
+        columns['url'].append(article.get('url'))
+        columns['month'].append(published_at.strftime('%Y-%m') if published_at else UNKNOWN_MONTH)
+    return pa.table({field.name: pa.array(columns[field.name], type=field.type) for field in SNAPSHOT_SCHEMA},
+                    schema=SNAPSHOT_SCHEMA)
+
+def append_snapshot(chunk_rows: int = SNAPSHOT_CHUNK_ROWS) -> Dict[str, Any]:
+    """
+    Appends every sentiment stored since the last snapshot to the Parquet dataset.
+
+    Sentiments are read in id order above the watermark kept in app_config, joined to
+    their articles chunk by chunk and written as new files into their month partitions;
+    existing files are never rewritten. The watermark moves after each chunk is on
+    disk, and a chunk's file names derive from its first id, so an interrupted append
+    is simply redone by the next one.
+    """
+    if not available():
+        raise RuntimeError("Snapshots need pyarrow; install it with `pip install pyarrow`.")
+    with _snapshot_lock:
+        watermark = int(database.get_config_value(WATERMARK_KEY, 0) or 0)
+        print(f"Appending sentiments after id {watermark} to the snapshot in {SNAPSHOT_DIR}...")
+        sentiments = get_storage().iter_rows(
+            'sentiments', 'id, article_id, entity_id, entity_name, entity_type, financial_sentiment, '
+                          'overall_sentiment, reasoning, published_at',
+            [('id', 'gt', watermark)], prefetch=True
+        )
+        written = 0
+        while True:
+            chunk = list(itertools.islice(sentiments, chunk_rows))
+            if not chunk:
+                break
+            table = _to_table(database.attach_articles(chunk, columns='id, title, url', field='article'))
+            ds.write_dataset(
+                table, SNAPSHOT_DIR, format='parquet',
+                partitioning=ds.partitioning(pa.schema([('month', pa.string())]), flavor='hive'),
+                basename_template=f"part-{chunk[0]['id']:012d}-{{i}}.parquet",
+                existing_data_behavior='overwrite_or_ignore'
+            )
+            watermark = chunk[-1]['id']
+            database.set_config_value(WATERMARK_KEY, str(watermark))
+            written += len(chunk)
+        print(f"Snapshot appended: {written} sentiments.")
+        return {'appended': written, 'last_sentiment_id': watermark, 'path': SNAPSHOT_DIR}
+
+def rebuild_snapshot() -> Dict[str, Any]:
+    """Deletes the dataset and writes it again from the first sentiment, e.g. after a backfill changed old rows."""
+    if not available():
+        raise RuntimeError("Snapshots need pyarrow; install it with `pip install pyarrow`.")
+    with _snapshot_lock:
+        shutil.rmtree(SNAPSHOT_DIR, ignore_errors=True)
+        database.set_config_value(WATERMARK_KEY, '0')
+    return append_snapshot()
+
+def snapshot_status() -> Dict[str, Any]:
+    """Describes the dataset on disk: its path, partitions, files, size and watermark."""
+    files = [os.path.join(root, name) for root, _, names in os.walk(SNAPSHOT_DIR) for name in names if name.endswith('.parquet')]
+    return {
+        'available': available(),
+        'path': SNAPSHOT_DIR,
+        'last_sentiment_id': int(database.get_config_value(WATERMARK_KEY, 0) or 0),
+        'partitions': sorted({os.path.basename(os.path.dirname(path)) for path in files}),
+        'files': len(files),
+        'bytes': sum(os.path.getsize(path) for path in files),
+    }
@@ -0,0 +1,34 @@
+# storage/__init__.py
+
+import os
+import threading
+from typing import Optional
+
+from storage.base import StorageBackend, StorageError, DuplicateKeyError, Filter, READ_PAGE_SIZE
+
+# Which backend the application uses: 'supabase' (default) or 'sqlite'.
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "supabase").lower()
+
+_backend: Optional[StorageBackend] = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(name: str = STORAGE_BACKEND) -> StorageBackend:
+    """Creates a new storage backend by name. Backend modules are imported on demand."""
+    if name == 'supabase':
+        from storage.supabase_backend import SupabaseBackend
+        return SupabaseBackend()
+    if name == 'sqlite':
+        from storage.sqlite_backend import SQLiteBackend
+        return SQLiteBackend()
+    raise ValueError(f"Unknown storage backend: {name}. Use 'supabase' or 'sqlite'.")
+
+def get_storage() -> StorageBackend:
+    """Returns the process-wide storage backend selected by STORAGE_BACKEND."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend()
+                print(f"Using '{_backend.name}' storage backend.")
+    return _backend
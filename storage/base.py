@@ -0,0 +1,131 @@
+# storage/base.py
+
+import os
+import re
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Rows per page for paginated reads; must not exceed the PostgREST max-rows setting (1000 by default).
+READ_PAGE_SIZE = int(os.getenv("READ_PAGE_SIZE", 1000))
+
+# A filter is a (column, operator, value) triple, e.g. ('entity_type', 'eq', 'company').
+Filter = Tuple[str, str, Any]
+
+# Supported filter operators. 'is' and 'not_is' only take None (IS NULL / IS NOT NULL).
+OPERATORS = {'eq', 'neq', 'gt', 'gte', 'lt', 'lte', 'in', 'like', 'ilike', 'is', 'not_is'}
+
+# --- Entity Rollups ---
+# entity_sentiment_counts keeps one counter per dimension and label for every
+# (entity_name, entity_type); sentiment_stats keeps the same counters globally,
+# plus 'total_sentiments', 'articles_analyzed' and 'total_entities'.
+SENTIMENT_LABELS = ('positive', 'negative', 'neutral')
+ROLLUP_COLUMNS = [f"{dimension}_{label}" for dimension in ('financial', 'overall') for label in SENTIMENT_LABELS]
+
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+class StorageError(Exception):
+    """Base class for errors raised by storage backends."""
+
+class DuplicateKeyError(StorageError):
+    """Raised when an insert violates a unique constraint."""
+
+
+def validate_identifier(name: str) -> str:
+    """Ensures a table or column name is a plain identifier before it is used in a query."""
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"Invalid identifier: {name!r}")
+    return name
+
+def parse_columns(columns: str) -> List[str]:
+    """Splits a PostgREST-style column list ('id, url') into validated column names."""
+    if columns.strip() == '*':
+        return ['*']
+    return [validate_identifier(column.strip()) for column in columns.split(',') if column.strip()]
+
+
+class StorageBackend:
+    """
+    The interface every storage backend implements. It mirrors the small subset of
+    the PostgREST query model the application uses: table-level selects with simple
+    filters, keyset-paginated iteration, counts, and bulk inserts/upserts/updates.
+    """
+    name = 'base'
+
+    def select(self, table: str, columns: str = '*', filters: Sequence[Filter] = (),
+               order_by: Optional[str] = None, desc: bool = False, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Returns the rows matching all filters. Without a limit, use iter_rows for large tables.
+        `order_by` may name several comma-separated columns, all sorted in the same direction.
+        NULLs in `order_by` sort last in either direction, on every backend.
+        """
+        raise NotImplementedError
+
+    def select_page(self, table: str, columns: str, filters: Sequence[Filter], sort: str, key: str = 'id',
+                    after: Optional[Tuple[Any, Any]] = None, limit: int = READ_PAGE_SIZE) -> List[Dict[str, Any]]:
+        """
+        Returns up to `limit` rows in descending (`sort`, `key`) order, starting strictly
+        after the (sort value, key value) pair `after`, for keyset-paginated listings.
+        Rows with a NULL `sort` come last. Filters only support AND, so the page is read
+        in at most three ordered segments (same sort value with a smaller key, smaller
+        sort values, NULL sort values), each of which an index on (`sort`, `key`) serves.
+        """
+        if after is None:
+            segments = [[]]
+        elif after[0] is None:
+            segments = [[(sort, 'is', None), (key, 'lt', after[1])]]
+        else:
+            segments = [[(sort, 'eq', after[0]), (key, 'lt', after[1])], [(sort, 'lt', after[0])], [(sort, 'is', None)]]
+        rows: List[Dict[str, Any]] = []
+        for segment in segments:
+            rows.extend(self.select(table, columns, list(filters) + segment, order_by=f"{sort},{key}",
+                                    desc=True, limit=limit - len(rows)))
+            if len(rows) >= limit:
+                break
+        return rows
+
+    def iter_rows(self, table: str, columns: str = '*', filters: Sequence[Filter] = (), page_size: int = READ_PAGE_SIZE,
+                  key: str = 'id', prefetch: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Streams every matching row in ascending `key` order using keyset pagination,
+        holding one page in memory at a time. `columns` must include `key`.
+        """
+        raise NotImplementedError
+
+    def count(self, table: str, filters: Sequence[Filter] = ()) -> int:
+        """Returns the number of rows matching all filters."""
+        raise NotImplementedError
+
+    def insert(self, table: str, rows: List[Dict[str, Any]], returning: bool = True) -> List[Dict[str, Any]]:
+        """
+        Inserts rows and returns the stored records, or [] when `returning` is False.
+        Raises DuplicateKeyError on unique violations.
+        """
+        raise NotImplementedError
+
+    def upsert(self, table: str, rows: List[Dict[str, Any]], on_conflict: str,
+               ignore_duplicates: bool = False, returning: bool = True) -> List[Dict[str, Any]]:
+        """
+        Inserts rows, resolving conflicts on `on_conflict` by updating the existing row,
+        or by skipping it when `ignore_duplicates` is set. Returns the written records.
+        """
+        raise NotImplementedError
+
+    def update(self, table: str, values: Dict[str, Any], filters: Sequence[Filter]) -> List[Dict[str, Any]]:
+        """Updates every row matching the filters and returns the updated records."""
+        raise NotImplementedError
+
+    def commit_article_analyses(self, results: List[Dict[str, Any]]) -> List[int]:
+        """
+        Stores the analysis output of several articles. Each result holds an
+        'article_id', an optional 'usage_log' row and a list of 'sentiments' rows.
+        For every article that is not yet analyzed, its usage log and sentiments are
+        written, the entity rollups and global counters are incremented (as is the
+        daily series when the result has a 'published_day'), and is_analyzed is set
+        in one transaction. Returns the ids of the articles committed; articles that
+        were already analyzed are left out. Raises if the transaction fails.
+        """
+        raise NotImplementedError
+
+    def rebuild_entity_rollups(self):
+        """Recomputes entity_sentiment_counts and sentiment_stats from the sentiments of analyzed articles."""
+        raise NotImplementedError
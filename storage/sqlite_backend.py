@@ -0,0 +1,386 @@
+# storage/sqlite_backend.py
+
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from storage.base import (
+    StorageBackend, DuplicateKeyError, Filter, OPERATORS, READ_PAGE_SIZE, ROLLUP_COLUMNS, parse_columns, validate_identifier
+)
+
+# --- SQLite Configuration ---
+SQLITE_DB_PATH = os.getenv("SQLITE_DB_PATH", "news_data.db")
+# Prepared statements kept per connection; the pipeline reuses a small, fixed set of queries.
+STATEMENT_CACHE_SIZE = 256
+BUSY_TIMEOUT_MS = 5000
+
+# SUM(financial_sentiment = 'positive'), ... in ROLLUP_COLUMNS order.
+_ROLLUP_SUMS = ', '.join(
+    f"SUM({column.split('_')[0]}_sentiment = '{column.split('_')[1]}')" for column in ROLLUP_COLUMNS
+)
+
+# Adds one article's sentiments to the daily series of each of its entities.
+_SERIES_UPSERT = '''
+    INSERT INTO entity_daily_sentiment (entity_name, entity_type, day, mentions, financial_score_sum, overall_score_sum)
+    SELECT entity_name, entity_type, ?, COUNT(*),
+           SUM(CASE financial_sentiment WHEN 'positive' THEN 1 WHEN 'negative' THEN -1 ELSE 0 END),
+           SUM(CASE overall_sentiment WHEN 'positive' THEN 1 WHEN 'negative' THEN -1 ELSE 0 END)
+    FROM sentiments WHERE article_id = ?
+    GROUP BY entity_name, entity_type
+    ON CONFLICT (entity_name, entity_type, day) DO UPDATE SET
+        mentions = mentions + excluded.mentions,
+        financial_score_sum = financial_score_sum + excluded.financial_score_sum,
+        overall_score_sum = overall_score_sum + excluded.overall_score_sum'''
+
+_SQL_OPERATORS = {'eq': '=', 'neq': '!=', 'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<=', 'like': 'LIKE', 'ilike': 'LIKE'}
+
+
+# --- Schema ---
+def _add_column_if_missing(cursor: sqlite3.Cursor, table: str, column: str, definition: str) -> bool:
+    """
+    Adds a column to an existing table; CREATE TABLE IF NOT EXISTS won't add it to old databases.
+    Returns True if the column was added.
+    """
+    existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+    if column in existing:
+        return False
+    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return True
+
+def create_schema(conn: sqlite3.Connection):
+    """Creates all tables and indexes if they don't exist, and migrates older databases."""
+    cursor = conn.cursor()
+    # Links to be scraped
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS links (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL UNIQUE,
+        source_website TEXT NOT NULL, scraped_date TEXT NOT NULL,
+        is_scraped INTEGER NOT NULL DEFAULT 0
+    )''')
+    # Scraped article content
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS articles (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, link_id INTEGER NOT NULL,
+        url TEXT NOT NULL UNIQUE, title TEXT, author TEXT, publication_date TEXT,
+        raw_text TEXT, cleaned_text TEXT, is_analyzed INTEGER DEFAULT 0,
+        canonical_article_id INTEGER, published_at TEXT,
+        FOREIGN KEY (link_id) REFERENCES links (id),
+        FOREIGN KEY (canonical_article_id) REFERENCES articles (id)
+    );''')
+    # MinHash signatures and LSH bucket keys of canonical articles (see analysis/near_duplicates.py)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS near_duplicate_signatures (
+        article_id INTEGER PRIMARY KEY, signature TEXT NOT NULL,
+        FOREIGN KEY (article_id) REFERENCES articles (id)
+    )''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS near_duplicate_buckets (
+        bucket_key TEXT NOT NULL, article_id INTEGER NOT NULL,
+        PRIMARY KEY (bucket_key, article_id), FOREIGN KEY (article_id) REFERENCES articles (id)
+    )''')
+    # Sentiment analysis results
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS sentiments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, article_id INTEGER NOT NULL,
+        entity_name TEXT NOT NULL, entity_type TEXT NOT NULL,
+        financial_sentiment TEXT NOT NULL, overall_sentiment TEXT NOT NULL,
+        reasoning TEXT, entity_id INTEGER, published_at TEXT,
+        FOREIGN KEY (article_id) REFERENCES articles (id), FOREIGN KEY (entity_id) REFERENCES entities (id)
+    )''')
+    # API usage and cost tracking logs
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS usage_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, article_id INTEGER NOT NULL,
+        provider TEXT NOT NULL, total_tokens INTEGER, prompt_tokens INTEGER,
+        completion_tokens INTEGER, total_cost_usd REAL, timestamp TEXT NOT NULL,
+        FOREIGN KEY (article_id) REFERENCES articles (id)
+    )''')
+    # Application settings
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS app_config (
+        key TEXT PRIMARY KEY, value TEXT NOT NULL
+    )''')
+    # Pipeline execution statistics
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS pipeline_runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, run_timestamp TEXT NOT NULL,
+        new_links_found INTEGER, articles_scraped INTEGER,
+        entities_analyzed INTEGER, status TEXT
+    )''')
+    # Canonical entities and every surface name seen for each (see analysis/entity_registry.py)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS entities (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, entity_type TEXT NOT NULL,
+        name_key TEXT NOT NULL, UNIQUE (name_key, entity_type)
+    )''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS entity_aliases (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, alias TEXT NOT NULL, entity_type TEXT NOT NULL,
+        alias_key TEXT NOT NULL, entity_id INTEGER NOT NULL,
+        UNIQUE (alias, entity_type), FOREIGN KEY (entity_id) REFERENCES entities (id)
+    )''')
+    # Columns added after the initial schema
+    _add_column_if_missing(cursor, 'articles', 'canonical_article_id', 'INTEGER REFERENCES articles (id)')
+    if _add_column_if_missing(cursor, 'links', 'is_scraped', 'INTEGER NOT NULL DEFAULT 0'):
+        cursor.execute("UPDATE links SET is_scraped = 1 WHERE id IN (SELECT link_id FROM articles)")
+    # Normalized UTC publication time (see scrapers/date_normalizer.py); backfilled by database.backfill_published_at
+    _add_column_if_missing(cursor, 'articles', 'published_at', 'TEXT')
+    # Registry id of each sentiment's entity; backfilled by database.backfill_entity_ids
+    _add_column_if_missing(cursor, 'sentiments', 'entity_id', 'INTEGER REFERENCES entities (id)')
+    # Copy of the article's published_at, so sentiment filters and article paging share one index
+    _add_column_if_missing(cursor, 'sentiments', 'published_at', 'TEXT')
+    # Pending links are looked up on every run
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_links_unscraped ON links (id) WHERE is_scraped = 0")
+    # Indexes for the API's entity lookups, article joins and pipeline backlog scans
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sentiments_entity_name ON sentiments (entity_name)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sentiments_article_id ON sentiments (article_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_entity_aliases_alias_key ON entity_aliases (alias_key, entity_type)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_entity_aliases_entity_id ON entity_aliases (entity_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_articles_is_analyzed ON articles (is_analyzed)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_articles_publication_date ON articles (publication_date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_articles_published_at ON articles (published_at)")
+    # Keyset pages walk (published_at, id) / (timestamp, id); SQLite appends the rowid to every index
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_usage_logs_timestamp ON usage_logs (timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sentiments_published_at ON sentiments (published_at, article_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sentiments_entity_id_published_at ON sentiments (entity_id, published_at, article_id)")
+    # Superseded by the index above, which has entity_id as its prefix
+    cursor.execute("DROP INDEX IF EXISTS idx_sentiments_entity_id")
+    # Entity rollups, maintained by commit_article_analyses
+    rollups_exist = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'entity_sentiment_counts'"
+    ).fetchone()
+    cursor.execute(f'''
+    CREATE TABLE IF NOT EXISTS entity_sentiment_counts (
+        entity_name TEXT NOT NULL, entity_type TEXT NOT NULL,
+        {', '.join(f"{column} INTEGER NOT NULL DEFAULT 0" for column in ROLLUP_COLUMNS)},
+        total INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (entity_name, entity_type)
+    )''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS sentiment_stats (
+        key TEXT PRIMARY KEY, value INTEGER NOT NULL DEFAULT 0
+    )''')
+    # Daily per-entity score sums, maintained by commit_article_analyses; backfilled by database.rebuild_entity_series
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS entity_daily_sentiment (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, entity_name TEXT NOT NULL, entity_type TEXT NOT NULL,
+        day TEXT NOT NULL, mentions INTEGER NOT NULL DEFAULT 0,
+        financial_score_sum INTEGER NOT NULL DEFAULT 0, overall_score_sum INTEGER NOT NULL DEFAULT 0,
+        UNIQUE (entity_name, entity_type, day)
+    )''')
+    # top_entities orders by one of the counters
+    for column in ROLLUP_COLUMNS:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_entity_sentiment_counts_{column} ON entity_sentiment_counts ({column})")
+    if not rollups_exist:
+        _rebuild_entity_rollups(cursor)
+    # Set default schedule time if not present
+    cursor.execute("INSERT OR IGNORE INTO app_config (key, value) VALUES (?, ?)", ('schedule_time', '01:00'))
+    conn.commit()
+
+def _rebuild_entity_rollups(cursor: sqlite3.Cursor):
+    """Recomputes the rollups from scratch. Only analyzed articles count, matching commit_article_analyses."""
+    analyzed = "FROM sentiments s JOIN articles a ON a.id = s.article_id WHERE a.is_analyzed = 1"
+    cursor.execute("DELETE FROM entity_sentiment_counts")
+    cursor.execute("DELETE FROM sentiment_stats")
+    cursor.execute(f'''
+    INSERT INTO entity_sentiment_counts (entity_name, entity_type, {', '.join(ROLLUP_COLUMNS)}, total)
+    SELECT entity_name, entity_type, {_ROLLUP_SUMS}, COUNT(*) {analyzed}
+    GROUP BY entity_name, entity_type''')
+    row = cursor.execute(f"SELECT COUNT(*), COUNT(DISTINCT s.article_id), {_ROLLUP_SUMS} {analyzed}").fetchone()
+    entities = cursor.execute("SELECT COUNT(*) FROM entity_sentiment_counts").fetchone()[0]
+    stats = {'total_sentiments': row[0], 'articles_analyzed': row[1], 'total_entities': entities,
+             **dict(zip(ROLLUP_COLUMNS, row[2:]))}
+    cursor.executemany("INSERT INTO sentiment_stats (key, value) VALUES (?, ?)", [(k, v or 0) for k, v in stats.items()])
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Storage backend on a local SQLite file, for development and single-node deployments.
+
+    Each thread gets its own connection in WAL mode, so the API can read while the
+    pipeline writes. Queries are built from a fixed set of shapes with bound
+    parameters, so the per-connection statement cache reuses their prepared form.
+    """
+    name = 'sqlite'
+
+    def __init__(self, path: str = SQLITE_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        create_schema(self._connection())
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, cached_statements=STATEMENT_CACHE_SIZE)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            # NORMAL is durable across application crashes in WAL mode and avoids an fsync per commit.
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    # --- Query helpers ---
+    def _where(self, filters: Sequence[Filter]) -> Tuple[str, List[Any]]:
+        clauses, params = [], []
+        for column, operator, value in filters:
+            if operator not in OPERATORS:
+                raise ValueError(f"Unsupported filter operator: {operator}")
+            column = validate_identifier(column)
+            if operator == 'in':
+                values = list(value)
+                if not values:
+                    clauses.append("0")
+                    continue
+                clauses.append(f"{column} IN ({','.join('?' * len(values))})")
+                params.extend(values)
+            elif operator == 'is':
+                clauses.append(f"{column} IS NULL")
+            elif operator == 'not_is':
+                clauses.append(f"{column} IS NOT NULL")
+            else:
+                clauses.append(f"{column} {_SQL_OPERATORS[operator]} ?")
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _write(self, sql: str, params_list: List[Sequence[Any]], returning: bool) -> List[Dict[str, Any]]:
+        """Runs one statement per parameter set inside a single transaction."""
+        conn = self._connection()
+        rows: List[Dict[str, Any]] = []
+        try:
+            with conn:
+                if returning:
+                    for params in params_list:
+                        rows.extend(dict(row) for row in conn.execute(sql, params).fetchall())
+                else:
+                    conn.executemany(sql, params_list)
+        except sqlite3.IntegrityError as e:
+            if 'UNIQUE constraint failed' in str(e):
+                raise DuplicateKeyError(str(e)) from e
+            raise
+        return rows
+
+    # --- StorageBackend ---
+    def select(self, table: str, columns: str = '*', filters: Sequence[Filter] = (),
+               order_by: Optional[str] = None, desc: bool = False, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        where, params = self._where(filters)
+        sql = f"SELECT {', '.join(parse_columns(columns))} FROM {validate_identifier(table)}{where}"
+        if order_by:
+            direction = 'DESC' if desc else 'ASC'
+            sql += " ORDER BY " + ', '.join(f"{column} {direction} NULLS LAST" for column in parse_columns(order_by))
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return [dict(row) for row in self._connection().execute(sql, params).fetchall()]
+
+    def iter_rows(self, table: str, columns: str = '*', filters: Sequence[Filter] = (), page_size: int = READ_PAGE_SIZE,
+                  key: str = 'id', prefetch: bool = False) -> Iterator[Dict[str, Any]]:
+        # Local pages are cheap to fetch, so prefetching is not worth a thread here.
+        after = None
+        while True:
+            page_filters = list(filters) + ([(key, 'gt', after)] if after is not None else [])
+            page = self.select(table, columns, page_filters, order_by=key, limit=page_size)
+            yield from page
+            if len(page) < page_size:
+                return
+            after = page[-1][key]
+
+    def count(self, table: str, filters: Sequence[Filter] = ()) -> int:
+        where, params = self._where(filters)
+        return self._connection().execute(f"SELECT COUNT(*) FROM {validate_identifier(table)}{where}", params).fetchone()[0]
+
+    def insert(self, table: str, rows: List[Dict[str, Any]], returning: bool = True) -> List[Dict[str, Any]]:
+        """Inserts rows in one transaction; with returning=False they go through a single executemany."""
+        if not rows:
+            return []
+        columns = [validate_identifier(column) for column in rows[0]]
+        sql = f"INSERT INTO {validate_identifier(table)} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        if returning:
+            sql += " RETURNING *"
+        return self._write(sql, [[row.get(column) for column in columns] for row in rows], returning)
+
+    def upsert(self, table: str, rows: List[Dict[str, Any]], on_conflict: str,
+               ignore_duplicates: bool = False, returning: bool = True) -> List[Dict[str, Any]]:
+        if not rows:
+            return []
+        columns = [validate_identifier(column) for column in rows[0]]
+        conflict_columns = [validate_identifier(column.strip()) for column in on_conflict.split(',')]
+        updates = [column for column in columns if column not in conflict_columns]
+        sql = (f"INSERT INTO {validate_identifier(table)} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+               f"ON CONFLICT ({', '.join(conflict_columns)}) ")
+        if ignore_duplicates or not updates:
+            sql += "DO NOTHING"
+        else:
+            sql += "DO UPDATE SET " + ', '.join(f"{column} = excluded.{column}" for column in updates)
+        if returning:
+            # DO NOTHING returns only the rows that were actually inserted, matching PostgREST.
+            sql += " RETURNING *"
+        return self._write(sql, [[row.get(column) for column in columns] for row in rows], returning)
+
+    def update(self, table: str, values: Dict[str, Any], filters: Sequence[Filter]) -> List[Dict[str, Any]]:
+        columns = [validate_identifier(column) for column in values]
+        where, params = self._where(filters)
+        sql = f"UPDATE {validate_identifier(table)} SET {', '.join(f'{column} = ?' for column in columns)}{where} RETURNING *"
+        return self._write(sql, [[values[column] for column in columns] + params], returning=True)
+
+    def commit_article_analyses(self, results: List[Dict[str, Any]]) -> List[int]:
+        conn = self._connection()
+        committed: List[int] = []
+        with conn:
+            # Take the write lock up front so the is_analyzed check and the writes can't interleave with another writer.
+            conn.execute("BEGIN IMMEDIATE")
+            for result in results:
+                article_id = result['article_id']
+                if conn.execute("SELECT 1 FROM articles WHERE id = ? AND is_analyzed = 0", (article_id,)).fetchone() is None:
+                    continue
+                # Clear partial sentiments left behind by an interrupted per-row write.
+                conn.execute("DELETE FROM sentiments WHERE article_id = ?", (article_id,))
+                usage_log = result.get('usage_log')
+                if usage_log:
+                    conn.execute(
+                        "INSERT INTO usage_logs (article_id, provider, total_tokens, prompt_tokens, completion_tokens, total_cost_usd, timestamp) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (article_id, usage_log.get('provider'), usage_log.get('total_tokens'), usage_log.get('prompt_tokens'),
+                         usage_log.get('completion_tokens'), usage_log.get('total_cost_usd'), usage_log.get('timestamp'))
+                    )
+                conn.executemany(
+                    "INSERT INTO sentiments (article_id, entity_name, entity_type, financial_sentiment, overall_sentiment, reasoning, entity_id, published_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, (SELECT published_at FROM articles WHERE id = ?))",
+                    [(article_id, s.get('entity_name'), s.get('entity_type'), s.get('financial_sentiment'),
+                      s.get('overall_sentiment'), s.get('reasoning'), s.get('entity_id'), article_id) for s in result.get('sentiments') or []]
+                )
+                if result.get('sentiments'):
+                    self._increment_rollups(conn, article_id)
+                    if result.get('published_day'):
+                        conn.execute(_SERIES_UPSERT, (result['published_day'], article_id))
+                conn.execute("UPDATE articles SET is_analyzed = 1 WHERE id = ?", (article_id,))
+                committed.append(article_id)
+        return committed
+
+    def _increment_rollups(self, conn: sqlite3.Connection, article_id: int):
+        """Adds one article's freshly inserted sentiments to the entity rollups and global counters."""
+        new_entities = conn.execute('''
+            SELECT COUNT(*) FROM (SELECT DISTINCT entity_name, entity_type FROM sentiments WHERE article_id = ?) s
+            WHERE NOT EXISTS (
+                SELECT 1 FROM entity_sentiment_counts c WHERE c.entity_name = s.entity_name AND c.entity_type = s.entity_type
+            )''', (article_id,)).fetchone()[0]
+        conn.execute(f'''
+            INSERT INTO entity_sentiment_counts (entity_name, entity_type, {', '.join(ROLLUP_COLUMNS)}, total)
+            SELECT entity_name, entity_type, {_ROLLUP_SUMS}, COUNT(*) FROM sentiments WHERE article_id = ?
+            GROUP BY entity_name, entity_type
+            ON CONFLICT (entity_name, entity_type) DO UPDATE SET
+            {', '.join(f"{column} = {column} + excluded.{column}" for column in ROLLUP_COLUMNS + ['total'])}''', (article_id,))
+        row = conn.execute(f"SELECT COUNT(*), {_ROLLUP_SUMS} FROM sentiments WHERE article_id = ?", (article_id,)).fetchone()
+        deltas = {'total_sentiments': row[0], 'articles_analyzed': 1, 'total_entities': new_entities,
+                  **dict(zip(ROLLUP_COLUMNS, row[1:]))}
+        conn.executemany(
+            "INSERT INTO sentiment_stats (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = value + excluded.value",
+            list(deltas.items())
+        )
+
+    def rebuild_entity_rollups(self):
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            _rebuild_entity_rollups(conn.cursor())
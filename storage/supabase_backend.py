@@ -0,0 +1,114 @@
+# storage/supabase_backend.py
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from supabase import create_client, Client
+from postgrest.types import ReturnMethod
+
+from storage.base import StorageBackend, DuplicateKeyError, Filter, OPERATORS, READ_PAGE_SIZE
+
+
+def _return_method(returning: bool) -> ReturnMethod:
+    # 'minimal' skips serializing the written rows back over the wire.
+    return ReturnMethod.representation if returning else ReturnMethod.minimal
+
+
+class SupabaseBackend(StorageBackend):
+    """Storage backend that talks to Supabase (PostgREST) over HTTPS."""
+    name = 'supabase'
+
+    def __init__(self, url: Optional[str] = None, key: Optional[str] = None):
+        url = url or os.environ.get("SUPABASE_URL", "YOUR_SUPABASE_URL")
+        key = key or os.environ.get("SUPABASE_KEY", "YOUR_SUPABASE_ANON_KEY")
+        self.client: Client = create_client(url, key)
+
+    # --- Query helpers ---
+    def _apply_filters(self, query: Any, filters: Sequence[Filter]) -> Any:
+        for column, operator, value in filters:
+            if operator not in OPERATORS:
+                raise ValueError(f"Unsupported filter operator: {operator}")
+            if operator == 'in':
+                query = query.in_(column, list(value))
+            elif operator == 'is':
+                query = query.is_(column, 'null')
+            elif operator == 'not_is':
+                query = query.not_.is_(column, 'null')
+            else:
+                query = getattr(query, operator)(column, value)
+        return query
+
+    def _execute(self, query: Any) -> List[Dict[str, Any]]:
+        try:
+            return query.execute().data or []
+        except Exception as e:
+            # PostgreSQL unique_violation
+            if getattr(e, 'code', None) == '23505' or 'duplicate key' in str(e):
+                raise DuplicateKeyError(str(e)) from e
+            raise
+
+    # --- StorageBackend ---
+    def select(self, table: str, columns: str = '*', filters: Sequence[Filter] = (),
+               order_by: Optional[str] = None, desc: bool = False, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        query = self._apply_filters(self.client.table(table).select(columns), filters)
+        if order_by:
+            # Postgres puts NULLs first when descending; keep them last like SQLite.
+            for column in order_by.split(','):
+                query = query.order(column.strip(), desc=desc, nullsfirst=False)
+        if limit is not None:
+            query = query.limit(limit)
+        return self._execute(query)
+
+    def iter_rows(self, table: str, columns: str = '*', filters: Sequence[Filter] = (), page_size: int = READ_PAGE_SIZE,
+                  key: str = 'id', prefetch: bool = False) -> Iterator[Dict[str, Any]]:
+        # Query builders are mutable, so every page starts from a fresh one.
+        def fetch_page(after: Optional[Any]) -> List[Dict[str, Any]]:
+            page_filters = list(filters) + ([(key, 'gt', after)] if after is not None else [])
+            return self.select(table, columns, page_filters, order_by=key, limit=page_size)
+
+        if not prefetch:
+            page = fetch_page(None)
+            while True:
+                yield from page
+                if len(page) < page_size:
+                    return
+                page = fetch_page(page[-1][key])
+
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='page-prefetch') as executor:
+            page = fetch_page(None)
+            while True:
+                next_page = executor.submit(fetch_page, page[-1][key]) if len(page) == page_size else None
+                yield from page
+                if next_page is None:
+                    return
+                page = next_page.result()
+
+    def count(self, table: str, filters: Sequence[Filter] = ()) -> int:
+        query = self._apply_filters(self.client.table(table).select('*', count='exact'), filters).limit(1)
+        return query.execute().count or 0
+
+    def insert(self, table: str, rows: List[Dict[str, Any]], returning: bool = True) -> List[Dict[str, Any]]:
+        if not rows:
+            return []
+        return self._execute(self.client.table(table).insert(rows, returning=_return_method(returning)))
+
+    def upsert(self, table: str, rows: List[Dict[str, Any]], on_conflict: str,
+               ignore_duplicates: bool = False, returning: bool = True) -> List[Dict[str, Any]]:
+        if not rows:
+            return []
+        return self._execute(self.client.table(table).upsert(
+            rows, on_conflict=on_conflict, ignore_duplicates=ignore_duplicates, returning=_return_method(returning)
+        ))
+
+    def update(self, table: str, values: Dict[str, Any], filters: Sequence[Filter]) -> List[Dict[str, Any]]:
+        return self._execute(self._apply_filters(self.client.table(table).update(values), filters))
+
+    def commit_article_analyses(self, results: List[Dict[str, Any]]) -> List[int]:
+        # One RPC call; the function body runs in a single Postgres transaction.
+        # See commit_article_analyses in supabase_migrations.sql.
+        response = self.client.rpc('commit_article_analyses', {'results': results}).execute()
+        return list(response.data or [])
+
+    def rebuild_entity_rollups(self):
+        self.client.rpc('rebuild_entity_rollups', {}).execute()
@@ -0,0 +1,315 @@
+-- supabase_migrations.sql
+--
+-- Schema changes for the Supabase (Postgres) database, in the order they were introduced.
+-- Each section is safe to re-run. storage/sqlite_backend.py (create_schema) keeps
+-- the local SQLite schema in step with these changes.
+
+-- --- Near-duplicate articles ---
+-- Articles that republish an earlier story point at the original one.
+ALTER TABLE articles ADD COLUMN IF NOT EXISTS canonical_article_id BIGINT REFERENCES articles (id);
+-- The MinHash LSH index over canonical articles (analysis/near_duplicates.py). It lives here
+-- rather than in a local file, so every instance matches against the same history.
+-- Index the articles stored before it existed with `python main.py --backfill-near-duplicates`.
+CREATE TABLE IF NOT EXISTS near_duplicate_signatures (
+    article_id BIGINT PRIMARY KEY REFERENCES articles (id),
+    signature TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS near_duplicate_buckets (
+    bucket_key TEXT NOT NULL,
+    article_id BIGINT NOT NULL REFERENCES articles (id),
+    PRIMARY KEY (bucket_key, article_id)
+);
+
+-- --- Incremental unscraped-link lookup ---
+-- Scrape state lives on the link itself, so pending links are found without
+-- diffing the whole links and articles tables.
+ALTER TABLE links ADD COLUMN IF NOT EXISTS is_scraped SMALLINT NOT NULL DEFAULT 0;
+CREATE INDEX IF NOT EXISTS idx_links_unscraped ON links (id) WHERE is_scraped = 0;
+-- Backfill: every link that already has an article has been scraped.
+UPDATE links SET is_scraped = 1
+WHERE is_scraped = 0 AND EXISTS (SELECT 1 FROM articles a WHERE a.link_id = links.id);
+
+-- --- Transactional analysis commit ---
+-- Stores the usage log and sentiments of many articles and marks them analyzed.
+-- Each call runs in one transaction, so an article is never left with partial
+-- sentiments; articles that are already analyzed are skipped, so retries are safe.
+-- This is the only definition of the function: later sections add the helpers it
+-- calls (PL/pgSQL resolves them when it runs) and change it here, in place.
+-- Payload: [{"article_id": 1, "usage_log": {...} | null, "sentiments": [{...}, ...],
+--            "published_day": "YYYY-MM-DD" | null}, ...]
+-- Returns the ids of the articles committed.
+CREATE OR REPLACE FUNCTION commit_article_analyses(results JSONB)
+RETURNS BIGINT[]
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    result JSONB;
+    target_id BIGINT;
+    committed BIGINT[] := '{}';
+BEGIN
+    FOR result IN SELECT value FROM jsonb_array_elements(results) LOOP
+        target_id := (result->>'article_id')::BIGINT;
+        PERFORM 1 FROM articles WHERE id = target_id AND is_analyzed = 0 FOR UPDATE;
+        IF NOT FOUND THEN
+            CONTINUE;
+        END IF;
+
+        -- Clear partial sentiments left behind by the old one-request-per-row writes.
+        DELETE FROM sentiments WHERE article_id = target_id;
+
+        IF jsonb_typeof(result->'usage_log') = 'object' THEN
+            INSERT INTO usage_logs (article_id, provider, total_tokens, prompt_tokens, completion_tokens, total_cost_usd, timestamp)
+            SELECT target_id, u.provider, u.total_tokens, u.prompt_tokens, u.completion_tokens, u.total_cost_usd, u.timestamp
+            FROM jsonb_populate_record(NULL::usage_logs, result->'usage_log') AS u;
+        END IF;
+
+        -- entity_id is resolved through the entity registry by the caller; published_at is
+        -- copied from the article so filtered listings page through one index.
+        INSERT INTO sentiments (article_id, entity_name, entity_type, financial_sentiment, overall_sentiment, reasoning, entity_id, published_at)
+        SELECT target_id, s.entity_name, s.entity_type, s.financial_sentiment, s.overall_sentiment, s.reasoning, s.entity_id,
+               (SELECT published_at FROM articles WHERE id = target_id)
+        FROM jsonb_populate_recordset(NULL::sentiments, COALESCE(result->'sentiments', '[]'::JSONB)) AS s;
+
+        IF jsonb_array_length(COALESCE(result->'sentiments', '[]'::JSONB)) > 0 THEN
+            PERFORM increment_entity_rollups(target_id);
+            IF result->>'published_day' IS NOT NULL THEN
+                PERFORM increment_entity_series(target_id, (result->>'published_day')::DATE);
+            END IF;
+        END IF;
+
+        UPDATE articles SET is_analyzed = 1 WHERE id = target_id;
+        committed := array_append(committed, target_id);
+    END LOOP;
+    RETURN committed;
+END;
+$$;
+
+-- --- Entity sentiment rollups ---
+-- Per-entity and global sentiment counters, kept up to date by commit_article_analyses,
+-- so top_entities and dashboard_stats read a few rows instead of scanning sentiments.
+CREATE TABLE IF NOT EXISTS entity_sentiment_counts (
+    entity_name TEXT NOT NULL,
+    entity_type TEXT NOT NULL,
+    financial_positive BIGINT NOT NULL DEFAULT 0,
+    financial_negative BIGINT NOT NULL DEFAULT 0,
+    financial_neutral BIGINT NOT NULL DEFAULT 0,
+    overall_positive BIGINT NOT NULL DEFAULT 0,
+    overall_negative BIGINT NOT NULL DEFAULT 0,
+    overall_neutral BIGINT NOT NULL DEFAULT 0,
+    total BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (entity_name, entity_type)
+);
+CREATE INDEX IF NOT EXISTS idx_entity_sentiment_counts_financial_positive ON entity_sentiment_counts (financial_positive);
+CREATE INDEX IF NOT EXISTS idx_entity_sentiment_counts_financial_negative ON entity_sentiment_counts (financial_negative);
+CREATE INDEX IF NOT EXISTS idx_entity_sentiment_counts_financial_neutral ON entity_sentiment_counts (financial_neutral);
+CREATE INDEX IF NOT EXISTS idx_entity_sentiment_counts_overall_positive ON entity_sentiment_counts (overall_positive);
+CREATE INDEX IF NOT EXISTS idx_entity_sentiment_counts_overall_negative ON entity_sentiment_counts (overall_negative);
+CREATE INDEX IF NOT EXISTS idx_entity_sentiment_counts_overall_neutral ON entity_sentiment_counts (overall_neutral);
+
+-- Keys: total_sentiments, articles_analyzed, total_entities and the six counter names above.
+CREATE TABLE IF NOT EXISTS sentiment_stats (
+    key TEXT PRIMARY KEY,
+    value BIGINT NOT NULL DEFAULT 0
+);
+
+-- Adds the sentiments already stored for one article to both rollup tables.
+CREATE OR REPLACE FUNCTION increment_entity_rollups(target_id BIGINT)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    new_entities INTEGER;
+BEGIN
+    WITH upserted AS (
+        INSERT INTO entity_sentiment_counts AS c (
+            entity_name, entity_type, financial_positive, financial_negative, financial_neutral,
+            overall_positive, overall_negative, overall_neutral, total
+        )
+        SELECT entity_name, entity_type,
+               COUNT(*) FILTER (WHERE financial_sentiment = 'positive'),
+               COUNT(*) FILTER (WHERE financial_sentiment = 'negative'),
+               COUNT(*) FILTER (WHERE financial_sentiment = 'neutral'),
+               COUNT(*) FILTER (WHERE overall_sentiment = 'positive'),
+               COUNT(*) FILTER (WHERE overall_sentiment = 'negative'),
+               COUNT(*) FILTER (WHERE overall_sentiment = 'neutral'),
+               COUNT(*)
+        FROM sentiments WHERE article_id = target_id
+        GROUP BY entity_name, entity_type
+        ON CONFLICT (entity_name, entity_type) DO UPDATE SET
+            financial_positive = c.financial_positive + EXCLUDED.financial_positive,
+            financial_negative = c.financial_negative + EXCLUDED.financial_negative,
+            financial_neutral = c.financial_neutral + EXCLUDED.financial_neutral,
+            overall_positive = c.overall_positive + EXCLUDED.overall_positive,
+            overall_negative = c.overall_negative + EXCLUDED.overall_negative,
+            overall_neutral = c.overall_neutral + EXCLUDED.overall_neutral,
+            total = c.total + EXCLUDED.total
+        -- xmax = 0 marks rows that were inserted rather than updated.
+        RETURNING (xmax = 0) AS inserted
+    )
+    SELECT COUNT(*) FILTER (WHERE inserted) INTO new_entities FROM upserted;
+
+    INSERT INTO sentiment_stats AS t (key, value)
+    SELECT v.key, v.value
+    FROM (
+        SELECT COUNT(*) AS total_sentiments,
+               COUNT(*) FILTER (WHERE financial_sentiment = 'positive') AS financial_positive,
+               COUNT(*) FILTER (WHERE financial_sentiment = 'negative') AS financial_negative,
+               COUNT(*) FILTER (WHERE financial_sentiment = 'neutral') AS financial_neutral,
+               COUNT(*) FILTER (WHERE overall_sentiment = 'positive') AS overall_positive,
+               COUNT(*) FILTER (WHERE overall_sentiment = 'negative') AS overall_negative,
+               COUNT(*) FILTER (WHERE overall_sentiment = 'neutral') AS overall_neutral
+        FROM sentiments WHERE article_id = target_id
+    ) a,
+    LATERAL (VALUES
+        ('total_sentiments', a.total_sentiments),
+        ('articles_analyzed', LEAST(a.total_sentiments, 1)),
+        ('total_entities', new_entities::BIGINT),
+        ('financial_positive', a.financial_positive),
+        ('financial_negative', a.financial_negative),
+        ('financial_neutral', a.financial_neutral),
+        ('overall_positive', a.overall_positive),
+        ('overall_negative', a.overall_negative),
+        ('overall_neutral', a.overall_neutral)
+    ) AS v(key, value)
+    ON CONFLICT (key) DO UPDATE SET value = t.value + EXCLUDED.value;
+END;
+$$;
+
+-- Recomputes both rollup tables from the sentiments of analyzed articles.
+CREATE OR REPLACE FUNCTION rebuild_entity_rollups()
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    LOCK TABLE entity_sentiment_counts, sentiment_stats IN EXCLUSIVE MODE;
+    DELETE FROM entity_sentiment_counts;
+    DELETE FROM sentiment_stats;
+
+    INSERT INTO entity_sentiment_counts (
+        entity_name, entity_type, financial_positive, financial_negative, financial_neutral,
+        overall_positive, overall_negative, overall_neutral, total
+    )
+    SELECT s.entity_name, s.entity_type,
+           COUNT(*) FILTER (WHERE s.financial_sentiment = 'positive'),
+           COUNT(*) FILTER (WHERE s.financial_sentiment = 'negative'),
+           COUNT(*) FILTER (WHERE s.financial_sentiment = 'neutral'),
+           COUNT(*) FILTER (WHERE s.overall_sentiment = 'positive'),
+           COUNT(*) FILTER (WHERE s.overall_sentiment = 'negative'),
+           COUNT(*) FILTER (WHERE s.overall_sentiment = 'neutral'),
+           COUNT(*)
+    FROM sentiments s JOIN articles a ON a.id = s.article_id
+    WHERE a.is_analyzed = 1
+    GROUP BY s.entity_name, s.entity_type;
+
+    INSERT INTO sentiment_stats (key, value)
+    SELECT v.key, v.value
+    FROM (
+        SELECT COUNT(*) AS total_sentiments,
+               COUNT(DISTINCT s.article_id) AS articles_analyzed,
+               COUNT(*) FILTER (WHERE s.financial_sentiment = 'positive') AS financial_positive,
+               COUNT(*) FILTER (WHERE s.financial_sentiment = 'negative') AS financial_negative,
+               COUNT(*) FILTER (WHERE s.financial_sentiment = 'neutral') AS financial_neutral,
+               COUNT(*) FILTER (WHERE s.overall_sentiment = 'positive') AS overall_positive,
+               COUNT(*) FILTER (WHERE s.overall_sentiment = 'negative') AS overall_negative,
+               COUNT(*) FILTER (WHERE s.overall_sentiment = 'neutral') AS overall_neutral
+        FROM sentiments s JOIN articles a ON a.id = s.article_id
+        WHERE a.is_analyzed = 1
+    ) a,
+    LATERAL (VALUES
+        ('total_sentiments', a.total_sentiments),
+        ('articles_analyzed', a.articles_analyzed),
+        ('total_entities', (SELECT COUNT(*) FROM entity_sentiment_counts)),
+        ('financial_positive', a.financial_positive),
+        ('financial_negative', a.financial_negative),
+        ('financial_neutral', a.financial_neutral),
+        ('overall_positive', a.overall_positive),
+        ('overall_negative', a.overall_negative),
+        ('overall_neutral', a.overall_neutral)
+    ) AS v(key, value);
+END;
+$$;
+
+-- Backfill from existing data (a full rebuild, so re-running is harmless).
+SELECT rebuild_entity_rollups();
+
+-- --- Daily entity sentiment series ---
+-- One row per entity and publication day with the mention count and score sums
+-- (positive = 1, neutral = 0, negative = -1). sentiment_over_time buckets these
+-- into days, weeks or months. Backfill with `python main.py --rebuild-rollups`,
+-- which parses the scraped publication dates the same way the pipeline does.
+CREATE TABLE IF NOT EXISTS entity_daily_sentiment (
+    id BIGSERIAL PRIMARY KEY,
+    entity_name TEXT NOT NULL,
+    entity_type TEXT NOT NULL,
+    day DATE NOT NULL,
+    mentions BIGINT NOT NULL DEFAULT 0,
+    financial_score_sum BIGINT NOT NULL DEFAULT 0,
+    overall_score_sum BIGINT NOT NULL DEFAULT 0,
+    UNIQUE (entity_name, entity_type, day)
+);
+
+-- Adds the sentiments already stored for one article to its entities' series.
+CREATE OR REPLACE FUNCTION increment_entity_series(target_id BIGINT, target_day DATE)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO entity_daily_sentiment AS d (entity_name, entity_type, day, mentions, financial_score_sum, overall_score_sum)
+    SELECT entity_name, entity_type, target_day, COUNT(*),
+           SUM(CASE financial_sentiment WHEN 'positive' THEN 1 WHEN 'negative' THEN -1 ELSE 0 END),
+           SUM(CASE overall_sentiment WHEN 'positive' THEN 1 WHEN 'negative' THEN -1 ELSE 0 END)
+    FROM sentiments WHERE article_id = target_id
+    GROUP BY entity_name, entity_type
+    ON CONFLICT (entity_name, entity_type, day) DO UPDATE SET
+        mentions = d.mentions + EXCLUDED.mentions,
+        financial_score_sum = d.financial_score_sum + EXCLUDED.financial_score_sum,
+        overall_score_sum = d.overall_score_sum + EXCLUDED.overall_score_sum;
+END;
+$$;
+
+-- --- Normalized publication timestamps ---
+-- publication_date keeps the string as scraped ('July 2, 2025', '2025-06-26T08:36:16+04:00', 'N/A');
+-- published_at holds it normalized to UTC by scrapers/date_normalizer.py, so range
+-- filters and ordering can use the index. Existing rows are filled in by
+-- `python main.py --backfill-dates`, which applies the same parsing rules as ingest.
+ALTER TABLE articles ADD COLUMN IF NOT EXISTS published_at TIMESTAMPTZ;
+CREATE INDEX IF NOT EXISTS idx_articles_published_at ON articles (published_at);
+
+-- --- Entity registry ---
+-- One row per canonical entity, plus every surface name the analyzer produced for it
+-- with its normalized key (analysis/entity_registry.py). Entity endpoints look up
+-- sentiments by entity_id instead of scanning entity_name with ILIKE. Register the
+-- existing names and link their sentiments with `python main.py --backfill-entities`;
+-- until then, names the registry doesn't know fall back to the old ILIKE match.
+CREATE TABLE IF NOT EXISTS entities (
+    id BIGSERIAL PRIMARY KEY,
+    name TEXT NOT NULL,
+    entity_type TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    UNIQUE (name_key, entity_type)
+);
+CREATE TABLE IF NOT EXISTS entity_aliases (
+    id BIGSERIAL PRIMARY KEY,
+    alias TEXT NOT NULL,
+    entity_type TEXT NOT NULL,
+    alias_key TEXT NOT NULL,
+    entity_id BIGINT NOT NULL REFERENCES entities (id),
+    UNIQUE (alias, entity_type)
+);
+CREATE INDEX IF NOT EXISTS idx_entity_aliases_alias_key ON entity_aliases (alias_key, entity_type);
+CREATE INDEX IF NOT EXISTS idx_entity_aliases_entity_id ON entity_aliases (entity_id);
+ALTER TABLE sentiments ADD COLUMN IF NOT EXISTS entity_id BIGINT REFERENCES entities (id);
+
+-- --- Keyset-paginated listings ---
+-- /api/articles and /api/usage_stats page on (published_at, id) and (timestamp, id).
+-- Sentiments keep a copy of their article's published_at, so a filtered listing pages
+-- through one index instead of collecting every matching article id first. Existing
+-- sentiments are filled in by `python main.py --backfill-dates`.
+ALTER TABLE sentiments ADD COLUMN IF NOT EXISTS published_at TIMESTAMPTZ;
+CREATE INDEX IF NOT EXISTS idx_articles_published_at_id ON articles (published_at, id);
+CREATE INDEX IF NOT EXISTS idx_usage_logs_timestamp_id ON usage_logs (timestamp, id);
+CREATE INDEX IF NOT EXISTS idx_sentiments_published_at ON sentiments (published_at, article_id);
+CREATE INDEX IF NOT EXISTS idx_sentiments_entity_id_published_at ON sentiments (entity_id, published_at, article_id);
+-- Serves entity_id lookups too. Databases migrated before it existed may still have a
+-- separate entity_id index, which it supersedes.
+DROP INDEX IF EXISTS idx_sentiments_entity_id;
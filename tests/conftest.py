@@ -0,0 +1,33 @@
+# tests/conftest.py
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage
+from analysis import entity_registry, near_duplicates
+from storage.sqlite_backend import SQLiteBackend
+
+
+@pytest.fixture
+def sqlite_storage(tmp_path, monkeypatch):
+    """Makes get_storage() return a fresh SQLite backend in a temporary file."""
+    backend = SQLiteBackend(str(tmp_path / 'news_data.db'))
+    monkeypatch.setattr(storage, '_backend', backend)
+    # The process-wide registry and index cache what they read; start them empty too.
+    monkeypatch.setattr(entity_registry, '_registry', None)
+    monkeypatch.setattr(near_duplicates, '_index', None)
+    return backend
+
+@pytest.fixture
+def article_ids(sqlite_storage):
+    """Three unanalyzed articles, published on consecutive days."""
+    sqlite_storage.insert('links', [{'url': 'https://example.com', 'source_website': 'example.com', 'scraped_date': '2025-07-01'}])
+    rows = sqlite_storage.insert('articles', [
+        {'link_id': 1, 'url': f'https://example.com/{day}', 'cleaned_text': 'text', 'published_at': f'2025-07-0{day}T08:00:00+00:00'}
+        for day in (1, 2, 3)
+    ])
+    return [row['id'] for row in rows]
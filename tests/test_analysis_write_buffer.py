@@ -0,0 +1,72 @@
+# tests/test_analysis_write_buffer.py
+
+from types import SimpleNamespace
+
+import database
+from database import AnalysisWriteBuffer, build_analysis_result
+
+
+def _entity(name, financial='positive'):
+    return SimpleNamespace(entity_name=name, entity_type='company', financial_sentiment=financial,
+                           overall_sentiment='neutral', reasoning='')
+
+def _result(article_id, *names):
+    return build_analysis_result(article_id, 'openai', [_entity(name) for name in names], {'total_tokens': 10},
+                                 published_at='2025-07-01T08:00:00+00:00')
+
+
+def test_build_analysis_result():
+    result = _result(7, 'Emaar')
+    assert result['article_id'] == 7 and result['published_day'] == '2025-07-01'
+    assert result['usage_log']['provider'] == 'openai'
+    assert result['sentiments'][0]['entity_name'] == 'Emaar'
+    assert build_analysis_result(7, 'openai', [], None)['usage_log'] is None
+
+def test_commit_resolves_entity_ids(sqlite_storage, article_ids):
+    assert database.commit_article_analyses([_result(article_ids[0], 'Emaar PJSC', 'Emaar')]) == [article_ids[0]]
+    entity_ids = {row['entity_id'] for row in sqlite_storage.select('sentiments', 'entity_id')}
+    assert len(entity_ids) == 1 and None not in entity_ids
+
+def test_buffer_commits_in_batches(sqlite_storage, article_ids):
+    with AnalysisWriteBuffer(batch_size=2, flush_interval=60) as writer:
+        writer.add(_result(article_ids[0], 'Emaar', 'Aramco'))
+        assert sqlite_storage.count('sentiments') == 0
+        writer.add(_result(article_ids[1], 'Emaar'))
+        assert sqlite_storage.count('sentiments') == 3
+        writer.add(_result(article_ids[2]))
+    assert sqlite_storage.count('articles', [('is_analyzed', 'eq', 1)]) == 3
+    assert (writer.committed, writer.sentiments_committed, writer.failed) == (3, 3, 0)
+
+def test_buffer_flushes_on_the_timer(sqlite_storage, article_ids):
+    writer = AnalysisWriteBuffer(batch_size=100, flush_interval=0.05)
+    writer.add(_result(article_ids[0], 'Emaar'))
+    timer = writer._timer
+    timer.join(5)
+    assert writer.committed == 1
+    assert sqlite_storage.count('articles', [('is_analyzed', 'eq', 1)]) == 1
+
+def test_buffer_counts_only_committed_results(sqlite_storage, article_ids):
+    database.commit_article_analyses([_result(article_ids[0], 'Emaar')])
+    with AnalysisWriteBuffer(batch_size=10) as writer:
+        # Already analyzed, so skipped by the commit.
+        writer.add(_result(article_ids[0], 'Emaar', 'Aramco'))
+        # Queued twice; only the first result is stored.
+        writer.add(_result(article_ids[1], 'Emaar'))
+        writer.add(_result(article_ids[1], 'Emaar', 'Aramco'))
+    assert (writer.committed, writer.sentiments_committed) == (1, 1)
+    assert sqlite_storage.count('sentiments', [('article_id', 'eq', article_ids[1])]) == 1
+
+def test_buffer_records_failed_commits(sqlite_storage, article_ids):
+    broken = _result(article_ids[1], 'Broken')
+    broken['sentiments'][0]['financial_sentiment'] = None
+    writer = AnalysisWriteBuffer(batch_size=10)
+    writer.add(_result(article_ids[0], 'Emaar'))
+    writer.add(broken)
+    assert writer.flush() == []
+    assert (writer.committed, writer.failed, len(writer.errors)) == (0, 2, 1)
+    assert sqlite_storage.count('articles', [('is_analyzed', 'eq', 1)]) == 0
+
+    # The next batch is unaffected.
+    writer.add(_result(article_ids[2], 'Emaar'))
+    assert writer.flush() == [article_ids[2]]
+    assert (writer.committed, writer.failed) == (1, 2)
@@ -0,0 +1,87 @@
+# tests/test_app.py
+
+import threading
+
+import pytest
+
+import app as app_module
+import database
+import pipeline
+from analysis.entity_registry import get_entity_registry
+from response_cache import response_cache
+
+
+def _sentiment(name, financial='positive'):
+    return {'entity_name': name, 'entity_type': 'company', 'financial_sentiment': financial,
+            'overall_sentiment': 'neutral', 'reasoning': f'{name} reasoning'}
+
+@pytest.fixture
+def client(sqlite_storage):
+    response_cache.clear()
+    app_module.data_version.invalidate()
+    yield app_module.app.test_client()
+    app_module.data_version.invalidate()
+
+@pytest.fixture
+def legacy_names(sqlite_storage, article_ids, monkeypatch):
+    """'Emaar Properties' is stored as before the registry existed; 'Aramco' is registered."""
+    with monkeypatch.context() as patch:
+        patch.setattr(get_entity_registry(), 'resolve', lambda pairs: {})
+        database.commit_article_analyses([{'article_id': article_ids[0], 'published_day': '2025-07-01',
+                                           'sentiments': [_sentiment('Emaar Properties')]}])
+    database.commit_article_analyses([{'article_id': article_ids[1], 'published_day': '2025-07-02',
+                                       'sentiments': [_sentiment('Aramco', financial='negative')]}])
+
+
+# --- Entity batch ---
+def test_batch_matches_unregistered_names_like_single_endpoints(client, legacy_names):
+    response = client.get('/api/entities/batch?entity_name=Aramco&entity_name=Emaar&entity_name=Nobody')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [(entity['entity_name'], entity['entity_id'] is None) for entity in body['entities']] == [
+        ('Aramco', False), ('Emaar', True)
+    ]
+    assert body['unresolved'] == ['Nobody']
+
+    emaar = body['entities'][1]
+    assert emaar['counts']['total'] == 1 and emaar['counts']['financial_positive'] == 1
+    assert [article['url'] for article in emaar['articles_by_sentiment']['positive_financial']] == ['https://example.com/1']
+    single = client.get('/api/sentiment_over_time?entity_name=Emaar').get_json()
+    assert emaar['trend']['financial_sentiment_trend'] == single['financial_sentiment_trend']
+
+def test_batch_counts_unregistered_names_against_the_limit(client, monkeypatch):
+    monkeypatch.setattr(app_module, 'MAX_BATCH_ENTITIES', 2)
+    response = client.get('/api/entities/batch?entity_name=A&entity_name=B&entity_name=C')
+    assert response.status_code == 400
+
+
+# --- Data-versioned ETags ---
+def test_dashboard_304_skips_the_view_until_data_changes(client, legacy_names, article_ids, monkeypatch):
+    etag = client.get('/api/dashboard_stats').headers['ETag']
+    with monkeypatch.context() as patch:
+        patch.setattr(app_module, 'get_storage', lambda: pytest.fail('the view ran for a 304'))
+        assert client.get('/api/dashboard_stats', headers={'If-None-Match': etag}).status_code == 304
+
+    database.commit_article_analyses([{'article_id': article_ids[2], 'sentiments': [_sentiment('Aramco')]}])
+    database.add_pipeline_run({'status': 'Completed'})
+    response = client.get('/api/dashboard_stats', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['total_sentiment_points'] == 3
+
+
+# --- Pipeline trigger ---
+def test_streaming_run_honours_max_in_flight(client, monkeypatch):
+    calls, finished = [], threading.Event()
+
+    def run_streaming_pipeline(status_tracker, scraper_modules, stop_event, **kwargs):
+        calls.append(kwargs)
+        return {}
+    monkeypatch.setattr(pipeline, 'run_streaming_pipeline', run_streaming_pipeline)
+    monkeypatch.setattr(database, 'add_pipeline_run', lambda stats: finished.set())
+    monkeypatch.setattr(app_module.scraper_manager, 'get_scraper_modules', lambda selection=None: [object()])
+    monkeypatch.setitem(app_module.pipeline_status_tracker, 'is_running', False)
+
+    response = client.post('/api/trigger_pipeline', json={'stream': True, 'max_in_flight': 3})
+    assert response.status_code in (200, 202)
+    assert finished.wait(5)
+    assert calls[0]['analysis_workers'] == 3
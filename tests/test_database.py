@@ -0,0 +1,80 @@
+# tests/test_database.py
+
+import random
+import threading
+
+import database
+
+
+def _story(seed, words=200):
+    rng = random.Random(seed)
+    return ' '.join(rng.choice(['oil', 'bank', 'profit', 'dubai', 'shares', 'quarter', 'market', 'growth',
+                                'investors', 'deal', 'record', 'index']) for _ in range(words))
+
+def _article(url, text, publication_date='July 2, 2025'):
+    return {'url': url, 'title': url, 'publication_date': publication_date, 'cleaned_text': text}
+
+def _links(count):
+    return [row['id'] for row in database.add_links([f'https://example.com/link/{n}' for n in range(count)], 'example.com')]
+
+
+def test_add_links_skips_stored_and_repeated_urls(sqlite_storage):
+    assert len(database.add_links(['https://a', 'https://b', 'https://a', ''], 'example.com')) == 2
+    assert [row['url'] for row in database.add_links(['https://b', 'https://c'], 'example.com')] == ['https://c']
+    assert sqlite_storage.count('links') == 3
+
+def test_add_article_links_near_duplicates_to_the_original(sqlite_storage):
+    link_ids = _links(3)
+    original = database.add_article(link_ids[0], _article('https://a/1', _story(1)))
+    copy = database.add_article(link_ids[1], _article('https://b/1', _story(1) + ' Reporting by Reuters'))
+    other = database.add_article(link_ids[2], _article('https://a/2', _story(2)))
+
+    assert original['canonical_article_id'] is None and original['published_at'] == '2025-07-02T00:00:00+00:00'
+    assert copy['canonical_article_id'] == original['id']
+    assert other['canonical_article_id'] is None
+    # Only canonical articles are indexed.
+    assert sqlite_storage.count('near_duplicate_signatures') == 2
+    assert sqlite_storage.count('links', [('is_scraped', 'eq', 1)]) == 3
+
+def test_add_article_ignores_repeated_urls(sqlite_storage):
+    link_ids = _links(2)
+    assert database.add_article(link_ids[0], _article('https://a/1', _story(1))) is not None
+    assert database.add_article(link_ids[1], _article('https://a/1', _story(2))) is None
+    assert sqlite_storage.count('articles') == 1
+    assert sqlite_storage.count('links', [('is_scraped', 'eq', 1)]) == 2
+
+def test_concurrent_copies_resolve_to_one_canonical_article(sqlite_storage):
+    link_ids = _links(8)
+    threads = [threading.Thread(target=database.add_article, args=(link_id, _article(f'https://copy/{link_id}', _story(1))))
+               for link_id in link_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sqlite_storage.count('articles') == 8
+    assert sqlite_storage.count('articles', [('canonical_article_id', 'is', None)]) == 1
+
+def test_backfill_indexes_stored_canonical_articles(sqlite_storage):
+    sqlite_storage.insert('links', [{'url': 'https://example.com', 'source_website': 'example.com', 'scraped_date': '2025-07-01'}])
+    rows = sqlite_storage.insert('articles', [
+        {'link_id': 1, 'url': f'https://old/{seed}', 'cleaned_text': _story(seed)} for seed in range(5)
+    ] + [{'link_id': 1, 'url': 'https://old/short', 'cleaned_text': 'too short'}])
+
+    assert database.backfill_near_duplicate_index(chunk_size=2) == 5
+    assert database.backfill_near_duplicate_index(chunk_size=2) == 5
+    assert sqlite_storage.count('near_duplicate_signatures') == 5
+
+    link_id = _links(1)[0]
+    copy = database.add_article(link_id, _article('https://new/3', _story(3)))
+    assert copy['canonical_article_id'] == rows[3]['id']
+
+def test_data_version_changes_with_new_rows_and_maintenance(sqlite_storage, article_ids):
+    version = database.get_data_version()
+    assert database.get_data_version() == version
+    database.commit_article_analyses([{'article_id': article_ids[0], 'sentiments': [
+        {'entity_name': 'Emaar', 'entity_type': 'company', 'financial_sentiment': 'positive',
+         'overall_sentiment': 'neutral', 'reasoning': ''}]}])
+    committed = database.get_data_version()
+    assert committed != version
+    database.touch_data_version()
+    assert database.get_data_version() != committed
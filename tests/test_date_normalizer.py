@@ -0,0 +1,38 @@
+# tests/test_date_normalizer.py
+
+import pytest
+
+from scrapers.date_normalizer import normalize_publication_date, parse_publication_date
+
+
+@pytest.mark.parametrize('value, source, expected', [
+    # Explicit offsets are converted to UTC whatever the source.
+    ('2025-07-02T10:30:00+04:00', 'gulfnews.com', '2025-07-02T06:30:00+00:00'),
+    ('2025-07-02T10:30:00Z', None, '2025-07-02T10:30:00+00:00'),
+    ('2025-07-02T01:30:00+06:00', 'menabytes.com', '2025-07-01T19:30:00+00:00'),
+    # Naive timestamps are read in the source's local time.
+    ('July 2, 2025 10:30', 'gulfnews.com', '2025-07-02T06:30:00+00:00'),
+    ('2 Jul 2025 03:00', 'zawya.com', '2025-07-01T23:00:00+00:00'),
+    ('Jul 2, 2025 10:30 AM', 'menabytes.com', '2025-07-02T04:30:00+00:00'),
+    ('2025-07-02 10:30:00', 'unknown.example', '2025-07-02T10:30:00+00:00'),
+    # Bare dates keep their calendar day.
+    ('2025-06-30', 'gulfnews.com', '2025-06-30T00:00:00+00:00'),
+    ('July 2, 2025', 'menabytes.com', '2025-07-02T00:00:00+00:00'),
+    ('Published: 2 July 2025', 'zawya.com', '2025-07-02T00:00:00+00:00'),
+    ('Last updated on July 2, 2025', None, '2025-07-02T00:00:00+00:00'),
+])
+def test_normalize_publication_date(value, source, expected):
+    assert normalize_publication_date(value, source) == expected
+
+@pytest.mark.parametrize('value', [None, '', 'N/A', 'Date not found', 'null', 'yesterday', '2025-13-45'])
+def test_unreadable_dates_become_none(value):
+    assert normalize_publication_date(value, 'gulfnews.com') is None
+
+def test_parsed_dates_are_utc_aware():
+    parsed = parse_publication_date('July 2, 2025 10:30', 'gulfnews.com')
+    assert parsed.utcoffset().total_seconds() == 0
+
+def test_normalized_dates_sort_chronologically_as_text():
+    values = ['2025-07-02T01:00:00+05:00', '2025-07-01T22:00:00-03:00', 'July 1, 2025 23:00']
+    normalized = [normalize_publication_date(value, 'gulfnews.com') for value in values]
+    assert sorted(normalized) == [normalized[2], normalized[0], normalized[1]]
@@ -0,0 +1,60 @@
+# tests/test_entity_registry.py
+
+import pytest
+
+from analysis.entity_registry import EntityRegistry, normalize_entity_name
+
+
+@pytest.mark.parametrize('name, key', [
+    ('Emaar Properties PJSC', 'emaar properties'),
+    ('emaar  properties', 'emaar properties'),
+    ('The Emirates Group', 'emirates group'),
+    ('Abu Dhabi Commercial Bank P.J.S.C.', 'abu dhabi commercial bank p j s c'),
+    ('Procter & Gamble Co.', 'procter and gamble'),
+    ('Ｅｍｉｒａｔｅｓ NBD', 'emirates nbd'),
+    # A name is never reduced to nothing.
+    ('The', 'the'),
+    ('Company', 'company'),
+    (None, ''),
+])
+def test_normalize_entity_name(name, key):
+    assert normalize_entity_name(name) == key
+
+def test_distinct_entities_keep_distinct_keys():
+    assert normalize_entity_name('Emirates') != normalize_entity_name('Emirates NBD')
+
+
+def test_resolve_joins_spelling_variants(sqlite_storage):
+    registry = EntityRegistry()
+    ids = registry.resolve([('Emaar Properties PJSC', 'company'), ('emaar properties', 'company'),
+                            ('Emaar Properties', 'person'), ('Aramco', 'company')])
+    assert ids[('Emaar Properties PJSC', 'company')] == ids[('emaar properties', 'company')]
+    assert len(set(ids.values())) == 3
+    assert sqlite_storage.count('entities') == 3
+    assert sqlite_storage.count('entity_aliases') == 4
+
+def test_resolve_is_stable_across_registries(sqlite_storage):
+    first = EntityRegistry().resolve([('Aramco', 'company')])
+    # A second process starts with an empty in-memory map and must find the stored entity.
+    second = EntityRegistry().resolve([('Saudi Aramco', 'company'), ('ARAMCO', 'company')])
+    assert second[('ARAMCO', 'company')] == first[('Aramco', 'company')]
+    assert second[('Saudi Aramco', 'company')] != first[('Aramco', 'company')]
+    assert sqlite_storage.count('entity_aliases') == 3
+
+def test_resolve_ignores_incomplete_pairs(sqlite_storage):
+    assert EntityRegistry().resolve([('', 'company'), ('Aramco', None)]) == {}
+
+def test_lookup_does_not_register(sqlite_storage):
+    registry = EntityRegistry()
+    ids = registry.resolve([('Emaar Properties', 'company'), ('Emaar Properties', 'location')])
+    assert registry.lookup('Unknown Corp') == []
+    assert sqlite_storage.count('entities') == 2
+    assert registry.lookup('EMAAR PROPERTIES PJSC') == sorted(ids.values())
+    assert registry.lookup('emaar properties', 'company') == [ids[('Emaar Properties', 'company')]]
+
+def test_aliases_by_entity(sqlite_storage):
+    registry = EntityRegistry()
+    ids = registry.resolve([('Emaar', 'company'), ('Emaar PJSC', 'company'), ('Aramco', 'company')])
+    emaar = ids[('Emaar', 'company')]
+    assert registry.aliases_by_entity([emaar]) == {emaar: [('Emaar', 'company'), ('Emaar PJSC', 'company')]}
+    assert len(registry.aliases(sorted(set(ids.values())))) == 3
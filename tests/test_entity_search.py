@@ -0,0 +1,58 @@
+# tests/test_entity_search.py
+
+import database
+from analysis.entity_search import EntitySearchIndex
+
+
+def _commit(article_id, *names):
+    database.commit_article_analyses([{
+        'article_id': article_id,
+        'sentiments': [{'entity_name': name, 'entity_type': 'company', 'financial_sentiment': 'positive',
+                        'overall_sentiment': 'neutral', 'reasoning': ''} for name in names],
+    }])
+
+def _mentions(index, query):
+    return {row['entity_name']: row['mentions'] for row in index.search(query)}
+
+
+def test_search_ranks_prefix_matches_and_mentions(sqlite_storage, article_ids):
+    # Equally similar names are ranked by mentions.
+    _commit(article_ids[0], 'Emirates ADB', 'Emirates NBD')
+    _commit(article_ids[1], 'Emirates NBD', 'Emaar Properties')
+    results = EntitySearchIndex().search('emir')
+    assert [(row['entity_name'], row['mentions']) for row in results] == [('Emirates NBD', 2), ('Emirates ADB', 1)]
+
+def test_refresh_counts_only_new_sentiments(sqlite_storage, article_ids):
+    _commit(article_ids[0], 'Emaar Properties')
+    index = EntitySearchIndex()
+    index.build()
+    _commit(article_ids[1], 'Emaar Properties', 'Aramco')
+    index.refresh()
+    index.refresh()
+    assert _mentions(index, 'emaar') == {'Emaar Properties': 2}
+    assert _mentions(index, 'aramco') == {'Aramco': 1}
+
+def test_build_rereads_rollups_when_a_commit_lands_meanwhile(sqlite_storage, article_ids, monkeypatch):
+    _commit(article_ids[0], 'Emaar Properties')
+    select = sqlite_storage.select
+
+    def select_with_concurrent_commit(table, *args, **kwargs):
+        # The first read of the rollups races a commit that lands right after it.
+        rows = select(table, *args, **kwargs)
+        if table == 'entity_sentiment_counts' and sqlite_storage.count('sentiments') == 1:
+            _commit(article_ids[1], 'Emaar Properties')
+        return rows
+    monkeypatch.setattr(sqlite_storage, 'select', select_with_concurrent_commit)
+
+    index = EntitySearchIndex()
+    index.build()
+    index.refresh()
+    assert _mentions(index, 'emaar') == {'Emaar Properties': 2}
+
+def test_build_grows_arrays_once_per_batch(sqlite_storage, article_ids):
+    _commit(article_ids[0], *[f'Alpha {n}' for n in range(50)])
+    index = EntitySearchIndex()
+    index.build()
+    assert len(index._types) == len(index._mentions) == len(index._entity_ids) == 50
+    best = index.search('alpha 7')[0]
+    assert (best['entity_name'], best['entity_type'], best['mentions']) == ('Alpha 7', 'company', 1)
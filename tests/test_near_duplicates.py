@@ -0,0 +1,72 @@
+# tests/test_near_duplicates.py
+
+import random
+
+from analysis.near_duplicates import (
+    MIN_WORDS, NUM_BANDS, NUM_PERMUTATIONS, NearDuplicateIndex, _band_keys, compute_signature,
+    decode_signature, encode_signature, estimate_similarity,
+)
+
+_VOCABULARY = ['oil', 'bank', 'profit', 'dubai', 'shares', 'quarter', 'market', 'growth', 'investors', 'property',
+               'revenue', 'record', 'board', 'dividend', 'index', 'fell', 'rose', 'percent', 'billion', 'deal']
+
+
+def _story(seed, words=300):
+    rng = random.Random(seed)
+    return ' '.join(rng.choice(_VOCABULARY) for _ in range(words))
+
+def _edit(text, every=40):
+    """Replaces one word in every `every`, like a syndicated copy with a changed byline or figure."""
+    words = text.split()
+    return ' '.join('changed' if i % every == 0 else word for i, word in enumerate(words))
+
+
+def test_short_texts_are_not_fingerprinted():
+    assert compute_signature(' '.join(['word'] * (MIN_WORDS - 1))) is None
+    assert compute_signature(None) is None
+
+def test_signature_is_deterministic_and_ignores_formatting():
+    text = _story(1)
+    signature = compute_signature(text)
+    assert len(signature) == NUM_PERMUTATIONS
+    assert compute_signature(text.upper().replace(' ', '\n  ')) == signature
+
+def test_similarity_separates_copies_from_other_stories():
+    original = compute_signature(_story(1))
+    assert estimate_similarity(original, compute_signature(_edit(_story(1)))) >= 0.8
+    assert estimate_similarity(original, compute_signature(_story(2))) < 0.5
+
+def test_band_keys_cover_every_band():
+    keys = _band_keys(compute_signature(_story(1)))
+    assert len(keys) == NUM_BANDS
+    assert [key.split(':')[0] for key in keys] == [str(band) for band in range(NUM_BANDS)]
+
+def test_signature_encoding_round_trips():
+    signature = compute_signature(_story(3))
+    assert decode_signature(encode_signature(signature)) == signature
+
+
+def test_index_finds_near_copies(sqlite_storage, article_ids):
+    index = NearDuplicateIndex()
+    original = compute_signature(_story(1))
+    assert index.find_canonical(original) is None
+    index.add(article_ids[0], original)
+    index.add(article_ids[1], compute_signature(_story(2)))
+
+    assert index.find_canonical(compute_signature(_edit(_story(1)))) == article_ids[0]
+    assert index.find_canonical(compute_signature(_story(4))) is None
+
+def test_index_is_shared_through_storage(sqlite_storage, article_ids):
+    signature = compute_signature(_story(1))
+    NearDuplicateIndex().add(article_ids[0], signature)
+    # Re-adding is harmless.
+    NearDuplicateIndex().add(article_ids[0], signature)
+    assert sqlite_storage.count('near_duplicate_signatures') == 1
+    assert sqlite_storage.count('near_duplicate_buckets') == NUM_BANDS
+    assert NearDuplicateIndex().find_canonical(signature) == article_ids[0]
+
+def test_index_prefers_the_most_similar_article(sqlite_storage, article_ids):
+    index = NearDuplicateIndex(threshold=0.5)
+    index.add_many([(article_ids[0], compute_signature(_edit(_story(1), every=8))),
+                    (article_ids[1], compute_signature(_edit(_story(1), every=60)))])
+    assert index.find_canonical(compute_signature(_story(1))) == article_ids[1]
@@ -0,0 +1,86 @@
+# tests/test_pipeline.py
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import database
+import pipeline
+
+
+class _Sources:
+    """
+    Fake scraper modules that record how many fetches run against each source at once.
+    With `wave`, the first fetches are held until that many have started, so the test
+    sees which ones the dispatcher starts together however slowly the threads come up.
+    """
+    def __init__(self, names, delay=0.05, wave=None):
+        self.delay = delay
+        self.wave = wave
+        self.lock = threading.Lock()
+        self.wave_started = threading.Event()
+        self.active = {name: 0 for name in names}
+        self.peak = {name: 0 for name in names}
+        self.started = []
+        self.first_wave = None
+        self.modules = [SimpleNamespace(SOURCE_NAME=name, scrape_article_content=self._scraper(name)) for name in names]
+
+    def _scraper(self, name):
+        def scrape_article_content(url):
+            with self.lock:
+                self.active[name] += 1
+                self.peak[name] = max(self.peak[name], self.active[name])
+                self.started.append(name)
+                if len(self.started) == self.wave:
+                    self.first_wave = list(self.started)
+                    self.wave_started.set()
+            if self.wave:
+                self.wave_started.wait(5)
+            time.sleep(self.delay)
+            with self.lock:
+                self.active[name] -= 1
+            return {'url': url, 'title': url, 'publication_date': None, 'cleaned_text': 'text'}
+        return scrape_article_content
+
+def _links(counts):
+    return [{'id': n, 'url': f'https://{source}/{n}', 'source_website': source}
+            for source, count in counts.items() for n in range(count)]
+
+@pytest.fixture
+def stored(monkeypatch):
+    stored = []
+    monkeypatch.setattr(database, 'add_article', lambda link_id, article_data: stored.append(article_data) or article_data)
+    return stored
+
+
+def test_per_source_cap_and_round_robin(stored):
+    sources = _Sources(['a.com', 'b.com', 'c.com'], wave=4)
+    links = _links({'a.com': 10, 'b.com': 1, 'c.com': 1})
+    status, on_article = {}, []
+    count = pipeline._scrape_links_concurrently(status, sources.modules, links, threading.Event(),
+                                                max_workers=4, per_source_limit=2, on_article=on_article.append)
+
+    assert count == len(stored) == len(on_article) == 12
+    assert status['progress'] == 12
+    assert sources.peak['a.com'] == 2
+    # The busy source takes its two slots, and the other sources get theirs right away instead of queueing behind it.
+    assert sorted(sources.first_wave) == ['a.com', 'a.com', 'b.com', 'c.com']
+
+def test_links_without_a_scraper_count_as_done(stored):
+    sources = _Sources(['a.com'], delay=0)
+    status = {}
+    count = pipeline._scrape_links_concurrently(status, sources.modules, _links({'a.com': 2, 'unknown.com': 3}),
+                                                threading.Event(), max_workers=2, per_source_limit=1)
+    assert count == 2 and status['progress'] == 5
+    assert sources.peak['a.com'] == 1
+
+def test_stop_event_prevents_new_fetches(stored):
+    sources = _Sources(['a.com'])
+    stop_event = threading.Event()
+    stop_event.set()
+    status = {}
+    assert pipeline._scrape_links_concurrently(status, sources.modules, _links({'a.com': 5}), stop_event,
+                                               max_workers=2, per_source_limit=2) == 0
+    assert sources.started == [] and status['status'] == 'Stopping...'
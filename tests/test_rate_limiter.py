@@ -0,0 +1,100 @@
+# tests/test_rate_limiter.py
+
+from types import SimpleNamespace
+
+import pytest
+
+from analysis import rate_limiter
+from analysis.rate_limiter import ProviderRateLimiter, TokenBucket, parse_duration, retry_delay_for
+
+
+class _StatusError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+class APIConnectionError(Exception):
+    """Named like the SDK error, which carries no status code."""
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Freezes time.monotonic inside the rate limiter; advance it by assigning clock.now."""
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(rate_limiter.time, 'monotonic', lambda: clock.now)
+    return clock
+
+
+# --- TokenBucket ---
+def test_bucket_reserves_without_waiting_while_tokens_last(clock):
+    bucket = TokenBucket(60)
+    assert bucket.reserve(59) == 0.0
+    assert bucket.reserve(1) == 0.0
+    # The bucket refills one token per second, so the next token is a second away.
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    assert bucket.reserve(2) == pytest.approx(3.0)
+
+def test_bucket_refills_over_time_up_to_capacity(clock):
+    bucket = TokenBucket(60)
+    bucket.reserve(60)
+    clock.now += 30
+    assert bucket.reserve(30) == 0.0
+    clock.now += 600
+    bucket.reserve(0)
+    assert bucket.tokens == 60
+
+def test_bucket_caps_oversized_requests_at_a_full_refill(clock):
+    assert TokenBucket(60).reserve(1000) == 0.0
+    bucket = TokenBucket(60)
+    bucket.reserve(1)
+    assert bucket.reserve(1000) == pytest.approx(1.0)
+
+def test_bucket_sync_and_adjust(clock):
+    bucket = TokenBucket(60)
+    bucket.sync(limit=120, remaining=10)
+    assert (bucket.capacity, bucket.tokens) == (120, 10)
+    bucket.adjust(500)
+    assert bucket.tokens == 120
+
+def test_limiter_reads_provider_headers(clock):
+    limiter = ProviderRateLimiter('openai', 'gpt-4o-mini')
+    limiter.update_from_headers({'X-RateLimit-Limit-Tokens': '1000', 'x-ratelimit-remaining-tokens': '0'})
+    assert limiter.tokens.capacity == 1000
+    assert limiter._reserve(60) == pytest.approx(3.6)
+
+def test_limiter_pause_holds_back_callers(clock):
+    limiter = ProviderRateLimiter('groq', 'llama')
+    limiter.pause(5)
+    assert limiter._reserve(1) == pytest.approx(5.0)
+
+
+# --- parse_duration ---
+@pytest.mark.parametrize('value, expected', [
+    ('20ms', 0.02), ('1.5s', 1.5), ('6m0s', 360.0), ('1h2m', 3720.0), ('2', 2.0), (3, 3.0),
+])
+def test_parse_duration(value, expected):
+    assert parse_duration(value) == pytest.approx(expected)
+
+@pytest.mark.parametrize('value', [None, '', 'soon'])
+def test_parse_duration_rejects_junk(value):
+    assert parse_duration(value) is None
+
+
+# --- retry_delay_for ---
+def test_retry_delay_skips_non_retryable_errors():
+    assert retry_delay_for(ValueError('bad output'), 0) is None
+    assert retry_delay_for(_StatusError(400), 0) is None
+    assert retry_delay_for(_StatusError(401), 3) is None
+
+@pytest.mark.parametrize('error', [_StatusError(500), _StatusError(503), APIConnectionError('reset')])
+def test_retry_delay_backs_off_with_jitter(error):
+    for attempt in range(10):
+        delay = retry_delay_for(error, attempt)
+        assert 0 <= delay <= min(rate_limiter.BACKOFF_MAX_SECONDS, rate_limiter.BACKOFF_BASE_SECONDS * 2 ** attempt)
+
+def test_retry_delay_honours_retry_after_on_429():
+    assert retry_delay_for(_StatusError(429, {'retry-after': '7'}), 0) >= 7
+    assert retry_delay_for(_StatusError(429, {'x-ratelimit-reset-requests': '1m30s'}), 0) >= 90
+    # Retry-After only counts for rate limits, not for server errors.
+    assert retry_delay_for(_StatusError(503, {'retry-after': '7'}), 0) <= 1
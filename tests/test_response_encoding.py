@@ -0,0 +1,141 @@
+# tests/test_response_encoding.py
+
+import gzip
+import json
+
+import pytest
+
+flask = pytest.importorskip('flask')
+
+import response_encoding
+from response_encoding import init_response_encoding
+
+
+@pytest.fixture
+def client():
+    app = flask.Flask(__name__)
+    init_response_encoding(app)
+
+    @app.route('/large')
+    def large():
+        return flask.jsonify([{'entity_name': f'Entity {n}', 'score': n} for n in range(200)])
+
+    @app.route('/small')
+    def small():
+        return flask.jsonify({'status': 'ok'})
+
+    @app.route('/created', methods=['GET', 'POST'])
+    def created():
+        return flask.jsonify([{'n': n} for n in range(200)]), 201
+
+    return app.test_client()
+
+
+def test_large_json_is_gzipped(client):
+    response = client.get('/large', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert response.headers['ETag'].endswith('-gzip"')
+    assert json.loads(gzip.decompress(response.get_data()))[199] == {'entity_name': 'Entity 199', 'score': 199}
+
+def test_identity_when_the_client_does_not_accept_compression(client):
+    response = client.get('/large')
+    assert 'Content-Encoding' not in response.headers
+    assert len(response.get_json()) == 200
+    assert not response.headers['ETag'].endswith('-gzip"')
+
+def test_small_bodies_are_not_compressed(client):
+    response = client.get('/small', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_json() == {'status': 'ok'}
+    assert response.headers['ETag']
+
+def test_etag_is_stable_and_answers_304(client):
+    first = client.get('/large', headers={'Accept-Encoding': 'gzip'})
+    second = client.get('/large', headers={'Accept-Encoding': 'gzip'})
+    assert first.headers['ETag'] == second.headers['ETag']
+
+    cached = client.get('/large', headers={'Accept-Encoding': 'gzip', 'If-None-Match': first.headers['ETag']})
+    assert cached.status_code == 304
+    assert cached.get_data() == b''
+
+def test_each_encoding_has_its_own_etag(client):
+    etag = client.get('/large', headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+    response = client.get('/large', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert 'Content-Encoding' not in response.headers
+
+def test_non_get_and_non_200_responses_are_left_alone(client):
+    for response in (client.get('/created', headers={'Accept-Encoding': 'gzip'}),
+                     client.post('/created', headers={'Accept-Encoding': 'gzip'})):
+        assert response.status_code == 201
+        assert 'Content-Encoding' not in response.headers
+        assert 'ETag' not in response.headers
+
+@pytest.mark.skipif(response_encoding.orjson is None, reason='orjson is not installed')
+def test_orjson_provider_matches_flask_output():
+    app = flask.Flask(__name__)
+    init_response_encoding(app)
+    with app.app_context():
+        assert isinstance(app.json, response_encoding.OrjsonProvider)
+        assert app.json.dumps({'b': 1, 'a': [1.5, None]}) == '{"a":[1.5,null],"b":1}'
+        assert app.json.loads('{"a": 1}') == {'a': 1}
+
+
+# --- Data-versioned ETags ---
+@pytest.fixture
+def versioned():
+    state = {'version': '1', 'calls': 0, 'changes': 0}
+    app = flask.Flask(__name__)
+    data_version = init_response_encoding(app, data_version=lambda: state['version'],
+                                          on_data_change=lambda: state.update(changes=state['changes'] + 1))
+
+    @app.route('/stats')
+    @response_encoding.etag_from_data_version
+    def stats():
+        state['calls'] += 1
+        return flask.jsonify([{'n': n} for n in range(200)])
+
+    state['client'], state['data_version'] = app.test_client(), data_version
+    return state
+
+def test_matching_data_version_answers_304_without_running_the_view(versioned):
+    client = versioned['client']
+    first = client.get('/stats?days=7', headers={'Accept-Encoding': 'gzip'})
+    assert first.status_code == 200 and versioned['calls'] == 1
+    assert first.headers['Content-Encoding'] == 'gzip'
+
+    cached = client.get('/stats?days=7', headers={'Accept-Encoding': 'gzip', 'If-None-Match': first.headers['ETag']})
+    assert cached.status_code == 304
+    assert cached.headers['ETag'] == first.headers['ETag']
+    assert versioned['calls'] == 1
+
+def test_etag_covers_query_args_and_encoding(versioned):
+    client = versioned['client']
+    etag = client.get('/stats?days=7', headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+    assert client.get('/stats?days=30', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag}).status_code == 200
+    assert client.get('/stats?days=7', headers={'If-None-Match': etag}).status_code == 200
+
+def test_new_data_version_changes_the_etag(versioned):
+    client = versioned['client']
+    etag = client.get('/stats').headers['ETag']
+    versioned['version'] = '2'
+    # The version is reused for DATA_VERSION_TTL seconds unless invalidated, e.g. by a pipeline run.
+    assert client.get('/stats', headers={'If-None-Match': etag}).status_code == 304
+    versioned['data_version'].invalidate()
+    response = client.get('/stats', headers={'If-None-Match': etag})
+    assert response.status_code == 200 and response.headers['ETag'] != etag
+    assert versioned['changes'] == 1
+
+def test_unreadable_data_version_falls_back_to_body_etags():
+    app = flask.Flask(__name__)
+    init_response_encoding(app, data_version=lambda: 1 / 0)
+
+    @app.route('/stats')
+    @response_encoding.etag_from_data_version
+    def stats():
+        return flask.jsonify({'status': 'ok'})
+
+    client = app.test_client()
+    etag = client.get('/stats').headers['ETag']
+    assert client.get('/stats', headers={'If-None-Match': etag}).status_code == 304
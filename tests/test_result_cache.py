@@ -0,0 +1,67 @@
+# tests/test_result_cache.py
+
+from types import SimpleNamespace
+
+import pytest
+
+from analysis import result_cache
+from analysis.result_cache import AnalysisCache, make_cache_key, normalize_text
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Makes every cache access one second later than the previous one, so LRU order is unambiguous."""
+    clock = SimpleNamespace(now=0.0)
+    def tick():
+        clock.now += 1
+        return clock.now
+    monkeypatch.setattr(result_cache.time, 'time', tick)
+    return clock
+
+def _cache(tmp_path, max_entries):
+    return AnalysisCache(path=str(tmp_path / 'analysis_cache.db'), max_entries=max_entries)
+
+
+def test_normalize_text_ignores_whitespace_case_and_width():
+    assert normalize_text('  Emaar\tPROPERTIES\n\nreports ') == 'emaar properties reports'
+    assert normalize_text('ＡＢＣ') == 'abc'
+    assert normalize_text(None) == ''
+
+def test_cache_key_depends_on_everything_that_shapes_the_output():
+    key = make_cache_key('Some  text', 'openai', 'gpt-4o-mini', 'v1')
+    assert key == make_cache_key('some text', 'openai', 'gpt-4o-mini', 'v1')
+    assert key != make_cache_key('some text', 'groq', 'gpt-4o-mini', 'v1')
+    assert key != make_cache_key('some text', 'openai', 'gpt-4o-mini', 'v2')
+    # Parts are delimited, so shifting characters between them changes the key.
+    assert make_cache_key('x', 'ab', 'c', 'v1') != make_cache_key('x', 'a', 'bc', 'v1')
+
+def test_cache_round_trip_and_stats(tmp_path, clock):
+    cache = _cache(tmp_path, 10)
+    assert cache.get('k') is None
+    cache.put('k', [{'entity_name': 'Emaar'}], {'total_tokens': 5})
+    assert cache.get('k') == ([{'entity_name': 'Emaar'}], {'total_tokens': 5})
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'hit_rate': 0.5, 'entries': 1, 'max_entries': 10}
+
+def test_cache_evicts_least_recently_used(tmp_path, clock):
+    cache = _cache(tmp_path, 2)
+    cache.put('a', [], {})
+    cache.put('b', [], {})
+    cache.get('a')
+    cache.put('c', [], {})
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    assert cache.stats()['entries'] == 2
+
+def test_cache_replacing_a_key_does_not_grow_it(tmp_path, clock):
+    cache = _cache(tmp_path, 2)
+    for _ in range(3):
+        cache.put('a', [], {})
+    cache.put('b', [], {})
+    assert cache.get('a') is not None
+    assert cache.stats()['entries'] == 2
+
+def test_cache_persists_across_instances(tmp_path, clock):
+    _cache(tmp_path, 5).put('a', [{'entity_name': 'Aramco'}], {})
+    reopened = _cache(tmp_path, 5)
+    assert reopened.stats()['entries'] == 1
+    assert reopened.get('a') == ([{'entity_name': 'Aramco'}], {})
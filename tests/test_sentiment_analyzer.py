@@ -0,0 +1,136 @@
+# tests/test_sentiment_analyzer.py
+
+import asyncio
+
+import pytest
+
+pytest.importorskip('langchain_openai')
+
+from langchain_openai import ChatOpenAI
+from pydantic.v1 import ValidationError
+
+import database
+import pipeline
+from analysis import sentiment_analyzer
+from analysis.result_cache import AnalysisCache
+from analysis.sentiment_analyzer import AnalysisError, EntitySentiment, SentimentAnalyzer, TextAnalysis
+
+
+class _StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+def _validation_error():
+    try:
+        TextAnalysis(entities=[{'entity_name': 'Emaar'}])
+    except ValidationError as e:
+        return e
+
+class _BrokenCache:
+    def get(self, key):
+        raise OSError('disk I/O error')
+
+    def put(self, key, entities, usage):
+        raise OSError('disk I/O error')
+
+ENTITY = EntitySentiment(entity_name='Emaar', entity_type='company', financial_sentiment='positive',
+                         overall_sentiment='neutral', reasoning='')
+
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    """An analyzer whose LLM calls return or raise the queued outcomes, with no backoff delay."""
+    monkeypatch.setattr(sentiment_analyzer, 'retry_delay_for',
+                        lambda error, attempt: 0.0 if getattr(error, 'status_code', None) == 503 else None)
+    analyzer = SentimentAnalyzer(provider='openai', openai_api_key='test-key', use_cache=False)
+    analyzer.outcomes, analyzer.calls = [], 0
+
+    def invoke(text):
+        analyzer.calls += 1
+        outcome = analyzer.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    async def ainvoke(text):
+        return invoke(text)
+
+    monkeypatch.setattr(analyzer, '_invoke', invoke)
+    monkeypatch.setattr(analyzer, '_ainvoke', ainvoke)
+    return analyzer
+
+def _analyze(analyzer, asynchronous):
+    if asynchronous:
+        return asyncio.run(analyzer.aanalyze_text_for_sentiment('text'))
+    return analyzer.analyze_text_for_sentiment('text')
+
+
+def test_sdk_retries_are_disabled(monkeypatch):
+    created = []
+
+    def chat_openai(**kwargs):
+        created.append(kwargs)
+        return ChatOpenAI(**kwargs)
+    monkeypatch.setattr(sentiment_analyzer, 'ChatOpenAI', chat_openai)
+    SentimentAnalyzer(provider='openai', openai_api_key='test-key', use_cache=False)
+    assert created[0]['max_retries'] == 0
+
+@pytest.mark.parametrize('asynchronous', [False, True])
+def test_transient_errors_are_retried(analyzer, asynchronous):
+    analyzer.outcomes = [_StatusError(503), _StatusError(503), ([ENTITY], {'total_tokens': 10})]
+    assert _analyze(analyzer, asynchronous) == ([ENTITY], {'total_tokens': 10})
+    assert analyzer.calls == 3
+
+@pytest.mark.parametrize('asynchronous', [False, True])
+def test_exhausted_retries_raise(analyzer, asynchronous):
+    analyzer.outcomes = [_StatusError(503)] * (sentiment_analyzer.MAX_TRANSIENT_RETRIES + 1)
+    with pytest.raises(AnalysisError):
+        _analyze(analyzer, asynchronous)
+    assert analyzer.calls == sentiment_analyzer.MAX_TRANSIENT_RETRIES + 1
+
+@pytest.mark.parametrize('asynchronous', [False, True])
+def test_invalid_output_is_retried_then_raises(analyzer, asynchronous):
+    analyzer.outcomes = [_validation_error()] * sentiment_analyzer.MAX_RETRIES
+    with pytest.raises(AnalysisError):
+        _analyze(analyzer, asynchronous)
+    assert analyzer.calls == sentiment_analyzer.MAX_RETRIES
+
+@pytest.mark.parametrize('asynchronous', [False, True])
+def test_other_errors_are_not_retried(analyzer, asynchronous):
+    analyzer.outcomes = [_StatusError(400)]
+    with pytest.raises(AnalysisError):
+        _analyze(analyzer, asynchronous)
+    assert analyzer.calls == 1
+
+# --- Result cache ---
+def test_cache_hit_skips_the_llm(analyzer, tmp_path):
+    analyzer.cache = AnalysisCache(path=str(tmp_path / 'analysis_cache.db'))
+    analyzer.outcomes = [([ENTITY], {'total_tokens': 10})]
+    assert _analyze(analyzer, False) == ([ENTITY], {'total_tokens': 10})
+    # A hit costs no tokens, so it reports no usage.
+    assert _analyze(analyzer, True) == ([ENTITY], {})
+    assert analyzer.calls == 1
+
+def test_unusable_cache_is_treated_as_a_miss(analyzer):
+    analyzer.cache = _BrokenCache()
+    analyzer.outcomes = [([ENTITY], {'total_tokens': 10})]
+    assert _analyze(analyzer, False) == ([ENTITY], {'total_tokens': 10})
+
+def test_analyzer_runs_without_a_cache_it_cannot_open(monkeypatch):
+    def get_analysis_cache():
+        raise OSError('read-only file system')
+    monkeypatch.setattr(sentiment_analyzer, 'get_analysis_cache', get_analysis_cache)
+    assert SentimentAnalyzer(provider='openai', openai_api_key='test-key').cache is None
+
+
+def test_failed_articles_are_left_unanalyzed(analyzer, sqlite_storage, article_ids):
+    analyzer.outcomes = [_StatusError(400), ([ENTITY], {'total_tokens': 10})]
+    with database.AnalysisWriteBuffer() as writer:
+        for article_id in article_ids[:2]:
+            try:
+                pipeline._analyze_article(analyzer, {'id': article_id, 'text': 'text'}, writer)
+            except AnalysisError:
+                pass
+    analyzed = sqlite_storage.select('articles', 'id', [('is_analyzed', 'eq', 1)])
+    assert [row['id'] for row in analyzed] == [article_ids[1]]
@@ -0,0 +1,155 @@
+# tests/test_sqlite_backend.py
+
+import pytest
+
+from storage import DuplicateKeyError
+
+
+def _sentiment(name, financial='positive', overall='neutral', entity_type='company'):
+    return {'entity_name': name, 'entity_type': entity_type, 'financial_sentiment': financial,
+            'overall_sentiment': overall, 'reasoning': f'{name} reasoning'}
+
+def _stats(storage):
+    return {row['key']: row['value'] for row in storage.select('sentiment_stats', 'key, value')}
+
+
+# --- Storage contract ---
+def test_select_filters_and_order(sqlite_storage, article_ids):
+    rows = sqlite_storage.select('articles', 'id, url', [('id', 'in', article_ids[1:])], order_by='id', desc=True)
+    assert [row['id'] for row in rows] == list(reversed(article_ids[1:]))
+    assert sqlite_storage.select('articles', 'id', [('id', 'in', [])]) == []
+    assert len(sqlite_storage.select('articles', 'id', [('url', 'like', '%/2')])) == 1
+    assert sqlite_storage.count('articles', [('canonical_article_id', 'is', None)]) == 3
+
+def test_select_rejects_unknown_operators_and_identifiers(sqlite_storage):
+    with pytest.raises(ValueError):
+        sqlite_storage.select('articles', 'id', [('id', 'regex', 1)])
+    with pytest.raises(ValueError):
+        sqlite_storage.select('articles', 'id; DROP TABLE articles')
+
+def test_insert_raises_duplicate_key(sqlite_storage, article_ids):
+    with pytest.raises(DuplicateKeyError):
+        sqlite_storage.insert('articles', [{'link_id': 1, 'url': 'https://example.com/1'}])
+
+def test_upsert_ignore_duplicates_returns_only_new_rows(sqlite_storage):
+    rows = [{'url': url, 'source_website': 'example.com', 'scraped_date': '2025-07-01'} for url in ('a', 'b')]
+    assert len(sqlite_storage.upsert('links', rows, on_conflict='url', ignore_duplicates=True)) == 2
+    rows.append({'url': 'c', 'source_website': 'example.com', 'scraped_date': '2025-07-01'})
+    inserted = sqlite_storage.upsert('links', rows, on_conflict='url', ignore_duplicates=True)
+    assert [row['url'] for row in inserted] == ['c']
+
+def test_upsert_updates_existing_rows(sqlite_storage):
+    sqlite_storage.upsert('app_config', [{'key': 'schedule_time', 'value': '02:30'}], on_conflict='key')
+    assert sqlite_storage.select('app_config', 'value', [('key', 'eq', 'schedule_time')]) == [{'value': '02:30'}]
+
+def test_iter_rows_pages_through_everything(sqlite_storage):
+    sqlite_storage.insert('links', [{'url': str(n), 'source_website': 's', 'scraped_date': 'd'} for n in range(25)], returning=False)
+    ids = [row['id'] for row in sqlite_storage.iter_rows('links', 'id', page_size=10)]
+    assert ids == sorted(ids) and len(ids) == 25
+
+
+# --- Keyset pages ---
+@pytest.fixture
+def dated_articles(sqlite_storage, article_ids):
+    # Two more articles share a date and two have none, so every segment of select_page is exercised.
+    rows = sqlite_storage.insert('articles', [
+        {'link_id': 1, 'url': f'https://example.com/extra/{n}', 'published_at': published_at}
+        for n, published_at in enumerate(['2025-07-02T08:00:00+00:00', None, '2025-07-02T08:00:00+00:00', None])
+    ])
+    return article_ids + [row['id'] for row in rows]
+
+def _walk_pages(storage, limit):
+    pages, after = [], None
+    while True:
+        rows = storage.select_page('articles', 'id, published_at', [], sort='published_at', after=after, limit=limit)
+        if rows:
+            pages.append([row['id'] for row in rows])
+        if len(rows) < limit:
+            return pages
+        after = (rows[-1]['published_at'], rows[-1]['id'])
+
+def test_select_page_orders_desc_with_nulls_last(sqlite_storage, dated_articles):
+    rows = sqlite_storage.select_page('articles', 'id, published_at', [], sort='published_at', limit=10)
+    assert [row['id'] for row in rows] == [3, 6, 4, 2, 1, 7, 5]
+
+@pytest.mark.parametrize('limit', [1, 2, 3])
+def test_select_page_cursor_visits_every_row_once(sqlite_storage, dated_articles, limit):
+    pages = _walk_pages(sqlite_storage, limit)
+    assert [row_id for page in pages for row_id in page] == [3, 6, 4, 2, 1, 7, 5]
+    assert all(len(page) <= limit for page in pages)
+
+def test_select_page_applies_filters(sqlite_storage, dated_articles):
+    rows = sqlite_storage.select_page('articles', 'id, published_at', [('published_at', 'gte', '2025-07-02')],
+                                      sort='published_at', after=('2025-07-02T08:00:00+00:00', 6), limit=10)
+    assert [row['id'] for row in rows] == [4, 2]
+
+
+# --- commit_article_analyses ---
+def test_commit_stores_results_and_returns_committed_ids(sqlite_storage, article_ids):
+    first, second, _ = article_ids
+    committed = sqlite_storage.commit_article_analyses([
+        {'article_id': first, 'usage_log': {'provider': 'openai', 'total_tokens': 10, 'timestamp': '2025-07-01'},
+         'sentiments': [_sentiment('Emaar'), _sentiment('Aramco', financial='negative')], 'published_day': '2025-07-01'},
+        {'article_id': second, 'usage_log': None, 'sentiments': [_sentiment('Emaar')], 'published_day': '2025-07-02'},
+    ])
+    assert committed == [first, second]
+    assert sqlite_storage.count('articles', [('is_analyzed', 'eq', 1)]) == 2
+    assert sqlite_storage.count('usage_logs') == 1
+    sentiments = sqlite_storage.select('sentiments', 'article_id, published_at', [('article_id', 'eq', first)])
+    assert [row['published_at'] for row in sentiments] == ['2025-07-01T08:00:00+00:00'] * 2
+
+    emaar = sqlite_storage.select('entity_sentiment_counts', '*', [('entity_name', 'eq', 'Emaar')])[0]
+    assert emaar['financial_positive'] == 2 and emaar['overall_neutral'] == 2 and emaar['total'] == 2
+    assert _stats(sqlite_storage) == {
+        'total_sentiments': 3, 'articles_analyzed': 2, 'total_entities': 2,
+        'financial_positive': 2, 'financial_negative': 1, 'financial_neutral': 0,
+        'overall_positive': 0, 'overall_negative': 0, 'overall_neutral': 3,
+    }
+    days = sqlite_storage.select('entity_daily_sentiment', 'entity_name, day, mentions, financial_score_sum',
+                                 order_by='day,entity_name')
+    assert [(row['entity_name'], row['day'], row['mentions'], row['financial_score_sum']) for row in days] == [
+        ('Aramco', '2025-07-01', 1, -1), ('Emaar', '2025-07-01', 1, 1), ('Emaar', '2025-07-02', 1, 1)
+    ]
+
+def test_commit_is_idempotent(sqlite_storage, article_ids):
+    result = {'article_id': article_ids[0], 'usage_log': None, 'sentiments': [_sentiment('Emaar')], 'published_day': '2025-07-01'}
+    assert sqlite_storage.commit_article_analyses([result]) == [article_ids[0]]
+    stats = _stats(sqlite_storage)
+
+    assert sqlite_storage.commit_article_analyses([result]) == []
+    assert sqlite_storage.count('sentiments') == 1
+    assert _stats(sqlite_storage) == stats
+    assert sqlite_storage.select('entity_daily_sentiment', 'mentions') == [{'mentions': 1}]
+
+def test_commit_replaces_partial_sentiments(sqlite_storage, article_ids):
+    sqlite_storage.insert('sentiments', [{'article_id': article_ids[0], **_sentiment('Stale')}])
+    sqlite_storage.commit_article_analyses([{'article_id': article_ids[0], 'sentiments': [_sentiment('Emaar')]}])
+    assert [row['entity_name'] for row in sqlite_storage.select('sentiments', 'entity_name')] == ['Emaar']
+
+def test_commit_rolls_back_the_whole_batch(sqlite_storage, article_ids):
+    broken = _sentiment('Broken')
+    broken['financial_sentiment'] = None  # violates NOT NULL
+    with pytest.raises(Exception):
+        sqlite_storage.commit_article_analyses([
+            {'article_id': article_ids[0], 'usage_log': {'provider': 'openai', 'timestamp': '2025-07-01'},
+             'sentiments': [_sentiment('Emaar')]},
+            {'article_id': article_ids[1], 'sentiments': [broken]},
+        ])
+    assert sqlite_storage.count('articles', [('is_analyzed', 'eq', 1)]) == 0
+    assert sqlite_storage.count('sentiments') == 0
+    assert sqlite_storage.count('usage_logs') == 0
+    assert sqlite_storage.count('entity_sentiment_counts') == 0
+
+def test_near_duplicates_are_committed_without_sentiments(sqlite_storage, article_ids):
+    stats = _stats(sqlite_storage)
+    assert sqlite_storage.commit_article_analyses([{'article_id': article_ids[2], 'sentiments': []}]) == [article_ids[2]]
+    assert _stats(sqlite_storage) == stats
+
+def test_rebuild_entity_rollups_matches_incremental_counts(sqlite_storage, article_ids):
+    sqlite_storage.commit_article_analyses([
+        {'article_id': article_ids[0], 'sentiments': [_sentiment('Emaar'), _sentiment('Aramco', overall='negative')]},
+        {'article_id': article_ids[1], 'sentiments': [_sentiment('Emaar', financial='neutral')]},
+    ])
+    incremental = (_stats(sqlite_storage), sqlite_storage.select('entity_sentiment_counts', '*', order_by='entity_name'))
+    sqlite_storage.rebuild_entity_rollups()
+    assert (_stats(sqlite_storage), sqlite_storage.select('entity_sentiment_counts', '*', order_by='entity_name')) == incremental
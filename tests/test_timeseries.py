@@ -0,0 +1,49 @@
+# tests/test_timeseries.py
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from analysis.timeseries import bucket_sentiment_series
+
+
+def _row(day, mentions, financial, overall=0):
+    return {'day': day, 'mentions': mentions, 'financial_score_sum': financial, 'overall_score_sum': overall}
+
+
+def test_empty_series():
+    assert bucket_sentiment_series([]) == {'financial': [], 'overall': []}
+
+def test_daily_buckets_average_mixed_entities():
+    rows = [_row('2025-07-02', 2, 2, -1), _row('2025-07-01', 1, -1), _row('2025-07-02', 2, 0, 1)]
+    assert bucket_sentiment_series(rows) == {
+        'financial': [['2025-07-01', -1.0], ['2025-07-02', 0.5]],
+        'overall': [['2025-07-01', 0.0], ['2025-07-02', 0.0]],
+    }
+
+def test_week_buckets_start_on_monday():
+    # 2025-06-30 and 2025-07-07 are Mondays; 2025-07-06 is a Sunday.
+    rows = [_row('2025-06-30', 1, 1), _row('2025-07-06', 1, -1), _row('2025-07-07', 4, 2)]
+    assert bucket_sentiment_series(rows, bucket='week')['financial'] == [['2025-06-30', 0.0], ['2025-07-07', 0.5]]
+
+def test_month_buckets_accept_timestamps():
+    rows = [_row('2025-01-31T23:00:00+00:00', 1, 1), _row('2025-02-01', 3, 0), _row('2025-02-28', 1, 1)]
+    assert bucket_sentiment_series(rows, bucket='month')['financial'] == [['2025-01-01', 1.0], ['2025-02-01', 0.25]]
+
+def test_rolling_window_weights_by_mentions():
+    rows = [_row('2025-07-01', 1, 1), _row('2025-07-02', 3, -3), _row('2025-07-03', 1, 1)]
+    assert bucket_sentiment_series(rows, window=2)['financial'] == [
+        ['2025-07-01', 1.0], ['2025-07-02', -0.5], ['2025-07-03', -0.5]
+    ]
+
+def test_rolling_window_counts_calendar_gaps():
+    # Nothing was said on 07-02 and 07-03, so with a 3-day window 07-04 no longer sees 07-01.
+    rows = [_row('2025-07-01', 1, 1), _row('2025-07-03', 1, 0), _row('2025-07-04', 1, -1)]
+    assert bucket_sentiment_series(rows, window=3)['financial'] == [
+        ['2025-07-01', 1.0], ['2025-07-03', 0.5], ['2025-07-04', -0.5]
+    ]
+
+def test_rolling_window_over_months():
+    rows = [_row('2025-01-15', 1, 1), _row('2025-03-15', 1, -1)]
+    assert bucket_sentiment_series(rows, bucket='month', window=2)['financial'] == [['2025-01-01', 1.0], ['2025-03-01', -1.0]]
+    assert bucket_sentiment_series(rows, bucket='month', window=3)['financial'] == [['2025-01-01', 1.0], ['2025-03-01', 0.0]]